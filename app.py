@@ -1,32 +1,19 @@
 import streamlit as st
-from langchain.chains import RetrievalQA
-from langchain.llms import Ollama
 import time
-from utils.document_manager import DocumentManager
 from utils.rag_optimizer import RAGOptimizer
-from utils.performance_monitor import PerformanceMonitor
-from utils.model_manager import ModelManager
-from utils.document_loader import DocumentLoader
-from utils.repository_manager import RepositoryManager
-from config.settings import EMBEDDING_MODELS, SUPPORTED_FORMATS
-import pandas as pd
-
-# Initialize components
-doc_manager = DocumentManager()
-model_manager = ModelManager()
-performance_monitor = PerformanceMonitor()
-repo_manager = RepositoryManager()
-
-def setup_qa_chain(vectorstore, model_name: str):
-    """Set up the question-answering chain"""
-    llm = Ollama(model=model_name)
-    return RetrievalQA.from_chain_type(
-        llm=llm,
-        chain_type="stuff",
-        retriever=vectorstore.as_retriever(
-            search_kwargs={"k": 4}
-        )
-    )
+from utils.performance_monitor import get_performance_monitor
+from utils.model_manager import get_model_manager
+from utils.repository_manager import get_repository_manager
+from utils.ingest_queue import get_ingest_queue
+from utils.answer_cache import get_answer_cache
+from config.settings import EMBEDDING_MODELS, SUPPORTED_FORMATS, INGEST_POLL_INTERVAL, init_directories
+
+# Initialize components; Streamlit reruns this script on every interaction, so each is built once per process
+init_directories()
+model_manager = get_model_manager()
+performance_monitor = get_performance_monitor()
+repo_manager = get_repository_manager()
+ingest_queue = get_ingest_queue(performance_monitor)
 
 def display_repository_ui(unique_id):
     """Display document repository interface"""
@@ -44,6 +31,8 @@ def display_repository_ui(unique_id):
         # Display documents in collection
         docs = repo_manager.get_collection_documents(selected_collection)
         if docs:
+            import pandas as pd
+
             st.sidebar.subheader("Documents in Collection")
             df = pd.DataFrame(docs)
             df['added_at'] = pd.to_datetime(df['added_at']).dt.strftime('%Y-%m-%d %H:%M')
@@ -61,6 +50,91 @@ def display_repository_ui(unique_id):
                     st.sidebar.success(f"Cleared collection: {selected_collection}")
                     st.experimental_rerun()
 
+def display_stage_latency():
+    """Display per-stage latency percentiles and the breakdown of the slowest recent question"""
+    with st.sidebar.expander("Stage Latency"):
+        stats = performance_monitor.get_stage_stats()
+        if not stats:
+            st.write("No stages traced yet")
+            return
+        import pandas as pd
+
+        df = pd.DataFrame(stats)
+        for column in ('p50', 'p95', 'p99'):
+            df[column] = (df[column] * 1000).round(1)
+        st.dataframe(
+            df[['stage', 'model', 'count', 'p50', 'p95', 'p99']].rename(
+                columns={'p50': 'p50 ms', 'p95': 'p95 ms', 'p99': 'p99 ms'}
+            ),
+            hide_index=True,
+            use_container_width=True
+        )
+
+        slowest = performance_monitor.get_traces('question', limit=1, slowest=True)
+        if slowest:
+            st.caption(f"Slowest recent question: {slowest[0]['duration']:.2f}s")
+            rows = []
+
+            def add_rows(span, depth):
+                name = span['name']
+                if 'aggregated' in span['attributes']:
+                    name += f" ×{span['attributes']['aggregated']}"
+                rows.append({'stage': "  " * depth + name,
+                             'seconds': round(span['duration'] or 0.0, 3)})
+                for child in span['children']:
+                    add_rows(child, depth + 1)
+
+            add_rows(slowest[0], 0)
+            st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+
+def display_ingest_status(collection_name):
+    """Display background indexing progress of a collection"""
+    jobs = ingest_queue.get_jobs(collection_name, limit=10)
+    if not jobs:
+        return
+    active = any(job['status'] in ('queued', 'running') for job in jobs)
+    with st.sidebar.expander("Indexing", expanded=active):
+        for job in jobs:
+            label = job['filename'] or job['doc_id']
+            if job['status'] == 'running':
+                st.caption(f"⏳ {label}: {job['stage']}, {job['chunks_done']} chunks embedded")
+            elif job['status'] == 'queued':
+                st.caption(f"🕒 {label}: queued" + (f" (retrying: {job['error']})" if job['error'] else ""))
+            elif job['status'] == 'failed':
+                st.caption(f"🔴 {label}: failed after {job['attempts']} attempts: {job['error']}")
+            elif job['status'] == 'done':
+                st.caption(f"🟢 {label}: indexed")
+        if any(job['status'] == 'failed' for job in jobs):
+            if st.button("Retry failed", key=f"retry_failed_{collection_name}"):
+                ingest_queue.retry_failed(collection_name)
+                st.experimental_rerun()
+
+def display_model_state(llm_model, embedding_model):
+    """Display whether the selected models are loaded"""
+    llm_state = model_manager.get_model_state(llm_model)
+    if llm_state['state'] == 'resident':
+        expires_in = llm_state.get('expires_in')
+        st.sidebar.caption(f"🟢 {llm_model} loaded" +
+                           (f", unloads in {expires_in / 60:.0f} min" if expires_in is not None else ""))
+    elif llm_state['state'] == 'loading':
+        st.sidebar.caption(f"🟡 {llm_model} loading ({llm_state['elapsed']:.0f}s)")
+    elif llm_state['state'] == 'failed':
+        st.sidebar.caption(f"🔴 {llm_model} failed to load: {llm_state['error']} "
+                           f"(retrying in {llm_state['retry_in']:.0f}s)")
+        if st.sidebar.button("Retry loading", key="retry_llm_warmup"):
+            model_manager.warm_up(llm_model, retry=True)
+    else:
+        st.sidebar.caption(f"⚪ {llm_model} not loaded")
+
+    embedding_state = model_manager.get_embedding_state(embedding_model)
+    labels = {'ready': "🟢 loaded", 'loading': "🟡 loading", 'failed': "🔴 failed to load"}
+    st.sidebar.caption(f"{labels.get(embedding_state['state'], '⚪ not loaded')}: "
+                       f"{embedding_model.split('/')[-1]}")
+    if embedding_state['state'] == 'failed':
+        st.sidebar.caption(embedding_state['error'])
+        if st.sidebar.button("Retry loading", key="retry_embedding_warmup"):
+            model_manager.warm_up_embeddings(embedding_model, retry=True)
+
 def main():
     st.title("Enhanced RAG System with Document Repository")
 
@@ -71,7 +145,10 @@ def main():
     if not model_manager.check_ollama_status():
         ollama_status.error("❌ Ollama is not running")
         st.stop()
-    ollama_status.success("✅ Ollama is running")
+    status_age = model_manager.get_status_age()
+    ollama_status.success(
+        "✅ Ollama is running" + (f" (checked {status_age:.0f}s ago)" if status_age is not None else "")
+    )
 
     # Model selection
     installed_models = model_manager.get_installed_models()
@@ -91,8 +168,10 @@ def main():
         key="embedding_model_select"  # Ensure unique key
     )
 
-    # Initialize RAG optimizer
-    rag = RAGOptimizer(llm_model, EMBEDDING_MODELS[embedding_model])
+    # Load both models in the background while the user uploads or types
+    model_manager.warm_up(llm_model)
+    model_manager.warm_up_embeddings(EMBEDDING_MODELS[embedding_model])
+    display_model_state(llm_model, EMBEDDING_MODELS[embedding_model])
 
     # Collection selection/creation
     collection_name = st.text_input(
@@ -101,6 +180,11 @@ def main():
         key="collection_name_input"  # Ensure unique key
     )
 
+    # Initialize RAG optimizer
+    rag = RAGOptimizer(
+        llm_model, EMBEDDING_MODELS[embedding_model], collection_name, performance_monitor
+    )
+
     # File upload
     uploaded_files = st.file_uploader(
         "Upload your documents",
@@ -111,19 +195,17 @@ def main():
 
     if uploaded_files:
         try:
-            with st.spinner("Processing documents..."):
-                # Add documents to repository
-                for file in uploaded_files:
-                    repo_manager.add_document(file, collection_name)
-                
-                # Load all documents from the collection
-                documents = repo_manager.load_collection_documents(collection_name)
-                
-                # Process documents with RAG optimizer
-                chunks = rag.create_chunks(documents)
-                vectorstore = rag.setup_vectorstore(chunks)
-                
-            st.success("Documents processed and added to repository!")
+            # Store the files and queue new or changed documents; the same files on a
+            # rerun are a no-op, and indexing runs in the background
+            with performance_monitor.span('upload', files=len(uploaded_files)):
+                ingest_queue.submit(uploaded_files, collection_name, llm_model, rag.embedding_model)
+
+            # Queries use the documents indexed so far until queued ones are promoted
+            vectorstore = rag.get_existing_vectorstore()
+            if ingest_queue.has_active_jobs(collection_name):
+                st.info("Indexing documents in the background; answers use the documents indexed so far.")
+            else:
+                st.success("Documents processed and added to repository!")
             
             # Display repository UI
             display_repository_ui(unique_id="main")  # Pass unique ID
@@ -136,23 +218,52 @@ def main():
             )
             
             if question:
-                with st.spinner("Generating answer..."):
-                    try:
-                        processed_question = rag.process_text(question)
-                        qa_chain = setup_qa_chain(vectorstore, llm_model)
-                        answer = qa_chain.run(processed_question)
-                        
-                        st.subheader("Answer:")
-                        st.write(answer)
-                        
-                    except Exception as e:
-                        st.error(f"Error generating answer: {str(e)}")
+                try:
+                    with st.spinner("Retrieving context..."):
+                        sources, tokens, answer_metrics = rag.stream_answer(
+                            vectorstore,
+                            question,
+                            repo_manager.get_collection_version(collection_name)
+                        )
+
+                    st.subheader("Answer:")
+                    answer_placeholder = st.empty()
+                    answer = ""
+                    for token in tokens:
+                        answer += token
+                        answer_placeholder.markdown(answer)
+
+                    with st.expander("Sources"):
+                        for doc in sources:
+                            st.caption(f"{doc.metadata.get('filename', doc.metadata.get('source', ''))} "
+                                       f"(page {doc.metadata.get('page', '-')})")
+                            st.text(doc.page_content[:500])
+
+                    pack_metrics = answer_metrics['context']
+                    if pack_metrics and not answer_metrics['cached']:
+                        st.caption(
+                            f"Context: {pack_metrics['packed']} of {pack_metrics['candidates']} chunks, "
+                            f"{pack_metrics['prompt_tokens']} tokens "
+                            f"({pack_metrics['tokens_saved']} saved)"
+                        )
+
+                    if not answer_metrics['cached']:
+                        model_manager.record_usage(llm_model)
+                    if 'execution_time' in answer_metrics:
+                        st.caption(
+                            f"First token after {answer_metrics['time_to_first_token']:.2f}s, "
+                            f"answer complete after {answer_metrics['execution_time']:.2f}s"
+                        )
+                    
+                except Exception as e:
+                    st.error(f"Error generating answer: {str(e)}")
         
         except Exception as e:
             st.error(f"Error processing documents: {str(e)}")
 
     # Display repository even if no new files are uploaded
     display_repository_ui(unique_id="sidebar")  # Pass unique ID
+    display_ingest_status(collection_name)
 
     # Display system metrics
     with st.sidebar.expander("System Metrics"):
@@ -160,6 +271,18 @@ def main():
         st.write("Memory Usage:", f"{metrics['memory_used_percent']}%")
         st.write("Available Memory:", f"{metrics['memory_available_gb']:.1f} GB")
         st.write("CPU Usage:", f"{metrics['cpu_percent']}%")
+        cache_stats = rag.embedding_cache.get_stats()
+        st.write("Embedding Cache Hit Rate:", f"{cache_stats['hit_rate']:.1%}")
+        st.write("Embedding Cache Hits/Misses:", f"{cache_stats['hits']}/{cache_stats['misses']}")
+        answer_stats = get_answer_cache().get_stats()
+        st.write("Answer Cache Hit Rate:", f"{answer_stats['hit_rate']:.1%}")
+        embed_metrics = performance_monitor.get_last_metrics('add_chunks')
+        if embed_metrics:
+            st.write("Embedding Throughput:",
+                     f"{embed_metrics['chunks_per_sec']:.1f} chunks/s, "
+                     f"{embed_metrics['tokens_per_sec']:.0f} tokens/s")
+
+    display_stage_latency()
 
     # Display optimization tips
     with st.sidebar.expander("RAG Optimization Tips"):
@@ -181,5 +304,10 @@ def main():
            - Update models regularly
         """)
 
+    # Poll background indexing until it finishes, but not while an answer is shown
+    if ingest_queue.has_active_jobs(collection_name) and not st.session_state.get('question_input'):
+        time.sleep(INGEST_POLL_INTERVAL)
+        st.experimental_rerun()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
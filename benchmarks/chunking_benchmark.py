@@ -0,0 +1,118 @@
+import sys
+import json
+import time
+import random
+import argparse
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import numpy as np
+from langchain.schema import Document
+from langchain.text_splitter import CharacterTextSplitter
+from utils.chunker import TokenChunker
+from utils.document_loader import DocumentLoader
+from utils.resource_pool import get_resource_pool
+from config.settings import CHUNK_SETTINGS, CHUNK_OVERLAP_TOKENS, EMBEDDING_MODELS
+
+WORDS = ("retrieval augmented generation index vector query model embedding chunk token "
+         "document page section table result latency throughput memory cache batch").split()
+
+def synthetic_documents(size_mb: float, seed: int = 0) -> List[Any]:
+    """Generate structured pages (headings, paragraphs, long lines) totalling about size_mb"""
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    documents, total, page = [], 0, 0
+    while total < target:
+        blocks = []
+        for section in range(rng.randint(1, 4)):
+            blocks.append(f"{section + 1}. {rng.choice(WORDS).title()} {rng.choice(WORDS)}")
+            for _ in range(rng.randint(1, 5)):
+                sentences = [
+                    " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 30))).capitalize() + "."
+                    for _ in range(rng.randint(1, 12))
+                ]
+                blocks.append(" ".join(sentences))
+        text = "\n\n".join(blocks)
+        documents.append(Document(page_content=text, metadata={'source': 'synthetic', 'page': page}))
+        total += len(text.encode('utf-8'))
+        page += 1
+    return documents
+
+
+def load_documents(paths: List[Path]) -> List[Any]:
+    """Load files with the application's loaders"""
+    documents = []
+    for path in paths:
+        documents.extend(DocumentLoader.load_document_from_file(path))
+    return documents
+
+
+def measure(name: str, split, documents: List[Any], tokenizer: Any, max_tokens: int) -> Dict:
+    """Time a splitter and describe the token lengths of its chunks"""
+    size_mb = sum(len(doc.page_content.encode('utf-8')) for doc in documents) / (1024 * 1024)
+    start_time = time.perf_counter()
+    chunks = split(documents)
+    elapsed = max(time.perf_counter() - start_time, 1e-9)
+
+    lengths = np.array([
+        len(ids) for ids in tokenizer([chunk.page_content for chunk in chunks],
+                                      add_special_tokens=False)['input_ids']
+    ]) if chunks else np.zeros(1, dtype=int)
+    return {
+        'splitter': name,
+        'input_mb': size_mb,
+        'chunks': len(chunks),
+        'seconds': elapsed,
+        'mb_per_sec': size_mb / elapsed,
+        'chunks_per_sec': len(chunks) / elapsed,
+        'tokens': {
+            'min': int(lengths.min()),
+            'p50': float(np.percentile(lengths, 50)),
+            'p95': float(np.percentile(lengths, 95)),
+            'max': int(lengths.max()),
+            'mean': float(lengths.mean()),
+            'std': float(lengths.std())
+        },
+        'over_limit_share': float((lengths > max_tokens).mean()),
+        'under_half_share': float((lengths < max_tokens // 2).mean())
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Compare the token chunker with the character splitter")
+    parser.add_argument("files", nargs="*", type=Path, help="Documents to chunk (default: synthetic text)")
+    parser.add_argument("--size-mb", type=float, default=5.0, help="Size of the synthetic corpus")
+    parser.add_argument("--embedding", default=next(iter(EMBEDDING_MODELS)),
+                        choices=list(EMBEDDING_MODELS), help="Embedding model")
+    parser.add_argument("--output", type=Path, help="Write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    documents = load_documents(args.files) if args.files else synthetic_documents(args.size_mb)
+    client = get_resource_pool().get_embeddings(EMBEDDING_MODELS[args.embedding]).client
+    max_tokens = client.max_seq_length - 2
+
+    character_splitter = CharacterTextSplitter(
+        chunk_size=CHUNK_SETTINGS['default']['size'],
+        chunk_overlap=CHUNK_SETTINGS['default']['overlap'],
+        separator="\n"
+    )
+    token_chunker = TokenChunker(client.tokenizer, max_tokens, CHUNK_OVERLAP_TOKENS)
+
+    results = {
+        'embedding_model': EMBEDDING_MODELS[args.embedding],
+        'max_tokens': max_tokens,
+        'documents': len(documents),
+        'results': [
+            measure("character", character_splitter.split_documents, documents, client.tokenizer, max_tokens),
+            measure("token", token_chunker.split_documents, documents, client.tokenizer, max_tokens)
+        ]
+    }
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
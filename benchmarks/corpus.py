@@ -0,0 +1,148 @@
+import csv
+import random
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+WORDS = ("retrieval augmented generation index vector query model embedding chunk token "
+         "document page section table result latency throughput memory cache batch "
+         "collection repository answer context prompt source filter score rank").split()
+
+# Target size of the extracted text per corpus, in KB
+CORPUS_SIZES = {'small': 16, 'medium': 256, 'large': 2048}
+
+class CorpusGenerator:
+    """Writes deterministic synthetic documents in every supported format"""
+
+    LINES_PER_PAGE = 50
+
+    def __init__(self, seed: int = 0):
+        self.seed = seed
+
+    def _sentences(self, rng: random.Random, size_bytes: int) -> Iterator[str]:
+        """Random sentences totalling about size_bytes"""
+        total = 0
+        while total < size_bytes:
+            sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 20))).capitalize() + "."
+            total += len(sentence) + 1
+            yield sentence
+
+    def _sections(self, rng: random.Random, size_bytes: int) -> List[Dict]:
+        """Sections with a heading and paragraphs of sentences"""
+        sections, paragraph, paragraphs = [], [], []
+        for sentence in self._sentences(rng, size_bytes):
+            paragraph.append(sentence)
+            if len(paragraph) >= rng.randint(3, 8):
+                paragraphs.append(" ".join(paragraph))
+                paragraph = []
+            if len(paragraphs) >= rng.randint(2, 5):
+                sections.append({'heading': f"{len(sections) + 1}. {rng.choice(WORDS).title()} "
+                                            f"{rng.choice(WORDS)}",
+                                 'paragraphs': paragraphs})
+                paragraphs = []
+        if paragraph:
+            paragraphs.append(" ".join(paragraph))
+        if paragraphs or not sections:
+            sections.append({'heading': f"{len(sections) + 1}. Summary", 'paragraphs': paragraphs})
+        return sections
+
+    def generate(self, output_dir: Path, extension: str, size_kb: int) -> Path:
+        """Write one document of the given format and approximate text size"""
+        output_dir.mkdir(parents=True, exist_ok=True)
+        path = output_dir / f"corpus_{size_kb}kb{extension}"
+        rng = random.Random(f"{self.seed}-{extension}-{size_kb}")
+        writer = {
+            '.txt': self._write_txt,
+            '.csv': self._write_csv,
+            '.pdf': self._write_pdf,
+            '.docx': self._write_docx,
+            '.pptx': self._write_pptx
+        }[extension]
+        writer(path, rng, size_kb * 1024)
+        return path
+
+    def _write_txt(self, path: Path, rng: random.Random, size_bytes: int):
+        with open(path, 'w', encoding='utf-8') as f:
+            for section in self._sections(rng, size_bytes):
+                f.write(section['heading'] + "\n\n")
+                for paragraph in section['paragraphs']:
+                    f.write(paragraph + "\n\n")
+
+    def _write_csv(self, path: Path, rng: random.Random, size_bytes: int):
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['id', 'title', 'category', 'score', 'description'])
+            for row, sentence in enumerate(self._sentences(rng, size_bytes)):
+                writer.writerow([row, rng.choice(WORDS).title(), rng.choice(WORDS),
+                                 round(rng.random() * 100, 2), sentence])
+
+    def _write_docx(self, path: Path, rng: random.Random, size_bytes: int):
+        from docx import Document
+
+        document = Document()
+        for section in self._sections(rng, size_bytes):
+            document.add_heading(section['heading'], level=1)
+            for paragraph in section['paragraphs']:
+                document.add_paragraph(paragraph)
+        document.save(path)
+
+    def _write_pptx(self, path: Path, rng: random.Random, size_bytes: int):
+        from pptx import Presentation
+
+        presentation = Presentation()
+        layout = presentation.slide_layouts[1]
+        for section in self._sections(rng, size_bytes):
+            slide = presentation.slides.add_slide(layout)
+            slide.shapes.title.text = section['heading']
+            slide.placeholders[1].text = "\n".join(section['paragraphs'])
+        presentation.save(path)
+
+    def _write_pdf(self, path: Path, rng: random.Random, size_bytes: int):
+        # Plain text pages with the standard Helvetica font, no third-party writer needed
+        lines = []
+        for section in self._sections(rng, size_bytes):
+            lines.append(section['heading'])
+            for paragraph in section['paragraphs']:
+                words, line = paragraph.split(), []
+                for word in words:
+                    if sum(len(w) + 1 for w in line) + len(word) > 90:
+                        lines.append(" ".join(line))
+                        line = []
+                    line.append(word)
+                lines.append(" ".join(line))
+                lines.append("")
+        pages = [lines[i:i + self.LINES_PER_PAGE] for i in range(0, len(lines), self.LINES_PER_PAGE)]
+
+        objects = [
+            b"<< /Type /Catalog /Pages 2 0 R >>",
+            None,  # page tree, filled in once page objects are numbered
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+        ]
+        page_ids = []
+        for page in pages:
+            text = "".join(
+                "(" + line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ") Tj T* "
+                for line in page
+            )
+            stream = f"BT /F1 10 Tf 14 TL 50 790 Td {text}ET".encode('latin-1', 'replace')
+            objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+            objects.append(
+                b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (len(objects))
+            )
+            page_ids.append(len(objects))
+        objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            b" ".join(b"%d 0 R" % page_id for page_id in page_ids), len(page_ids)
+        )
+
+        with open(path, 'wb') as f:
+            f.write(b"%PDF-1.4\n")
+            offsets = []
+            for number, body in enumerate(objects, start=1):
+                offsets.append(f.tell())
+                f.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+            xref = f.tell()
+            f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+            for offset in offsets:
+                f.write(b"%010d 00000 n \n" % offset)
+            f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                    % (len(objects) + 1, xref))
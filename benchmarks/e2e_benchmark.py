@@ -0,0 +1,348 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from benchmarks.corpus import CorpusGenerator, CORPUS_SIZES, WORDS
+from benchmarks.fake_ollama import FakeOllamaServer
+
+# Project modules read RAG_DATA_DIR and OLLAMA_BASE_URL from the environment when
+# config.settings is first imported, so they are imported only after both are set.
+
+def run_stage(monitor: Any, name: str, function: Callable[[], Any]) -> Tuple[Any, Dict]:
+    """Run one stage under PerformanceMonitor.monitor_execution and return its metrics"""
+    function.__name__ = name
+    result = monitor.monitor_execution(function)()
+    return result, dict(monitor.get_last_metrics(name))
+
+
+def stage_record(component: str, extension: str, size: str, stage: str, metrics: Dict,
+                 size_mb: Optional[float] = None, items: Optional[int] = None, **extra) -> Dict:
+    """One result row; (component, format, size, stage) identifies it across runs"""
+    seconds = max(metrics['execution_time'], 1e-9)
+    record = {
+        'component': component,
+        'format': extension,
+        'size': size,
+        'stage': stage,
+        'seconds': metrics['execution_time'],
+        'memory_impact_mb': metrics.get('memory_impact_mb')
+    }
+    if size_mb is not None:
+        record['mb_per_sec'] = size_mb / seconds
+    if items is not None:
+        record['items'] = items
+        record['items_per_sec'] = items / seconds
+    record.update(extra)
+    return record
+
+
+def latency_summary(latencies: List[float]) -> Dict:
+    """Percentiles of a list of latencies in seconds"""
+    values = np.array(latencies or [0.0])
+    return {
+        'p50': float(np.percentile(values, 50)),
+        'p95': float(np.percentile(values, 95)),
+        'max': float(values.max())
+    }
+
+
+def questions(count: int, offset: int = 0) -> List[str]:
+    """Distinct questions, so the answer cache never short-circuits generation"""
+    return [
+        f"What does the {WORDS[(i + offset) % len(WORDS)]} section say about "
+        f"{WORDS[(3 * i + offset + 1) % len(WORDS)]} number {i + offset}?"
+        for i in range(count)
+    ]
+
+
+class Benchmark:
+    """Runs parse, chunk, embed, index, retrieve and generate stages per format and size"""
+
+    def __init__(self, args: argparse.Namespace):
+        from utils.performance_monitor import PerformanceMonitor
+        from config.settings import EMBEDDING_MODELS
+
+        self.args = args
+        self.embedding_model = EMBEDDING_MODELS[args.embedding]
+        self.monitor = PerformanceMonitor()
+        self.results = []
+
+    def run(self, corpora: Dict[Tuple[str, str], Path]) -> List[Dict]:
+        """Benchmark every corpus with each component"""
+        for offset, ((extension, size), path) in enumerate(sorted(corpora.items())):
+            self.bench_document_loader(extension, size, path)
+            self.bench_rag_optimizer(extension, size, path, offset)
+            self.bench_repository_manager(extension, size, path)
+        return self.results
+
+    def bench_document_loader(self, extension: str, size: str, path: Path):
+        from utils.document_loader import DocumentLoader
+
+        size_mb = path.stat().st_size / (1024 * 1024)
+
+        def parse():
+            return DocumentLoader.load_document_from_file(path)
+
+        pages, metrics = run_stage(self.monitor, 'parse', parse)
+        self.results.append(stage_record('DocumentLoader', extension, size, 'parse', metrics,
+                                         size_mb, len(pages)))
+
+    def bench_rag_optimizer(self, extension: str, size: str, path: Path, offset: int):
+        from utils.document_loader import DocumentLoader
+        from utils.rag_optimizer import RAGOptimizer
+
+        rag = RAGOptimizer(self.args.llm, self.embedding_model,
+                           f"bench_{extension[1:]}_{size}", self.monitor)
+        pages = DocumentLoader.load_document_from_file(path)
+        text_mb = sum(len(page.page_content.encode('utf-8')) for page in pages) / (1024 * 1024)
+
+        def chunk():
+            return rag.create_chunks(pages)
+
+        chunks, metrics = run_stage(self.monitor, 'chunk', chunk)
+        self.results.append(stage_record('RAGOptimizer', extension, size, 'chunk', metrics,
+                                         text_mb, len(chunks)))
+
+        # Embedding fills the embedding cache, so the index stage measures the writes
+        def embed():
+            return rag.get_embeddings().embed_documents([c.page_content for c in chunks])
+
+        _, metrics = run_stage(self.monitor, 'embed', embed)
+        self.results.append(stage_record('RAGOptimizer', extension, size, 'embed', metrics,
+                                         text_mb, len(chunks)))
+
+        vectorstore = rag.get_existing_vectorstore()
+
+        def index():
+            rag.add_chunks(vectorstore, chunks)
+            vectorstore.persist()
+
+        _, metrics = run_stage(self.monitor, 'index', index)
+        self.results.append(stage_record('RAGOptimizer', extension, size, 'index', metrics,
+                                         text_mb, len(chunks)))
+
+        retriever = rag.get_retriever(vectorstore)
+        latencies = []
+
+        def retrieve():
+            for question in questions(self.args.questions, offset * 1000):
+                start_time = time.perf_counter()
+                retriever.get_relevant_documents(rag.process_text(question))
+                latencies.append(time.perf_counter() - start_time)
+
+        _, metrics = run_stage(self.monitor, 'retrieve', retrieve)
+        self.results.append(stage_record('RAGOptimizer', extension, size, 'retrieve', metrics,
+                                         items=len(latencies), latency=latency_summary(latencies)))
+
+        # The same kind of questions, many at once: one embedding pass and one bulk query
+        batch_questions = questions(self.args.batch_questions, offset * 1000 + 200)
+
+        def retrieve_batch():
+            return rag.retrieve_batch(vectorstore, batch_questions)
+
+        _, metrics = run_stage(self.monitor, 'retrieve_batch', retrieve_batch)
+        self.results.append(stage_record('RAGOptimizer', extension, size, 'retrieve_batch', metrics,
+                                         items=len(batch_questions)))
+
+        first_tokens, totals, token_counts = [], [], []
+
+        def generate():
+            for question in questions(self.args.questions, offset * 1000 + 500):
+                start_time = time.perf_counter()
+                _, tokens, _ = rag.stream_answer(vectorstore, question, collection_version=0)
+                count = 0
+                for _ in tokens:
+                    if count == 0:
+                        first_tokens.append(time.perf_counter() - start_time)
+                    count += 1
+                totals.append(time.perf_counter() - start_time)
+                token_counts.append(count)
+
+        _, metrics = run_stage(self.monitor, 'generate', generate)
+        self.results.append(stage_record(
+            'RAGOptimizer', extension, size, 'generate', metrics, items=len(totals),
+            time_to_first_token=latency_summary(first_tokens),
+            latency=latency_summary(totals),
+            tokens_per_sec=sum(token_counts) / max(sum(totals), 1e-9)
+        ))
+
+    def bench_repository_manager(self, extension: str, size: str, path: Path):
+        from utils.rag_optimizer import RAGOptimizer
+        from utils.repository_manager import RepositoryManager
+
+        collection_name = f"repo_{extension[1:]}_{size}"
+        repo_manager = RepositoryManager()
+        rag = RAGOptimizer(self.args.llm, self.embedding_model, collection_name, self.monitor)
+        size_mb = path.stat().st_size / (1024 * 1024)
+
+        def upload() -> io.BytesIO:
+            # Same interface as Streamlit's UploadedFile
+            file = io.BytesIO(path.read_bytes())
+            file.name = path.name
+            return file
+
+        def add():
+            return repo_manager.add_documents([upload()], collection_name)
+
+        _, metrics = run_stage(self.monitor, 'add', add)
+        self.results.append(stage_record('RepositoryManager', extension, size, 'add', metrics, size_mb))
+
+        # Mirrors the upload flow in app.py; parse time is the wait for each parsed document
+        timings = {'parse': 0.0, 'index': 0.0}
+
+        def ingest():
+            vectorstore = rag.get_existing_vectorstore()
+            pending = repo_manager.get_pending_documents(collection_name, rag.embedding_model)
+            documents_iter = repo_manager.iter_documents(pending)
+            indexed = []
+            while True:
+                start_time = time.perf_counter()
+                item = next(documents_iter, None)
+                timings['parse'] += time.perf_counter() - start_time
+                if item is None:
+                    break
+                doc_info, documents, error = item
+                if error is not None:
+                    raise error
+                start_time = time.perf_counter()
+                rag.index_documents(
+                    vectorstore, documents, [doc_info['id']],
+                    content_hash=doc_info['content_hash'],
+                    document_metadata={'doc_id': doc_info['id'], 'filename': doc_info['filename']}
+                )
+                timings['index'] += time.perf_counter() - start_time
+                indexed.append(doc_info['id'])
+            repo_manager.mark_indexed(indexed, rag.embedding_model)
+
+        _, metrics = run_stage(self.monitor, 'ingest', ingest)
+        self.results.append(stage_record('RepositoryManager', extension, size, 'ingest', metrics,
+                                         size_mb, parse_seconds=timings['parse'],
+                                         index_seconds=timings['index']))
+
+        # Re-uploading unchanged content should be close to free
+        _, metrics = run_stage(self.monitor, 'readd', add)
+        self.results.append(stage_record('RepositoryManager', extension, size, 'readd', metrics, size_mb))
+
+
+def git_commit() -> Optional[str]:
+    """Commit of the working tree being benchmarked, if it is a git checkout"""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(baseline: Dict, current: Dict, tolerance: float) -> List[Dict]:
+    """Stages that got slower than the baseline by more than the tolerance"""
+    def key(record: Dict) -> Tuple:
+        return record['component'], record['format'], record['size'], record['stage']
+
+    previous = {key(record): record for record in baseline['results']}
+    regressions = []
+    for record in current['results']:
+        before = previous.get(key(record))
+        if before is None:
+            continue
+        # Ignore sub-10ms noise on tiny stages
+        if record['seconds'] > before['seconds'] * (1 + tolerance) and \
+                record['seconds'] - before['seconds'] > 0.01:
+            regressions.append({
+                'component': record['component'], 'format': record['format'],
+                'size': record['size'], 'stage': record['stage'],
+                'baseline_seconds': before['seconds'], 'seconds': record['seconds'],
+                'slowdown': record['seconds'] / max(before['seconds'], 1e-9)
+            })
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="End-to-end ingest and query benchmark")
+    parser.add_argument("--formats", nargs="+", help="File extensions to benchmark (default: all supported)")
+    parser.add_argument("--sizes", nargs="+", default=['small', 'medium'], choices=list(CORPUS_SIZES),
+                        help="Corpus sizes")
+    parser.add_argument("--llm", default="mistral", help="Model name served by the fake Ollama server")
+    parser.add_argument("--embedding", default="all-MiniLM-L6-v2", help="Key of EMBEDDING_MODELS")
+    parser.add_argument("--questions", type=int, default=10, help="Questions per corpus")
+    parser.add_argument("--batch-questions", type=int, default=1000,
+                        help="Questions per corpus for batched retrieval")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake Ollama time to first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=200.0, help="Fake Ollama generation speed")
+    parser.add_argument("--response-tokens", type=int, default=64, help="Tokens per fake answer")
+    parser.add_argument("--output", type=Path, default=Path("benchmark_results.json"),
+                        help="Results JSON file")
+    parser.add_argument("--baseline", type=Path, help="Earlier results to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown against the baseline (0.25 = 25%%)")
+    parser.add_argument("--keep-data", action="store_true", help="Keep the temporary data directory")
+    args = parser.parse_args(argv)
+
+    # Everything the app persists goes to a throwaway directory, so runs start cold
+    data_dir = Path(tempfile.mkdtemp(prefix="rag_benchmark_"))
+    server = FakeOllamaServer(latency=args.latency, tokens_per_sec=args.tokens_per_sec,
+                              response_tokens=args.response_tokens, models=[args.llm]).start()
+    os.environ['RAG_DATA_DIR'] = str(data_dir)
+    os.environ['OLLAMA_BASE_URL'] = server.base_url
+    try:
+        from config.settings import SUPPORTED_FORMATS
+
+        formats = args.formats or list(SUPPORTED_FORMATS)
+        generator = CorpusGenerator()
+        corpora = {
+            (extension, size): generator.generate(data_dir / "corpus", extension, CORPUS_SIZES[size])
+            for extension in formats
+            for size in args.sizes
+        }
+
+        start_time = time.time()
+        benchmark = Benchmark(args)
+        results = benchmark.run(corpora)
+        report = {
+            'meta': {
+                'timestamp': datetime.now().isoformat(),
+                'git_commit': git_commit(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'total_seconds': time.time() - start_time,
+                'config': {key: value for key, value in vars(args).items()
+                           if key not in ('output', 'baseline', 'keep_data')}
+            },
+            'results': results,
+            # Finer-grained spans (embed, chroma_write, vector_search, ...) per stage and model
+            'spans': benchmark.monitor.get_stage_stats()
+        }
+    finally:
+        server.stop()
+        if not args.keep_data:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    args.output.write_text(json.dumps(report, indent=2, default=str))
+    print(f"Wrote {len(results)} stage results to {args.output}")
+    for record in results:
+        print(f"{record['component']:18} {record['format']:6} {record['size']:7} "
+              f"{record['stage']:14} {record['seconds']:8.3f}s")
+
+    if args.baseline:
+        regressions = compare(json.loads(args.baseline.read_text()), report, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression['component']} {regression['format']} {regression['size']} "
+                  f"{regression['stage']}: {regression['baseline_seconds']:.3f}s -> "
+                  f"{regression['seconds']:.3f}s ({regression['slowdown']:.2f}x)")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+WORDS = ("the answer is based on the retrieved context which describes the document "
+         "sections relevant to your question").split()
+
+class FakeOllamaServer:
+    """Local stand-in for the Ollama HTTP API with configurable latency and generation speed"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.2,
+                 tokens_per_sec: float = 50.0, response_tokens: int = 64,
+                 models: Optional[List[str]] = None):
+        self.latency = latency
+        self.tokens_per_sec = tokens_per_sec
+        self.response_tokens = response_tokens
+        self.models = models or ["mistral", "llama2", "mixtral"]
+        self.requests = 0
+        self._loaded = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        """URL to use as the Ollama base URL"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_forever(self):
+        """Serve requests on the current thread"""
+        self._server.serve_forever()
+
+    def start(self) -> "FakeOllamaServer":
+        """Serve requests on a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop a server started with start()"""
+        self._server.shutdown()
+        self.close()
+
+    def close(self):
+        """Release the listening socket"""
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeOllamaServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _tokens(self) -> List[str]:
+        """Tokens of a generated answer"""
+        return [WORDS[i % len(WORDS)] + " " for i in range(self.response_tokens)]
+
+    def _model_entry(self, name: str) -> Dict:
+        """Model description as returned by /api/tags and /api/ps"""
+        digest = hashlib.sha256(name.encode('utf-8')).hexdigest()
+        return {
+            'name': name,
+            'model': name,
+            'modified_at': datetime.now(timezone.utc).isoformat(),
+            'size': 4 * 1024 ** 3,
+            'digest': digest,
+            'details': {'format': 'gguf', 'family': name, 'parameter_size': '7B',
+                        'quantization_level': 'Q4_0'}
+        }
+
+    def _mark_loaded(self, model: str, keep_alive):
+        """Track models as resident, like Ollama does after a request"""
+        with self._lock:
+            self.requests += 1
+            if keep_alive in (0, "0", "0s"):
+                self._loaded.pop(model, None)
+            else:
+                self._loaded[model] = time.time()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _body(self) -> Dict:
+                length = int(self.headers.get('Content-Length') or 0)
+                return json.loads(self.rfile.read(length) or b'{}') if length else {}
+
+            def _send_json(self, payload: Dict, status: int = 200):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == '/api/tags':
+                    self._send_json({'models': [server._model_entry(name) for name in server.models]})
+                elif self.path == '/api/ps':
+                    with server._lock:
+                        loaded = list(server._loaded)
+                    self._send_json({'models': [
+                        dict(server._model_entry(name), size_vram=0, expires_at=None)
+                        for name in loaded
+                    ]})
+                elif self.path in ('/', '/api/version'):
+                    self._send_json({'version': '0.0.0-fake'})
+                else:
+                    self._send_json({'error': 'not found'}, 404)
+
+            def do_HEAD(self):
+                self.send_response(200)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def do_POST(self):
+                body = self._body()
+                if self.path == '/api/show':
+                    name = body.get('name') or body.get('model')
+                    if name not in server.models:
+                        self._send_json({'error': f"model '{name}' not found"}, 404)
+                    else:
+                        self._send_json({
+                            'modelfile': f"FROM {name}",
+                            'parameters': 'num_ctx 4096',
+                            'template': '{{ .Prompt }}',
+                            'details': server._model_entry(name)['details']
+                        })
+                elif self.path in ('/api/generate', '/api/chat'):
+                    self._generate(body, chat=self.path == '/api/chat')
+                elif self.path in ('/api/embeddings', '/api/embed'):
+                    self._embed(body)
+                else:
+                    self._send_json({'error': 'not found'}, 404)
+
+            def _generate(self, body: Dict, chat: bool):
+                model = body.get('model', '')
+                server._mark_loaded(model, body.get('keep_alive'))
+                # An empty prompt only loads (or unloads) the model
+                if not body.get('prompt') and not body.get('messages'):
+                    self._send_json({'model': model, 'response': '', 'done': True})
+                    return
+
+                start_time = time.perf_counter()
+                time.sleep(server.latency)
+                tokens = server._tokens()
+                interval = 1.0 / server.tokens_per_sec if server.tokens_per_sec > 0 else 0.0
+
+                def chunk(token: str, done: bool) -> Dict:
+                    payload = {'model': model, 'created_at': datetime.now(timezone.utc).isoformat(),
+                               'done': done}
+                    if chat:
+                        payload['message'] = {'role': 'assistant', 'content': token}
+                    else:
+                        payload['response'] = token
+                    if done:
+                        payload.update({
+                            'total_duration': int((time.perf_counter() - start_time) * 1e9),
+                            'eval_count': len(tokens),
+                            'eval_duration': int(len(tokens) * interval * 1e9)
+                        })
+                    return payload
+
+                if body.get('stream', True) is False:
+                    time.sleep(interval * len(tokens))
+                    self._send_json(chunk("".join(tokens), True))
+                    return
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                for token in tokens:
+                    time.sleep(interval)
+                    self._write_chunk(json.dumps(chunk(token, False)) + "\n")
+                self._write_chunk(json.dumps(chunk("", True)) + "\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _write_chunk(self, text: str):
+                data = text.encode('utf-8')
+                self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+                self.wfile.flush()
+
+            def _embed(self, body: Dict):
+                texts = body.get('input') or body.get('prompt') or ''
+                texts = [texts] if isinstance(texts, str) else texts
+                vectors = [
+                    [b / 255.0 for b in hashlib.sha256(text.encode('utf-8')).digest()]
+                    for text in texts
+                ]
+                if self.path == '/api/embed':
+                    self._send_json({'model': body.get('model'), 'embeddings': vectors})
+                else:
+                    self._send_json({'embedding': vectors[0]})
+
+        return Handler
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Serve a fake Ollama API for benchmarks and offline runs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds before the first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=50.0, help="Generation speed")
+    parser.add_argument("--response-tokens", type=int, default=64, help="Tokens per answer")
+    args = parser.parse_args(argv)
+
+    server = FakeOllamaServer(args.host, args.port, args.latency, args.tokens_per_sec,
+                              args.response_tokens)
+    print(f"Fake Ollama listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
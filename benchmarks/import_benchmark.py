@@ -0,0 +1,158 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Modules on the app's startup path, cheapest first; importing app runs its component setup but not main()
+MODULES = [
+    'config.settings',
+    'utils.document_loader',
+    'utils.resource_pool',
+    'utils.rag_optimizer',
+    'utils.repository_manager',
+    'app'
+]
+
+# Packages that should only be imported once a feature needs them
+HEAVY_PACKAGES = [
+    'pandas',
+    'chromadb',
+    'torch',
+    'sentence_transformers',
+    'transformers',
+    'langchain.chains',
+    'langchain_community',
+    'httpx'
+]
+
+IMPORT_SCRIPT = """
+import sys, json, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'heavy': [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+# Streamlit re-executes the script on every interaction with the imported modules kept in sys.modules
+RERUN_SCRIPT = """
+import json, time, runpy
+times = []
+for _ in range({reruns}):
+    start = time.perf_counter()
+    runpy.run_path('app.py', run_name='__rerun__')
+    times.append(time.perf_counter() - start)
+print(json.dumps(times))
+"""
+
+
+def run_python(script: str, data_dir: Path, importtime: bool = False) -> subprocess.CompletedProcess:
+    """Run a script in a fresh interpreter against a throwaway data directory"""
+    env = dict(os.environ, RAG_DATA_DIR=str(data_dir), PYTHONDONTWRITEBYTECODE='1')
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', script]
+    return subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+
+
+def failure(result: subprocess.CompletedProcess) -> str:
+    """Last line of a failed run's traceback"""
+    lines = [line for line in result.stderr.splitlines() if line and not line.startswith('import time:')]
+    return lines[-1] if lines else f"exit code {result.returncode}"
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """Imports and their cumulative time, including nested ones, from a -X importtime report"""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        imports.append({'module': name.strip(), 'ms': int(cumulative) / 1000})
+    return imports
+
+
+def startup_modules(data_dir: Path) -> set:
+    """Modules the interpreter and the timing script import before the module under test"""
+    result = run_python("import sys, json, time", data_dir, importtime=True)
+    return {entry['module'] for entry in parse_importtime(result.stderr)}
+
+
+def cold_import(module: str, runs: int, top: int, data_dir: Path, exclude: set) -> Dict:
+    """Time importing a module in fresh interpreters"""
+    script = IMPORT_SCRIPT.format(module=module, heavy=HEAVY_PACKAGES)
+    timings, report = [], None
+    for _ in range(runs):
+        result = run_python(script, data_dir)
+        if result.returncode != 0:
+            return {'module': module, 'error': failure(result)}
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        timings.append(report['seconds'])
+
+    profile = run_python(script, data_dir, importtime=True)
+    return {
+        'module': module,
+        'ms': float(np.median(timings)) * 1000,
+        'min_ms': min(timings) * 1000,
+        'heavy_loaded': report['heavy'],
+        'top_imports': sorted((entry for entry in parse_importtime(profile.stderr)
+                               if entry['module'] not in exclude),
+                              key=lambda entry: entry['ms'], reverse=True)[:top]
+    }
+
+
+def rerun_overhead(reruns: int, data_dir: Path) -> Dict:
+    """Time the first run of app.py and the reruns after it in one interpreter"""
+    result = run_python(RERUN_SCRIPT.format(reruns=reruns + 1), data_dir)
+    if result.returncode != 0:
+        return {'error': failure(result)}
+    times = json.loads(result.stdout.strip().splitlines()[-1])
+    return {
+        'first_run_ms': times[0] * 1000,
+        'rerun_ms': float(np.median(times[1:])) * 1000,
+        'rerun_p95_ms': float(np.percentile(times[1:], 95)) * 1000
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Cold import time and per-rerun overhead of the app")
+    parser.add_argument("--modules", nargs="+", default=MODULES, help="Modules to import")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per module")
+    parser.add_argument("--reruns", type=int, default=20, help="Reruns of app.py after the first run")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to report per module")
+    parser.add_argument("--output", type=Path, default=Path("import_benchmark.json"),
+                        help="Results JSON file")
+    args = parser.parse_args(argv)
+
+    data_dir = Path(tempfile.mkdtemp(prefix="rag_import_benchmark_"))
+    try:
+        exclude = startup_modules(data_dir)
+        imports = [cold_import(module, args.runs, args.top, data_dir, exclude) for module in args.modules]
+        rerun = rerun_overhead(args.reruns, data_dir)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    args.output.write_text(json.dumps({'python': sys.version.split()[0], 'imports': imports,
+                                       'rerun': rerun}, indent=2))
+    print(f"{'module':26} {'cold ms':>9}  heavy packages loaded")
+    for record in imports:
+        if 'error' in record:
+            print(f"{record['module']:26} {'failed':>9}  {record['error']}")
+        else:
+            print(f"{record['module']:26} {record['ms']:9.1f}  {', '.join(record['heavy_loaded']) or '-'}")
+    if 'error' in rerun:
+        print(f"app.py rerun failed: {rerun['error']}")
+    else:
+        print(f"app.py first run {rerun['first_run_ms']:.1f} ms, rerun p50 {rerun['rerun_ms']:.2f} ms, "
+              f"p95 {rerun['rerun_p95_ms']:.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
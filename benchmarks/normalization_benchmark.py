@@ -0,0 +1,100 @@
+import re
+import sys
+import json
+import time
+import random
+import argparse
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from utils.text_normalizer import TextNormalizer
+from config.settings import INGEST_WORKERS
+
+WORDS = ("retrieval augmented generation index vector query model embedding chunk token "
+         "document page section table result latency throughput memory cache batch").split()
+
+# Characters found in text extracted from PDFs and Office documents
+NOISE = {
+    'ascii': [],
+    'typographic': ['\u201c', '\u201d', '\u2019', '\u2013', '\u2014', '\u00a0'],
+    'extracted': ['\u2022', '\u00ad', '\u200b', '\ufeff', '\u00a9', '\x0c', '\t', '\u25aa']
+}
+
+def legacy_process_text(text: str) -> str:
+    """The four-pass normalization RAGOptimizer.process_text used before TextNormalizer"""
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'["""]', '"', text)
+    text = re.sub(r'[''`]', "'", text)
+    text = re.sub(r'[^\w\s.,!?;:()"\'-]', '', text)
+    return text.strip()
+
+
+def synthetic_chunks(size_mb: float, noise: List[str], chunk_chars: int = 1000,
+                     seed: int = 0) -> List[str]:
+    """Generate chunk-sized texts totalling about size_mb, with noise characters mixed in"""
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    chunks, total = [], 0
+    while total < target:
+        words = []
+        length = 0
+        while length < chunk_chars:
+            word = rng.choice(WORDS)
+            if noise and rng.random() < 0.05:
+                word = rng.choice(noise) + word
+            words.append(word)
+            length += len(word) + 1
+        text = " ".join(words)
+        chunks.append(text)
+        total += len(text.encode('utf-8'))
+    return chunks
+
+
+def throughput(function: Callable[[], object], size_mb: float, repeat: int) -> Dict:
+    """Best-of-repeat wall time and MB/s of a function"""
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start_time)
+    best = max(min(timings), 1e-9)
+    return {'seconds': best, 'mb_per_sec': size_mb / best}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Measure text normalization throughput per MB")
+    parser.add_argument("--size-mb", type=float, default=16.0, help="Size of each synthetic corpus")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is kept)")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS,
+                        help="Processes for the parallel batch measurement")
+    parser.add_argument("--output", type=Path, help="Write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = []
+    for corpus, noise in NOISE.items():
+        chunks = synthetic_chunks(args.size_mb, noise)
+        size_mb = sum(len(chunk.encode('utf-8')) for chunk in chunks) / (1024 * 1024)
+        results.append({
+            'corpus': corpus,
+            'input_mb': size_mb,
+            'chunks': len(chunks),
+            'legacy': throughput(lambda: [legacy_process_text(c) for c in chunks], size_mb, args.repeat),
+            'normalize': throughput(lambda: [TextNormalizer.normalize(c) for c in chunks],
+                                    size_mb, args.repeat),
+            'batch': throughput(lambda: TextNormalizer.normalize_batch(chunks, 1), size_mb, args.repeat),
+            'batch_parallel': dict(
+                throughput(lambda: TextNormalizer.normalize_batch(chunks, args.workers),
+                           size_mb, args.repeat),
+                workers=args.workers
+            )
+        })
+
+    output = json.dumps({'results': results}, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from benchmarks.corpus import CorpusGenerator, CORPUS_SIZES, WORDS
+
+# Project modules read RAG_DATA_DIR when config.settings is first imported, so they are
+# imported only after it points at a throwaway directory.
+
+def corpus_chunks(data_dir: Path, size: str, sentences_per_chunk: int = 4) -> List[str]:
+    """Chunks of a synthetic text corpus, a few sentences each"""
+    path = CorpusGenerator().generate(data_dir / "corpus", '.txt', CORPUS_SIZES[size])
+    sentences = [s.strip() + "." for s in path.read_text(encoding='utf-8').split(".") if s.strip()]
+    return [" ".join(sentences[i:i + sentences_per_chunk])
+            for i in range(0, len(sentences), sentences_per_chunk)]
+
+
+def corpus_queries(count: int) -> List[str]:
+    """Short keyword questions over the corpus vocabulary"""
+    return [f"What is said about {WORDS[i % len(WORDS)]} and {WORDS[(7 * i + 3) % len(WORDS)]}?"
+            for i in range(count)]
+
+
+def synthetic_vectors(count: int, queries: int, dim: int, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Clustered random vectors and nearby queries, for collections larger than a model can embed quickly"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(16, count // 250), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), count)] + \
+        rng.normal(scale=0.6, size=(count, dim)).astype(np.float32)
+    picks = vectors[rng.integers(0, count, queries)]
+    return vectors, picks + rng.normal(scale=0.3, size=picks.shape).astype(np.float32)
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int, block: int = 65536) -> np.ndarray:
+    """Ground-truth nearest rows by cosine similarity"""
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+    best_rows = np.empty((len(queries), 0), dtype=np.int64)
+    best_scores = np.empty((len(queries), 0), dtype=np.float32)
+    for start in range(0, len(vectors), block):
+        scores = queries @ vectors[start:start + block].T
+        rows = np.broadcast_to(np.arange(start, start + scores.shape[1]), scores.shape)
+        best_rows = np.concatenate([best_rows, rows], axis=1)
+        best_scores = np.concatenate([best_scores, scores], axis=1)
+        if best_scores.shape[1] > k:
+            top = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+            best_rows = np.take_along_axis(best_rows, top, axis=1)
+            best_scores = np.take_along_axis(best_scores, top, axis=1)
+    return best_rows
+
+
+def directory_bytes(path: Path, exclude: Tuple[str, ...] = ()) -> int:
+    """Total size of the files under a directory"""
+    return sum(file.stat().st_size for file in Path(path).rglob('*')
+               if file.is_file() and file.name not in exclude)
+
+
+def recall(results: List[List[int]], truth: np.ndarray) -> float:
+    """Mean fraction of the true top k found"""
+    k = truth.shape[1]
+    return float(np.mean([len(set(rows) & set(true_rows.tolist())) / k
+                          for rows, true_rows in zip(results, truth)]))
+
+
+def latency_ms(latencies: List[float]) -> Dict:
+    """Median and tail latency in milliseconds"""
+    values = np.array(latencies or [0.0]) * 1000
+    return {'p50': float(np.percentile(values, 50)), 'p95': float(np.percentile(values, 95))}
+
+
+def bench_chroma(work_dir: Path, vectors: np.ndarray, queries: np.ndarray, k: int,
+                 batch_size: int = 4096) -> Dict:
+    """Build, query and measure a Chroma collection (HNSW over float32 vectors)"""
+    from langchain.vectorstores import Chroma
+
+    persist_directory = work_dir / "chroma"
+    store = Chroma(collection_name="bench", persist_directory=str(persist_directory))
+    start_time = time.perf_counter()
+    for start in range(0, len(vectors), batch_size):
+        batch = vectors[start:start + batch_size]
+        store._collection.add(ids=[str(start + i) for i in range(len(batch))], embeddings=batch.tolist())
+    store.persist()
+    build_seconds = time.perf_counter() - start_time
+
+    results, latencies = [], []
+    for query in queries:
+        start_time = time.perf_counter()
+        ids = store._collection.query(query_embeddings=[query.tolist()], n_results=k,
+                                      include=[])['ids'][0]
+        latencies.append(time.perf_counter() - start_time)
+        results.append([int(id) for id in ids])
+
+    # HNSW keeps its vectors and graph in memory; the SQLite file holds ids and metadata
+    memory_bytes = directory_bytes(persist_directory, exclude=('chroma.sqlite3', 'chroma-embeddings.parquet',
+                                                               'chroma-collections.parquet'))
+    report = {
+        'build_seconds': build_seconds,
+        'latency_ms': latency_ms(latencies),
+        'results': results,
+        'memory_bytes': memory_bytes or vectors.size * 4,
+        'disk_bytes': directory_bytes(persist_directory)
+    }
+    store.delete_collection()
+    return report
+
+
+def bench_quantized(work_dir: Path, quantization: str, vectors: np.ndarray, queries: np.ndarray,
+                    k: int, batch_size: int = 4096) -> Dict:
+    """Build, query and measure a quantized memory-mapped collection"""
+    from utils.quantized_store import QuantizedCollection
+    from config.settings import VECTOR_PQ_TRAIN_SIZE
+
+    # Small corpora still train PQ codebooks, on everything they have
+    collection = QuantizedCollection(work_dir / quantization, quantization,
+                                     pq_train_size=min(VECTOR_PQ_TRAIN_SIZE, len(vectors)))
+    start_time = time.perf_counter()
+    for start in range(0, len(vectors), batch_size):
+        batch = vectors[start:start + batch_size]
+        collection.upsert([str(start + i) for i in range(len(batch))], batch)
+    build_seconds = time.perf_counter() - start_time
+
+    normalized = collection._normalize(queries)
+    results, latencies = [], []
+    for query in normalized:
+        start_time = time.perf_counter()
+        rows, _ = collection.search(query[None, :], k)
+        latencies.append(time.perf_counter() - start_time)
+        results.append(rows[0])
+
+    start_time = time.perf_counter()
+    collection.search(normalized, k)
+    batch_seconds = time.perf_counter() - start_time
+
+    report = {
+        'build_seconds': build_seconds,
+        'latency_ms': latency_ms(latencies),
+        'batch_queries_per_sec': len(queries) / max(batch_seconds, 1e-9),
+        'results': results,
+        'memory_bytes': collection.memory_bytes(),
+        'disk_bytes': collection.disk_bytes()
+    }
+    collection.drop()
+    return report
+
+
+def run(name: str, vectors: np.ndarray, queries: np.ndarray, backends: List[str], k: int,
+        work_dir: Path) -> List[Dict]:
+    """Recall and memory of each backend on one set of vectors"""
+    truth = exact_top_k(vectors, queries, k)
+    float_bytes = vectors.shape[0] * vectors.shape[1] * 4
+    records = []
+    for backend in backends:
+        if backend == 'chroma':
+            report = bench_chroma(work_dir, vectors, queries, k)
+        else:
+            report = bench_quantized(work_dir, backend, vectors, queries, k)
+        results = report.pop('results')
+        record = {
+            'model': name,
+            'backend': backend,
+            'vectors': int(vectors.shape[0]),
+            'dim': int(vectors.shape[1]),
+            f'recall@{k}': recall(results, truth),
+            'memory_mb': report['memory_bytes'] / (1024 * 1024),
+            'disk_mb': report['disk_bytes'] / (1024 * 1024),
+            'memory_vs_float32': report['memory_bytes'] / float_bytes
+        }
+        record.update({key: value for key, value in report.items()
+                       if key not in ('memory_bytes', 'disk_bytes')})
+        records.append(record)
+    return records
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Recall versus memory of the vector storage backends")
+    parser.add_argument("--models", nargs="+", help="Keys of EMBEDDING_MODELS (default: all)")
+    parser.add_argument("--size", default='large', choices=list(CORPUS_SIZES), help="Text corpus size")
+    parser.add_argument("--synthetic", type=int, metavar="N",
+                        help="Benchmark N clustered random vectors instead of embedding a corpus")
+    parser.add_argument("--dim", type=int, default=384, help="Dimension of synthetic vectors")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10, help="Results per query")
+    parser.add_argument("--backends", nargs="+", default=['chroma', 'int8', 'pq'],
+                        choices=['chroma', 'int8', 'pq'])
+    parser.add_argument("--output", type=Path, default=Path("vector_benchmark.json"),
+                        help="Results JSON file")
+    args = parser.parse_args(argv)
+
+    data_dir = Path(tempfile.mkdtemp(prefix="rag_vector_benchmark_"))
+    os.environ['RAG_DATA_DIR'] = str(data_dir)
+    try:
+        records = []
+        if args.synthetic:
+            vectors, queries = synthetic_vectors(args.synthetic, args.queries, args.dim)
+            records += run('synthetic', vectors, queries, args.backends, args.k, data_dir)
+        else:
+            from utils.resource_pool import get_resource_pool
+            from config.settings import EMBEDDING_MODELS
+
+            chunks = corpus_chunks(data_dir, args.size)
+            for name in args.models or list(EMBEDDING_MODELS):
+                embeddings = get_resource_pool().get_embeddings(EMBEDDING_MODELS[name])
+                vectors = np.array(embeddings.embed_documents(chunks), dtype=np.float32)
+                queries = np.array(embeddings.embed_documents(corpus_queries(args.queries)),
+                                   dtype=np.float32)
+                records += run(name, vectors, queries, args.backends, args.k, data_dir)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    args.output.write_text(json.dumps({'k': args.k, 'results': records}, indent=2))
+    print(f"{'model':20} {'backend':7} {'vectors':>8} {'recall':>7} {'memory MB':>10} "
+          f"{'vs f32':>7} {'p50 ms':>7}")
+    for record in records:
+        print(f"{record['model']:20} {record['backend']:7} {record['vectors']:8d} "
+              f"{record[f'recall@{args.k}']:7.3f} {record['memory_mb']:10.2f} "
+              f"{record['memory_vs_float32']:7.3f} {record['latency_ms']['p50']:7.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
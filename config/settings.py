@@ -1,22 +1,13 @@
 import os
 from pathlib import Path
-from chromadb.config import Settings
 
 # Directory Configuration
-BASE_DIR = Path(__file__).parent.parent
+# Data root; RAG_DATA_DIR points the app (or a benchmark run) at another one
+BASE_DIR = Path(os.environ.get("RAG_DATA_DIR", Path(__file__).parent.parent))
 UPLOAD_DIRECTORY = BASE_DIR / "uploaded_documents"
 PERSIST_DIRECTORY = BASE_DIR / "db"
-METADATA_FILE = BASE_DIR / "document_metadata.json"
+METADATA_FILE = BASE_DIR / "document_metadata.json"  # legacy, migrated into INDEX_DATABASE
 
-# Create necessary directories
-UPLOAD_DIRECTORY.mkdir(parents=True, exist_ok=True)
-PERSIST_DIRECTORY.mkdir(parents=True, exist_ok=True)
-
-# Chroma Settings
-CHROMA_SETTINGS = Settings(
-    persist_directory=str(PERSIST_DIRECTORY),
-    anonymized_telemetry=False
-)
 
 # Supported File Types
 SUPPORTED_FORMATS = {
@@ -29,10 +20,14 @@ SUPPORTED_FORMATS = {
 
 
 REPOSITORY_DIR = BASE_DIR / "document_repository"
-REPOSITORY_INDEX = REPOSITORY_DIR / "repository_index.json"
+REPOSITORY_INDEX = REPOSITORY_DIR / "repository_index.json"  # legacy, migrated into INDEX_DATABASE
+INDEX_DATABASE = REPOSITORY_DIR / "repository_index.db"
+
+BLOB_DIR = BASE_DIR / "blobs"  # content-addressed document files
+PARSE_CACHE_DIR = BASE_DIR / "parse_cache"
 
-# Create repository directory
-REPOSITORY_DIR.mkdir(parents=True, exist_ok=True)
+EMBEDDING_CACHE_DIR = BASE_DIR / "embedding_cache"
+EMBEDDING_CACHE_MAX_MB = 512
 
 # Model Settings
 EMBEDDING_MODELS = {
@@ -40,6 +35,84 @@ EMBEDDING_MODELS = {
     "multi-qa-MiniLM-L6": "sentence-transformers/multi-qa-MiniLM-L6-cos-v1",
     "all-mpnet-base-v2": "sentence-transformers/all-mpnet-base-v2",
 }
+OLLAMA_BASE_URL = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
+OLLAMA_CONNECT_TIMEOUT = 2  # seconds
+OLLAMA_READ_TIMEOUT = 10  # seconds, for metadata calls
+OLLAMA_POOL_SIZE = 4  # keep-alive connections
+OLLAMA_HEALTH_INTERVAL = 5  # seconds between background health probes
+OLLAMA_MODELS_TTL = 30  # seconds the installed model list is cached
+OLLAMA_MODEL_INFO_TTL = 300  # seconds model details are cached
+OLLAMA_PS_TTL = 5  # seconds the list of loaded models is cached
+OLLAMA_LOAD_TIMEOUT = 300  # seconds a model warm-up may take
+WARMUP_RETRY_INTERVAL = 120  # seconds before a failed warm-up is retried on its own
+
+# Keep-Alive Settings (seconds Ollama keeps a model loaded after a request)
+KEEP_ALIVE_MIN = 300
+KEEP_ALIVE_MAX = 3600
+KEEP_ALIVE_HISTORY = 20  # recent uses per model considered
+
+# Embedding Settings
+EMBEDDING_BATCH_SIZE = 64
+EMBEDDING_THREADS = os.cpu_count() or 1  # torch intra-op threads on CPU
+
+# Performance Metrics Settings
+METRICS_FILE = BASE_DIR / "performance_metrics.json"
+METRICS_FLUSH_INTERVAL = 30  # seconds between flushes of stage latencies and traces
+METRICS_MAX_ENTRIES = 1000  # logged metric records kept in memory
+METRICS_WINDOW = 1024  # latencies kept per stage and model for percentiles
+METRICS_MAX_TRACES = 50  # finished traces kept for inspection
+METRICS_MAX_CHILDREN = 32  # child spans kept per span; later ones are summed per stage
+
+# Vector Storage Settings
+VECTOR_BACKEND = "chroma"  # or "quantized": compact codes in memory-mapped files for large collections
+VECTOR_STORE_DIR = BASE_DIR / "vector_store"
+VECTOR_QUANTIZATION = "int8"  # "int8" (4x smaller) or "pq" (product quantization, much smaller)
+VECTOR_PQ_SUBSPACES = 48  # PQ code bytes per vector (at most; must divide the dimension)
+VECTOR_PQ_TRAIN_SIZE = 10000  # vectors indexed before PQ codebooks are trained
+VECTOR_RESCORE_FACTOR = 16  # candidates per result rescored with the exact float vectors
+VECTOR_SEARCH_BLOCK = 16384  # vectors scored per NumPy block
+
+# Answer Cache Settings
+ANSWER_CACHE_MAX_ENTRIES = 1000
+ANSWER_CACHE_SEMANTIC = False  # also reuse answers of near-duplicate questions
+ANSWER_CACHE_SIMILARITY = 0.95  # minimum cosine similarity for a near-duplicate
+
+# Retrieval Settings
+BM25_INDEX_FILE = PERSIST_DIRECTORY.parent / "bm25_index.db"
+HYBRID_RETRIEVAL = True  # fuse BM25 and vector results
+HYBRID_FETCH_K = 20  # candidates taken from each retriever before fusion
+RRF_K = 60  # reciprocal-rank fusion constant
+RETRIEVAL_QUERY_BATCH = 1024  # queries embedded and searched together by retrieve_batch
+
+# Context Packing Settings
+CONTEXT_PACKING = True  # over-fetch, de-duplicate and pack chunks into a token budget
+CONTEXT_FETCH_K = 12  # candidates retrieved before packing
+CONTEXT_MMR_LAMBDA = 0.7  # relevance vs. diversity trade-off
+CONTEXT_DUPLICATE_THRESHOLD = 0.95  # cosine similarity above which chunks are duplicates
+RERANKER_MODEL = None  # optional cross-encoder, e.g. "cross-encoder/ms-marco-MiniLM-L-6-v2"
+CONTEXT_TOKEN_BUDGET = {
+    "mistral": 1500,
+    "mixtral": 2000,
+    "llama2": 1000,
+    "default": 1000
+}
+
+# Batch Question Answering Settings
+BATCH_RETRIEVAL_WORKERS = 8
+BATCH_LLM_CONCURRENCY = 2  # concurrent Ollama generations
+
+# Resource Pool Settings
+POOL_MAX_EMBEDDING_MODELS = 2
+POOL_MAX_VECTORSTORES = 8
+POOL_MAX_QA_CHAINS = 16
+POOL_MAX_MEMORY_MB = 4096  # estimated size of all pooled entries, not process memory
+# Assumed size of entries that cannot be measured, such as Chroma handles
+POOL_ENTRY_ESTIMATE_MB = {
+    'embeddings': 500,
+    'rerankers': 500,
+    'vectorstores': 64,
+    'qa_chains': 1
+}
 
 # Document Processing Settings
 CHUNK_SETTINGS = {
@@ -47,4 +120,36 @@ CHUNK_SETTINGS = {
     "mixtral": {"size": 3000, "overlap": 300},
     "llama2": {"size": 1000, "overlap": 100},
     "default": {"size": 1000, "overlap": 100}
-}
\ No newline at end of file
+}
+INGEST_WORKERS = os.cpu_count() or 1
+STREAM_BATCH_SIZE = 256  # pages/rows chunked and embedded together
+STREAM_THRESHOLD_MB = 20  # larger files are loaded lazily instead of in a worker
+
+# Ingest Queue Settings
+INGEST_QUEUE_WORKERS = 1  # background threads indexing queued documents
+INGEST_POLL_INTERVAL = 2  # seconds between queue polls, by workers and the UI
+INGEST_MAX_ATTEMPTS = 3  # a job is marked failed after this many errors
+INGEST_CLAIM_SIZE = 16  # queued documents a worker claims and parses together
+INGEST_JOB_HISTORY = 200  # finished jobs kept for status display
+
+# Token Chunking Settings
+TOKEN_CHUNKING = True  # size chunks in embedding-model tokens along document structure
+CHUNK_OVERLAP_TOKENS = 32
+
+# Text Normalization Settings
+TEXT_NORMALIZATION = True  # normalize chunks the same way as questions
+NORMALIZE_WORKERS = 1  # processes for normalizing large batches of chunks
+
+
+def init_directories():
+    """Create the data directories; called at startup rather than on import"""
+    for directory in (UPLOAD_DIRECTORY, PERSIST_DIRECTORY, REPOSITORY_DIR):
+        directory.mkdir(parents=True, exist_ok=True)
+
+
+def __getattr__(name):
+    # Chroma Settings, built on first access so importing settings does not import chromadb
+    if name == 'CHROMA_SETTINGS':
+        from chromadb.config import Settings
+        return Settings(persist_directory=str(PERSIST_DIRECTORY), anonymized_telemetry=False)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
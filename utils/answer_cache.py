@@ -0,0 +1,118 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, List, Dict, Optional, Tuple
+import numpy as np
+from config.settings import (
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_SEMANTIC,
+    ANSWER_CACHE_SIMILARITY
+)
+
+class AnswerCache:
+    """LRU cache of answers keyed by (collection version, LLM model, normalized question)"""
+
+    _PUNCTUATION = re.compile(r'[\s?.!]+$')
+    _WHITESPACE = re.compile(r'\s+')
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+                 semantic: bool = ANSWER_CACHE_SEMANTIC,
+                 similarity_threshold: float = ANSWER_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.semantic = semantic
+        self.similarity_threshold = similarity_threshold
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def normalize_question(self, question: str) -> str:
+        """Normalize a question for exact matching"""
+        question = self._WHITESPACE.sub(' ', question.strip().lower())
+        return self._PUNCTUATION.sub('', question)
+
+    def _key(self, collection_name: str, version: int, llm_model: str,
+             question: str) -> Tuple[str, int, str, str]:
+        """Cache key for a question"""
+        return (collection_name, version, llm_model, self.normalize_question(question))
+
+    def get(self, collection_name: str, version: int, llm_model: str, question: str,
+            embedding: Optional[List[float]] = None) -> Optional[Dict[str, Any]]:
+        """Get a cached answer and its sources for the question or, in semantic mode, a near-duplicate"""
+        key = self._key(collection_name, version, llm_model, question)
+        with self._lock:
+            if key in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return self._result(self.entries[key])
+
+            if self.semantic and embedding is not None:
+                match = self._find_similar(key[:3], embedding)
+                if match is not None:
+                    self.semantic_hits += 1
+                    self.entries.move_to_end(match)
+                    return self._result(self.entries[match])
+
+            self.misses += 1
+            return None
+
+    @staticmethod
+    def _result(entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer and sources of a cache entry"""
+        return {'answer': entry['answer'], 'sources': entry['sources']}
+
+    def _find_similar(self, scope: Tuple[str, int, str], embedding: List[float]) -> Optional[Tuple]:
+        """Find the most similar cached question within the threshold"""
+        candidates = [key for key, entry in self.entries.items()
+                      if key[:3] == scope and entry['embedding'] is not None]
+        if not candidates:
+            return None
+        matrix = np.array([self.entries[key]['embedding'] for key in candidates], dtype=np.float32)
+        query = np.asarray(embedding, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+        similarities = matrix @ query / np.maximum(norms, 1e-12)
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self.similarity_threshold:
+            return candidates[best]
+        return None
+
+    def put(self, collection_name: str, version: int, llm_model: str, question: str,
+            answer: str, sources: Optional[List[Any]] = None,
+            embedding: Optional[List[float]] = None):
+        """Store an answer and the source chunks it was generated from"""
+        key = self._key(collection_name, version, llm_model, question)
+        with self._lock:
+            self.entries[key] = {'answer': answer, 'sources': sources or [], 'embedding': embedding}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, collection_name: str):
+        """Drop all answers for a collection"""
+        with self._lock:
+            for key in [key for key in self.entries if key[0] == collection_name]:
+                del self.entries[key]
+
+    def get_stats(self) -> Dict[str, float]:
+        """Get cache hit-rate metrics"""
+        lookups = self.hits + self.semantic_hits + self.misses
+        return {
+            'hits': self.hits,
+            'semantic_hits': self.semantic_hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits + self.semantic_hits) / lookups if lookups else 0.0,
+            'entries': len(self.entries)
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_answer_cache() -> AnswerCache:
+    """Get the process-wide answer cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AnswerCache()
+        return _cache
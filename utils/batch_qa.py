@@ -0,0 +1,128 @@
+import sys
+import json
+import time
+import argparse
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Iterator, Optional
+from utils.rag_optimizer import RAGOptimizer
+from config.settings import EMBEDDING_MODELS, BATCH_RETRIEVAL_WORKERS, BATCH_LLM_CONCURRENCY, init_directories
+
+class BatchQA:
+    """Answers batches of questions against a collection without the Streamlit UI"""
+
+    def __init__(self, llm_model: str, embedding_model: str, collection_name: str = "default",
+                 k: int = 4, retrieval_workers: int = BATCH_RETRIEVAL_WORKERS,
+                 llm_concurrency: int = BATCH_LLM_CONCURRENCY):
+        self.rag = RAGOptimizer(llm_model, embedding_model, collection_name)
+        self.vectorstore = self.rag.get_existing_vectorstore()
+        self.retriever = self.rag.get_retriever(self.vectorstore, k)
+        self.llm = self.rag.get_llm()
+        self.k = k
+        self.retrieval_workers = retrieval_workers
+        self._llm_slots = threading.Semaphore(llm_concurrency)
+
+    def answer(self, question_id: str, question: str) -> Dict:
+        """Answer one question, recording retrieval and generation latency"""
+        start_time = time.time()
+        result = {'id': question_id, 'question': question}
+        try:
+            processed_question = self.rag.process_text(question)
+            sources = self.retriever.get_relevant_documents(processed_question)
+            retrieval_time = time.time() - start_time
+
+            # Retrieval runs freely; only generation is limited to keep Ollama saturated, not swamped
+            with self._llm_slots:
+                generation_start = time.time()
+                answer = self.llm.invoke(self.rag.build_prompt(processed_question, sources))
+                generation_time = time.time() - generation_start
+
+            result.update({
+                'answer': answer,
+                'sources': [
+                    {'content': doc.page_content, 'metadata': doc.metadata}
+                    for doc in sources
+                ],
+                'retrieval_time': retrieval_time,
+                'generation_time': generation_time
+            })
+        except Exception as e:
+            result['error'] = str(e)
+        result['total_time'] = time.time() - start_time
+        return result
+
+    def run(self, questions: List[Dict]) -> Iterator[Dict]:
+        """Answer questions concurrently, yielding results as they complete"""
+        with ThreadPoolExecutor(max_workers=self.retrieval_workers) as executor:
+            futures = [
+                executor.submit(self.answer, question['id'], question['question'])
+                for question in questions
+            ]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def run_file(self, questions_file: Path, output_file: Path) -> int:
+        """Answer a file of questions and write results to JSONL, returning the count"""
+        count = 0
+        with open(output_file, 'w') as f:
+            for result in self.run(load_questions(questions_file)):
+                f.write(json.dumps(result, default=str) + "\n")
+                f.flush()
+                count += 1
+        return count
+
+
+def load_questions(questions_file: Path) -> List[Dict]:
+    """Load questions from a .jsonl file ({"id", "question"}) or a text file with one per line"""
+    questions_file = Path(questions_file)
+    questions = []
+    with open(questions_file, 'r') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            if questions_file.suffix.lower() == '.jsonl':
+                record = json.loads(line)
+                questions.append({
+                    'id': str(record.get('id', line_number)),
+                    'question': record['question']
+                })
+            else:
+                questions.append({'id': str(line_number), 'question': line})
+    return questions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Answer a file of questions against a collection")
+    parser.add_argument("questions", type=Path, help="Questions file (.txt or .jsonl)")
+    parser.add_argument("output", type=Path, help="Output JSONL file")
+    parser.add_argument("--llm", required=True, help="Ollama model name")
+    parser.add_argument("--embedding", default=next(iter(EMBEDDING_MODELS)),
+                        choices=list(EMBEDDING_MODELS), help="Embedding model")
+    parser.add_argument("--collection", default="default", help="Collection name")
+    parser.add_argument("--k", type=int, default=4, help="Chunks retrieved per question")
+    parser.add_argument("--workers", type=int, default=BATCH_RETRIEVAL_WORKERS,
+                        help="Concurrent questions")
+    parser.add_argument("--llm-concurrency", type=int, default=BATCH_LLM_CONCURRENCY,
+                        help="Concurrent Ollama generations")
+    args = parser.parse_args(argv)
+
+    init_directories()
+    batch_qa = BatchQA(
+        args.llm,
+        EMBEDDING_MODELS[args.embedding],
+        args.collection,
+        k=args.k,
+        retrieval_workers=args.workers,
+        llm_concurrency=args.llm_concurrency
+    )
+    start_time = time.time()
+    count = batch_qa.run_file(args.questions, args.output)
+    print(f"Answered {count} questions in {time.time() - start_time:.1f}s -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
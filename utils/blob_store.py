@@ -0,0 +1,44 @@
+import os
+import shutil
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Optional
+from config.settings import BLOB_DIR
+
+class BlobStore:
+    """Content-addressed file storage shared by the repository and the upload store"""
+
+    BLOCK_SIZE = 1024 * 1024
+
+    def __init__(self, blob_dir: Path = BLOB_DIR):
+        self.blob_dir = Path(blob_dir)
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def hash_file(file: BinaryIO) -> str:
+        """Calculate SHA-256 of a file object by streaming it in blocks"""
+        sha256 = hashlib.sha256()
+        file.seek(0)
+        for block in iter(lambda: file.read(BlobStore.BLOCK_SIZE), b''):
+            sha256.update(block)
+        file.seek(0)
+        return sha256.hexdigest()
+
+    def path_for(self, content_hash: str, ext: str) -> Path:
+        """Blob path for a content hash; the extension is kept so loaders can be chosen by suffix"""
+        return self.blob_dir / content_hash[:2] / f"{content_hash}{ext.lower()}"
+
+    def put(self, file: BinaryIO, ext: str, content_hash: Optional[str] = None) -> Path:
+        """Store a file object unless a blob with the same content already exists"""
+        content_hash = content_hash or self.hash_file(file)
+        blob_path = self.path_for(content_hash, ext)
+        if blob_path.exists():
+            return blob_path
+
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        file.seek(0)
+        with tempfile.NamedTemporaryFile(dir=blob_path.parent, delete=False) as tmp_file:
+            shutil.copyfileobj(file, tmp_file, self.BLOCK_SIZE)
+        os.replace(tmp_file.name, blob_path)
+        return blob_path
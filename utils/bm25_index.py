@@ -0,0 +1,168 @@
+import re
+import json
+import sqlite3
+import threading
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, List, Optional, Tuple, Union
+from langchain.schema import BaseRetriever, Document
+from config.settings import BM25_INDEX_FILE, HYBRID_FETCH_K, RRF_K
+
+class BM25Index:
+    """Incrementally maintained full-text index over chunk text with BM25 ranking (SQLite FTS5)
+
+    Chunks are kept per vector collection name, since chunking depends on the embedding model.
+    """
+
+    _TOKEN = re.compile(r'\w+', re.UNICODE)
+
+    def __init__(self, database: Path = BM25_INDEX_FILE):
+        self.database = Path(database)
+        self.database.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._adopted = set()
+        self._adopted_lock = threading.Lock()
+        self.connection.execute(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5(
+                content,
+                collection UNINDEXED,
+                doc_id UNINDEXED,
+                metadata UNINDEXED,
+                tokenize = 'porter unicode61'
+            )
+            """
+        )
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Connection for the current thread"""
+        conn = getattr(self._local, 'connection', None)
+        if conn is None:
+            conn = sqlite3.connect(self.database, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = conn
+        return conn
+
+    def add_chunks(self, collection_name: str, chunks: List[Any]):
+        """Index chunk text for a collection"""
+        with self.connection as conn:
+            conn.executemany(
+                "INSERT INTO chunks (content, collection, doc_id, metadata) VALUES (?, ?, ?, ?)",
+                [
+                    (chunk.page_content, collection_name, chunk.metadata.get('doc_id'),
+                     json.dumps(chunk.metadata, default=str))
+                    for chunk in chunks
+                ]
+            )
+
+    def remove_documents(self, collection_name: str, doc_ids: List[str]):
+        """Remove the chunks of repository documents"""
+        with self.connection as conn:
+            conn.executemany(
+                "DELETE FROM chunks WHERE collection = ? AND doc_id = ?",
+                [(collection_name, doc_id) for doc_id in doc_ids]
+            )
+
+    def promote_documents(self, staging_collection: str, collection_name: str, doc_ids: List[str]):
+        """Atomically replace the chunks of documents with those indexed under a staging collection"""
+        with self.connection as conn:
+            conn.executemany(
+                "DELETE FROM chunks WHERE collection = ? AND doc_id = ?",
+                [(collection_name, doc_id) for doc_id in doc_ids]
+            )
+            conn.executemany(
+                "UPDATE chunks SET collection = ? WHERE collection = ? AND doc_id = ?",
+                [(collection_name, staging_collection, doc_id) for doc_id in doc_ids]
+            )
+
+    def adopt_chunks(self, legacy_collection: str, collection_name: str):
+        """Copy chunks indexed under a repository collection name, before chunks were kept per
+        embedding model, to the documents a collection has none for; checked once per process"""
+        with self._adopted_lock:
+            if (legacy_collection, collection_name) in self._adopted:
+                return
+            self._adopted.add((legacy_collection, collection_name))
+        with self.connection as conn:
+            conn.execute(
+                "INSERT INTO chunks (content, collection, doc_id, metadata) "
+                "SELECT content, ?, doc_id, metadata FROM chunks WHERE collection = ? "
+                "AND doc_id NOT IN (SELECT doc_id FROM chunks WHERE collection = ?)",
+                (collection_name, legacy_collection, collection_name)
+            )
+
+    def remove_collection(self, collection_name: str):
+        """Remove all chunks of a collection"""
+        with self.connection as conn:
+            conn.execute("DELETE FROM chunks WHERE collection = ?", (collection_name,))
+
+    def search(self, query: str, k: int = 10,
+               collection_name: Optional[Union[str, List[str]]] = None) -> List[Tuple[Any, float]]:
+        """BM25 search, optionally within one or more collections; returns (document, score) pairs"""
+        terms = self._TOKEN.findall(query.lower())
+        if not terms:
+            return []
+        # Any query term may match; FTS5 ranks by BM25 (lower is better)
+        match = " OR ".join(f'"{term}"' for term in dict.fromkeys(terms))
+        sql = "SELECT content, metadata, bm25(chunks) AS rank FROM chunks WHERE chunks MATCH ?"
+        params = [match]
+        if isinstance(collection_name, str):
+            collection_name = [collection_name]
+        if collection_name is not None:
+            sql += " AND collection IN ({})".format(', '.join('?' * len(collection_name)) or 'NULL')
+            params += collection_name
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(k)
+        return [
+            (Document(page_content=content, metadata=json.loads(metadata)), -rank)
+            for content, metadata, rank in self.connection.execute(sql, params)
+        ]
+
+
+class HybridRetriever(BaseRetriever):
+    """Fuses BM25 and dense vector results with reciprocal-rank fusion"""
+
+    vectorstore: Any
+    bm25_index: Any
+    collection_name: str
+    k: int = 4
+    fetch_k: int = HYBRID_FETCH_K
+    rrf_k: int = RRF_K
+    performance_monitor: Any = None
+
+    def _span(self, name: str):
+        """Trace a stage when a performance monitor is attached"""
+        if self.performance_monitor is None:
+            return nullcontext()
+        return self.performance_monitor.span(name)
+
+    def _get_relevant_documents(self, query: str, *, run_manager: Any = None) -> List[Document]:
+        """Retrieve the top k chunks by fused rank"""
+        with self._span('vector_search'):
+            dense = self.vectorstore.similarity_search(query, k=self.fetch_k)
+        with self._span('bm25_search'):
+            sparse = [doc for doc, _ in self.bm25_index.search(query, self.fetch_k, self.collection_name)]
+
+        scores = {}
+        documents = {}
+        for results in (dense, sparse):
+            for rank, doc in enumerate(results):
+                key = (doc.metadata.get('doc_id'), doc.page_content)
+                scores[key] = scores.get(key, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+                documents.setdefault(key, doc)
+
+        ranked = sorted(scores, key=scores.get, reverse=True)[:self.k]
+        return [documents[key] for key in ranked]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_bm25_index() -> BM25Index:
+    """Get the process-wide BM25 index"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = BM25Index()
+        return _index
@@ -0,0 +1,146 @@
+import re
+from typing import Any, Callable, List, Optional, Tuple
+from langchain.schema import Document
+
+class TokenChunker:
+    """Splits documents into chunks sized in tokens of the embedding model, following document structure"""
+
+    # Each loaded document (PDF page, slide deck, CSV row, ...) is chunked on its own,
+    # so chunks never straddle pages or rows. Headings start a new chunk and
+    # paragraphs are kept whole whenever they fit.
+
+    HEADING = re.compile(
+        r'^(#{1,6}\s+\S.*'                       # markdown heading
+        r'|\d+(\.\d+)*\.?\s+[A-Z][^.!?]{0,80}'   # numbered heading
+        r'|[A-Z][A-Z0-9 ,:&/()\-]{3,80})$'        # all-caps heading
+    )
+    PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+    SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+
+    def __init__(self, tokenizer: Any, max_tokens: int, overlap_tokens: int = 0,
+                 normalize: Optional[Callable[[List[str]], List[str]]] = None):
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.overlap_tokens = min(overlap_tokens, max_tokens // 2)
+        self.normalize = normalize
+
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        """Token counts of texts, without special tokens"""
+        if not texts:
+            return []
+        return [len(ids) for ids in self.tokenizer(texts, add_special_tokens=False)['input_ids']]
+
+    def split_documents(self, documents: List[Any]) -> List[Any]:
+        """Split documents into chunks carrying a 'token_count' metadata entry"""
+        # Tokenize the blocks of all documents in one batch
+        blocks = [self._blocks(document.page_content) for document in documents]
+        counts = iter(self.count_tokens([block for doc_blocks in blocks for block, _ in doc_blocks]))
+
+        texts, metadatas = [], []
+        for document, doc_blocks in zip(documents, blocks):
+            doc_counts = [next(counts) for _ in doc_blocks]
+            for text in self._assemble(doc_blocks, doc_counts):
+                texts.append(text)
+                metadatas.append(dict(document.metadata))
+
+        # Normalize once structure has been used, then record exact counts for budget packing
+        if self.normalize is not None:
+            texts = self.normalize(texts)
+            kept = [i for i, text in enumerate(texts) if text]
+            texts, metadatas = [texts[i] for i in kept], [metadatas[i] for i in kept]
+        chunks = []
+        for text, metadata, token_count in zip(texts, metadatas, self.count_tokens(texts)):
+            metadata['token_count'] = token_count
+            chunks.append(Document(page_content=text, metadata=metadata))
+        return chunks
+
+    def split_text(self, text: str) -> List[str]:
+        """Split one document's text into chunks of at most max_tokens"""
+        blocks = self._blocks(text)
+        return self._assemble(blocks, self.count_tokens([block for block, _ in blocks]))
+
+    def _assemble(self, blocks: List[Tuple[str, bool]], counts: List[int]) -> List[str]:
+        """Greedily merge blocks into chunks, breaking at headings and the token limit"""
+        chunks = []
+        current, current_tokens = [], 0
+        for (block, is_heading), tokens in zip(blocks, counts):
+            if tokens > self.max_tokens:
+                if current:
+                    chunks.append(current)
+                    current, current_tokens = [], 0
+                chunks.extend([(piece, 0)] for piece in self._split_oversized(block))
+                continue
+
+            if current and (is_heading or current_tokens + tokens > self.max_tokens):
+                chunks.append(current)
+                current, current_tokens = self._overlap(current, is_heading)
+                if current_tokens + tokens > self.max_tokens:
+                    current, current_tokens = [], 0
+            current.append((block, tokens))
+            current_tokens += tokens
+        if current:
+            chunks.append(current)
+
+        return ["\n\n".join(block for block, _ in chunk) for chunk in chunks]
+
+    def _blocks(self, text: str) -> List[Tuple[str, bool]]:
+        """Split text into paragraphs, with heading lines as blocks of their own"""
+        blocks = []
+        for paragraph in self.PARAGRAPH_BREAK.split(text):
+            lines = []
+            for line in paragraph.splitlines():
+                if self.HEADING.match(line.strip()):
+                    if lines:
+                        blocks.append(("\n".join(lines).strip(), False))
+                        lines = []
+                    blocks.append((line.strip(), True))
+                else:
+                    lines.append(line)
+            if lines and "\n".join(lines).strip():
+                blocks.append(("\n".join(lines).strip(), False))
+        return blocks
+
+    def _overlap(self, chunk: List[Tuple[str, int]], at_heading: bool) -> Tuple[List[Tuple[str, int]], int]:
+        """Trailing blocks of a finished chunk to repeat at the start of the next one"""
+        if at_heading or not self.overlap_tokens:
+            return [], 0
+        overlap, tokens = [], 0
+        for block, block_tokens in reversed(chunk):
+            if tokens + block_tokens > self.overlap_tokens:
+                break
+            overlap.insert(0, (block, block_tokens))
+            tokens += block_tokens
+        return overlap, tokens
+
+    def _split_oversized(self, block: str) -> List[str]:
+        """Split a block that exceeds max_tokens by sentences, then by token windows"""
+        sentences = self.SENTENCE_BREAK.split(block)
+        pieces, current, current_tokens = [], [], 0
+        for sentence, tokens in zip(sentences, self.count_tokens(sentences)):
+            if tokens > self.max_tokens:
+                if current:
+                    pieces.append(" ".join(current))
+                    current, current_tokens = [], 0
+                pieces.extend(self._split_by_tokens(sentence))
+                continue
+            if current and current_tokens + tokens > self.max_tokens:
+                pieces.append(" ".join(current))
+                current, current_tokens = [], 0
+            current.append(sentence)
+            current_tokens += tokens
+        if current:
+            pieces.append(" ".join(current))
+        return pieces
+
+    def _split_by_tokens(self, text: str) -> List[str]:
+        """Cut text into windows of max_tokens using the tokenizer's character offsets"""
+        offsets = self.tokenizer(text, add_special_tokens=False,
+                                 return_offsets_mapping=True)['offset_mapping']
+        step = self.max_tokens - self.overlap_tokens
+        pieces = []
+        for start in range(0, len(offsets), step):
+            window = offsets[start:start + self.max_tokens]
+            pieces.append(text[window[0][0]:window[-1][1]])
+            if start + self.max_tokens >= len(offsets):
+                break
+        return pieces
@@ -0,0 +1,109 @@
+from contextlib import nullcontext
+from typing import Any, List, Optional
+import numpy as np
+from langchain.schema import BaseRetriever, Document
+from utils.performance_monitor import PerformanceMonitor
+from config.settings import CONTEXT_MMR_LAMBDA, CONTEXT_DUPLICATE_THRESHOLD
+
+class ContextPacker:
+    """Removes near-duplicate chunks, optionally reranks, and packs chunks into a token budget"""
+
+    def __init__(self, embeddings: Any, token_budget: int, reranker: Any = None,
+                 mmr_lambda: float = CONTEXT_MMR_LAMBDA,
+                 duplicate_threshold: float = CONTEXT_DUPLICATE_THRESHOLD,
+                 performance_monitor: Optional[PerformanceMonitor] = None):
+        self.embeddings = embeddings
+        self.token_budget = token_budget
+        self.reranker = reranker
+        self.mmr_lambda = mmr_lambda
+        self.duplicate_threshold = duplicate_threshold
+        self.performance_monitor = performance_monitor
+        self.last_stats = None  # packing stats of the last call, for the request that made it
+
+    @staticmethod
+    def count_tokens(doc: Any) -> int:
+        """Token count of a chunk, estimated when the chunker did not record it"""
+        return doc.metadata.get('token_count') or max(1, len(doc.page_content) // 4)
+
+    def pack(self, query: str, candidates: List[Any], baseline_k: int = 4) -> List[Any]:
+        """Select chunks for the prompt from ranked candidates"""
+        if not candidates:
+            return []
+
+        with self._span('deduplicate', candidates=len(candidates)):
+            selected = self._mmr(query, candidates)
+        if self.reranker is not None:
+            with self._span('rerank', candidates=len(selected)):
+                scores = self.reranker.predict([(query, doc.page_content) for doc in selected])
+            selected = [doc for _, doc in sorted(zip(scores, selected), key=lambda pair: -pair[0])]
+
+        # Greedily fill the budget in rank order, skipping chunks that no longer fit
+        packed = []
+        used_tokens = 0
+        for doc in selected:
+            tokens = self.count_tokens(doc)
+            if used_tokens + tokens <= self.token_budget:
+                packed.append(doc)
+                used_tokens += tokens
+        if not packed:
+            packed = selected[:1]
+            used_tokens = self.count_tokens(packed[0])
+
+        baseline_tokens = sum(self.count_tokens(doc) for doc in candidates[:baseline_k])
+        self.last_stats = {
+            'function_name': 'pack_context',
+            'candidates': len(candidates),
+            'after_dedup': len(selected),
+            'packed': len(packed),
+            'baseline_tokens': baseline_tokens,
+            'prompt_tokens': used_tokens,
+            'tokens_saved': baseline_tokens - used_tokens
+        }
+        if self.performance_monitor is not None:
+            self.performance_monitor.log_metrics(dict(self.last_stats))
+        return packed
+
+    def _span(self, name: str, **attributes):
+        """Trace a stage when a performance monitor is attached"""
+        if self.performance_monitor is None:
+            return nullcontext()
+        return self.performance_monitor.span(name, **attributes)
+
+    def _mmr(self, query: str, candidates: List[Any]) -> List[Any]:
+        """Order candidates by maximal marginal relevance, dropping near-duplicates"""
+        # Chunk vectors come from the embedding cache filled at ingest time
+        vectors = np.array(self.embeddings.embed_documents([doc.page_content for doc in candidates]),
+                           dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        query_vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        query_vector /= max(np.linalg.norm(query_vector), 1e-12)
+
+        relevance = vectors @ query_vector
+        similarity = vectors @ vectors.T
+        remaining = list(range(len(candidates)))
+        order = []
+        while remaining:
+            if order:
+                redundancy = similarity[np.ix_(remaining, order)].max(axis=1)
+            else:
+                redundancy = np.zeros(len(remaining))
+            scores = self.mmr_lambda * relevance[remaining] - (1 - self.mmr_lambda) * redundancy
+            best = remaining[int(np.argmax(scores))]
+            remaining.remove(best)
+            if order and similarity[best, order].max() >= self.duplicate_threshold:
+                continue
+            order.append(best)
+        return [candidates[i] for i in order]
+
+
+class PackedRetriever(BaseRetriever):
+    """Over-fetches from a base retriever and packs the results with a ContextPacker"""
+
+    base_retriever: Any
+    packer: Any
+    k: int = 4
+
+    def _get_relevant_documents(self, query: str, *, run_manager: Any = None) -> List[Document]:
+        """Retrieve candidates and pack them into the prompt budget"""
+        candidates = self.base_retriever.get_relevant_documents(query)
+        return self.packer.pack(query, candidates, baseline_k=self.k)
@@ -1,71 +1,152 @@
-from typing import List, Any
-from langchain.document_loaders import (
-    TextLoader,
-    PyPDFLoader,
-    Docx2txtLoader,
-    CSVLoader,
-    UnstructuredPowerPointLoader
-)
+from typing import List, Any, Iterable, Iterator, Optional, Tuple
 from pathlib import Path
+import importlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
+import shutil
 import tempfile
+from config.settings import INGEST_WORKERS, STREAM_BATCH_SIZE, STREAM_THRESHOLD_MB
 
 class DocumentLoader:
     """Handles document loading for different file types"""
     
+    # Loader class names; langchain's loaders are imported on first use
     LOADER_MAPPING = {
-        '.txt': TextLoader,
-        '.pdf': PyPDFLoader,
-        '.docx': Docx2txtLoader,
-        '.csv': CSVLoader,
-        '.pptx': UnstructuredPowerPointLoader
+        '.txt': 'TextLoader',
+        '.pdf': 'PyPDFLoader',
+        '.docx': 'Docx2txtLoader',
+        '.csv': 'CSVLoader',
+        '.pptx': 'UnstructuredPowerPointLoader'
     }
 
+    @staticmethod
+    def get_loader_class(ext: str):
+        """Import the loader class for a file extension"""
+        if ext not in DocumentLoader.LOADER_MAPPING:
+            raise ValueError(f"Unsupported file type: {ext}")
+        module = importlib.import_module('langchain.document_loaders')
+        return getattr(module, DocumentLoader.LOADER_MAPPING[ext])
+
     @staticmethod
     def load_document(file, file_path: str) -> List[Any]:
         """Load document using appropriate loader based on file extension"""
+        return list(DocumentLoader.lazy_load_document(file))
+
+    @staticmethod
+    def lazy_load_document(file) -> Iterator[Any]:
+        """Yield pages/rows of an uploaded file one at a time"""
         ext = Path(file.name).suffix.lower()
         
         if ext not in DocumentLoader.LOADER_MAPPING:
             raise ValueError(f"Unsupported file type: {ext}")
             
         # Create a temporary file to handle the uploaded file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp_file:
-            tmp_file.write(file.getvalue())
-            tmp_file.flush()
-            
-            # Load the document using appropriate loader
-            loader_class = DocumentLoader.LOADER_MAPPING[ext]
-            loader = loader_class(tmp_file.name)
-            documents = loader.load()
-            
+        tmp_path = DocumentLoader._write_temp_file(file, ext)
+        try:
+            yield from DocumentLoader.lazy_load_document_from_file(tmp_path)
+        finally:
             # Clean up temporary file
-            Path(tmp_file.name).unlink()
-            
-            return documents
+            tmp_path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _write_temp_file(file, ext: str) -> Path:
+        """Copy an uploaded file to a temporary file without buffering it whole"""
+        file.seek(0)
+        with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp_file:
+            shutil.copyfileobj(file, tmp_file)
+        return Path(tmp_file.name)
 
     @staticmethod
-    def process_uploaded_files(files: List[Any]) -> List[Any]:
+    def process_uploaded_files(files: List[Any], max_workers: int = INGEST_WORKERS) -> List[Any]:
         """Process multiple uploaded files"""
         all_documents = []
-        
-        for file in files:
-            try:
-                documents = DocumentLoader.load_document(file, file.name)
-                all_documents.extend(documents)
-            except Exception as e:
-                print(f"Error processing {file.name}: {str(e)}")
-                continue
+        tmp_paths = {}
+
+        try:
+            for file in files:
+                ext = Path(file.name).suffix.lower()
+                if ext not in DocumentLoader.LOADER_MAPPING:
+                    print(f"Error processing {file.name}: Unsupported file type: {ext}")
+                    continue
+                tmp_paths[DocumentLoader._write_temp_file(file, ext)] = file.name
+
+            for path, documents, error in DocumentLoader.load_documents_parallel(
+                    list(tmp_paths), max_workers):
+                if error is not None:
+                    print(f"Error processing {tmp_paths[path]}: {str(error)}")
+                    continue
+                try:
+                    all_documents.extend(documents)
+                except Exception as e:
+                    print(f"Error processing {tmp_paths[path]}: {str(e)}")
+        finally:
+            for path in tmp_paths:
+                path.unlink(missing_ok=True)
                 
         return all_documents
-    
+
+    @staticmethod
+    def load_documents_parallel(file_paths: List[Path], max_workers: int = INGEST_WORKERS
+                                ) -> Iterator[Tuple[Path, List[Any], Optional[Exception]]]:
+        """Parse files in a process pool, yielding (path, documents, error) as each file finishes"""
+        # Large files are yielded as lazy page iterators instead, to keep memory bounded
+        file_paths = [Path(path) for path in file_paths]
+        threshold = STREAM_THRESHOLD_MB * 1024 * 1024
+        large_files = [path for path in file_paths if path.stat().st_size > threshold]
+        small_files = [path for path in file_paths if path.stat().st_size <= threshold]
+
+        # Not worth starting worker processes for a single file
+        if max_workers <= 1 or len(small_files) <= 1:
+            for path in small_files:
+                try:
+                    yield path, DocumentLoader.load_document_from_file(path), None
+                except Exception as e:
+                    yield path, [], e
+        else:
+            with ProcessPoolExecutor(max_workers=min(max_workers, len(small_files))) as executor:
+                futures = {
+                    executor.submit(DocumentLoader.load_document_from_file, path): path
+                    for path in small_files
+                }
+                for future in as_completed(futures):
+                    # Drop our reference so finished results can be freed once consumed
+                    path = futures.pop(future)
+                    try:
+                        yield path, future.result(), None
+                    except Exception as e:
+                        yield path, [], e
+
+        for path in large_files:
+            yield path, DocumentLoader.lazy_load_document_from_file(path), None
+
+    @staticmethod
+    def lazy_load_document_from_file(file_path: Path) -> Iterator[Any]:
+        """Yield pages/rows of a document one at a time"""
+        ext = file_path.suffix.lower()
+
+        loader_class = DocumentLoader.get_loader_class(ext)
+        loader = loader_class(str(file_path))
+        try:
+            pages = loader.lazy_load()
+        except NotImplementedError:
+            pages = iter(loader.load())
+        yield from pages
+
+    @staticmethod
+    def iter_batches(documents: Iterable[Any], batch_size: int = STREAM_BATCH_SIZE) -> Iterator[List[Any]]:
+        """Group a stream of documents into lists of at most batch_size"""
+        documents = iter(documents)
+        while True:
+            batch = list(islice(documents, batch_size))
+            if not batch:
+                return
+            yield batch
+
     @staticmethod
     def load_document_from_file(file_path: Path) -> List[Any]:
         """Load document from file path"""
         ext = file_path.suffix.lower()
         
-        if ext not in DocumentLoader.LOADER_MAPPING:
-            raise ValueError(f"Unsupported file type: {ext}")
-            
-        loader_class = DocumentLoader.LOADER_MAPPING[ext]
+        loader_class = DocumentLoader.get_loader_class(ext)
         loader = loader_class(str(file_path))
         return loader.load()
\ No newline at end of file
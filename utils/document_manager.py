@@ -1,68 +1,72 @@
 import os
-import json
-import hashlib
 from datetime import datetime
 from pathlib import Path
-import pandas as pd
-from typing import BinaryIO
-from config.settings import UPLOAD_DIRECTORY, METADATA_FILE, SUPPORTED_FORMATS
+from typing import TYPE_CHECKING, BinaryIO, Dict
+from utils.index_store import IndexStore, UPLOAD_COLUMNS
+from utils.blob_store import BlobStore
+from config.settings import SUPPORTED_FORMATS
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 class DocumentManager:
     def __init__(self):
-        self.metadata_file = METADATA_FILE
-        self.load_metadata()
-
-    def load_metadata(self):
-        """Load document metadata from JSON file"""
-        if os.path.exists(self.metadata_file):
-            with open(self.metadata_file, 'r') as f:
-                self.metadata = json.load(f)
-        else:
-            self.metadata = {}
+        self.store = IndexStore()
+        self.blob_store = BlobStore()
 
-    def save_metadata(self):
-        """Save document metadata to JSON file"""
-        with open(self.metadata_file, 'w') as f:
-            json.dump(self.metadata, f, indent=4)
+    @property
+    def metadata(self) -> Dict[str, Dict]:
+        """Document metadata keyed by file hash"""
+        return {
+            row.pop('file_hash'): row
+            for row in self.store.query("SELECT * FROM uploads ORDER BY rowid")
+        }
 
     def add_document(self, file: BinaryIO, embedding_model: str) -> str:
         """Add document to storage with metadata"""
         file_hash = self._calculate_file_hash(file)
         
-        # Save file
+        # Save file; identical content is stored only once
         filename = Path(file.name)
-        file_path = Path(UPLOAD_DIRECTORY) / filename
-        with open(file_path, 'wb') as f:
-            f.write(file.getbuffer())
+        self.blob_store.put(file, filename.suffix, file_hash)
 
-        # Store metadata
-        self.metadata[file_hash] = {
-            'filename': file.name,
-            'upload_time': datetime.now().isoformat(),
-            'embedding_model': embedding_model,
-            'file_size': os.path.getsize(file_path),
-            'file_type': filename.suffix,
-            'path': str(file_path)
-        }
-        self.save_metadata()
+        with self.store.transaction() as conn:
+            # The blob may have been released and deleted since it was stored; deletes take
+            # the write lock, so once it is there again it stays until the row references it
+            file_path = self.blob_store.put(file, filename.suffix, file_hash)
+
+            # Store metadata
+            info = {
+                'file_hash': file_hash,
+                'filename': file.name,
+                'upload_time': datetime.now().isoformat(),
+                'embedding_model': embedding_model,
+                'file_size': os.path.getsize(file_path),
+                'file_type': filename.suffix,
+                'path': str(file_path)
+            }
+            conn.execute(
+                f"INSERT OR REPLACE INTO uploads ({', '.join(UPLOAD_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(UPLOAD_COLUMNS))})",
+                tuple(info[column] for column in UPLOAD_COLUMNS)
+            )
         return file_hash
 
     def _calculate_file_hash(self, file: BinaryIO) -> str:
         """Calculate SHA-256 hash of file content"""
-        file_content = file.getvalue()
-        return hashlib.sha256(file_content).hexdigest()
+        return BlobStore.hash_file(file)
 
-    def get_document_info(self) -> pd.DataFrame:
+    def get_document_info(self) -> 'pd.DataFrame':
         """Get information about all stored documents"""
+        import pandas as pd
         return pd.DataFrame.from_dict(self.metadata, orient='index')
 
     def remove_document(self, file_hash: str) -> bool:
         """Remove document and its metadata"""
-        if file_hash in self.metadata:
-            file_path = Path(self.metadata[file_hash]['path'])
-            if file_path.exists():
-                file_path.unlink()
-            del self.metadata[file_hash]
-            self.save_metadata()
+        with self.store.transaction() as conn:
+            row = conn.execute("SELECT path FROM uploads WHERE file_hash = ?", (file_hash,)).fetchone()
+            if row is None:
+                return False
+            conn.execute("DELETE FROM uploads WHERE file_hash = ?", (file_hash,))
+            self.store.release_file(conn, row['path'])
             return True
-        return False
\ No newline at end of file
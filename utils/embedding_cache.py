@@ -0,0 +1,300 @@
+import json
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Dict, Optional
+import numpy as np
+from langchain.embeddings.base import Embeddings
+from config.settings import EMBEDDING_CACHE_DIR, EMBEDDING_CACHE_MAX_MB
+
+class EmbeddingCache:
+    """Persistent LRU cache of embeddings in a memory-mapped float32 file, shared between processes"""
+
+    INITIAL_CAPACITY = 1024
+    TOUCH_BATCH = 256  # hits buffered before their recency is written
+
+    def __init__(self, model_name: str, cache_dir: Path = EMBEDDING_CACHE_DIR,
+                 max_mb: int = EMBEDDING_CACHE_MAX_MB):
+        self.model_name = model_name
+        self.cache_dir = Path(cache_dir) / model_name.replace('/', '__')
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.vectors_file = self.cache_dir / "vectors.f32"
+        self.keys_file = self.cache_dir / "keys.u64"  # digest of the key stored in each slot
+        self.index_file = self.cache_dir / "index.json"  # legacy, migrated into index.db
+        self.max_bytes = max_mb * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._vectors = None
+        self._digests = None
+        self._touched = OrderedDict()  # keys hit since the last index write, least recent first
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS slots (
+                key TEXT PRIMARY KEY,
+                slot INTEGER NOT NULL,
+                used INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_slots_used ON slots(used);
+            """
+        )
+        self.load_index()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Connection for the current thread"""
+        conn = getattr(self._local, 'connection', None)
+        if conn is None:
+            conn = sqlite3.connect(self.cache_dir / "index.db", timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = conn
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction; BEGIN IMMEDIATE serializes writers across processes"""
+        conn = self.connection
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def load_index(self):
+        """Migrate a legacy index, make sure every slot has its key digest, and open the files"""
+        with self.transaction() as conn:
+            if self.index_file.exists():
+                self._migrate_index(conn)
+            meta = self._meta(conn)
+            if meta.get('dim') and meta.get('capacity') and 'next_slot' not in meta:
+                # Indexes written before slots were allocated here start after their highest slot
+                next_slot = conn.execute("SELECT COALESCE(MAX(slot) + 1, 0) FROM slots").fetchone()[0]
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('next_slot', ?)", (next_slot,))
+            capacity = meta.get('capacity', 0)
+            if capacity and (not self.keys_file.exists() or self.keys_file.stat().st_size < capacity * 8):
+                self._rebuild_digests(conn, capacity)
+            self._open_files(conn)
+
+    @staticmethod
+    def _meta(conn: sqlite3.Connection) -> Dict[str, int]:
+        return dict(conn.execute("SELECT key, value FROM meta"))
+
+    def _migrate_index(self, conn: sqlite3.Connection):
+        """Import a JSON index written by earlier versions, oldest entry first"""
+        with open(self.index_file, 'r') as f:
+            index = json.load(f)
+        conn.execute("DELETE FROM slots")
+        conn.executemany("INSERT INTO slots (key, slot, used) VALUES (?, ?, ?)",
+                         [(key, slot, used) for used, (key, slot) in enumerate(index['slots'].items())])
+        conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                         [('dim', index['dim']), ('capacity', index['capacity']),
+                          ('clock', len(index['slots']))])
+        self.index_file.unlink()
+
+    def _rebuild_digests(self, conn: sqlite3.Connection, capacity: int):
+        """Write the key digest file for an index that has none"""
+        with open(self.keys_file, 'ab') as f:
+            f.truncate(capacity * 8)
+        digests = np.memmap(self.keys_file, dtype=np.uint64, mode='r+', shape=(capacity,))
+        digests[:] = 0
+        for key, slot in conn.execute("SELECT key, slot FROM slots"):
+            digests[slot] = self.digest(key)
+        digests.flush()
+
+    def _open_files(self, conn: sqlite3.Connection):
+        """Map the vector and digest files at the capacity recorded in the index"""
+        meta = self._meta(conn)
+        self.dim = meta.get('dim')
+        self.capacity = meta.get('capacity', 0)
+        if not self.dim or not self.capacity or not self.vectors_file.exists():
+            self.capacity = 0
+            self._vectors = self._digests = None
+            return
+        self._vectors = np.memmap(self.vectors_file, dtype=np.float32, mode='r+',
+                                  shape=(self.capacity, self.dim))
+        self._digests = np.memmap(self.keys_file, dtype=np.uint64, mode='r+', shape=(self.capacity,))
+
+    def save_index(self):
+        """Write the recency of entries hit since the last write"""
+        if not self._touched:
+            return
+        with self.transaction() as conn:
+            self._write_touched(conn)
+
+    def _write_touched(self, conn: sqlite3.Connection):
+        clock = self._meta(conn).get('clock', 0)
+        updates = []
+        for key in self._touched:
+            clock += 1
+            updates.append((clock, key))
+        conn.executemany("UPDATE slots SET used = ? WHERE key = ?", updates)
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('clock', ?)", (clock,))
+        self._touched.clear()
+
+    @property
+    def max_entries(self) -> int:
+        """Maximum number of vectors that fit in the size budget"""
+        return max(1, self.max_bytes // (self.dim * 4))
+
+    def key(self, text: str) -> str:
+        """Cache key for a chunk: hash of model id and normalized text"""
+        normalized = " ".join(text.split())
+        return hashlib.sha256(f"{self.model_name}\0{normalized}".encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def digest(key: str) -> np.uint64:
+        """Non-zero 64-bit digest of a key; zero marks a slot being written"""
+        return np.uint64(int(key[:16], 16) | 1)
+
+    @staticmethod
+    def _lookup(conn: sqlite3.Connection, keys: List[str]) -> Dict[str, int]:
+        """Slots of the given keys, as the index currently records them"""
+        slots = {}
+        unique = list(dict.fromkeys(keys))
+        for start in range(0, len(unique), 900):
+            batch = unique[start:start + 900]
+            slots.update(conn.execute(
+                "SELECT key, slot FROM slots WHERE key IN ({})".format(', '.join('?' * len(batch))), batch
+            ))
+        return slots
+
+    def get_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Look up cached embeddings, returning None for misses"""
+        keys = [self.key(text) for text in texts]
+        results = []
+        with self._lock:
+            slots = self._lookup(self.connection, keys)
+            if slots and max(slots.values()) >= self.capacity:
+                # Another process grew the files
+                self._open_files(self.connection)
+            for key in keys:
+                slot = slots.get(key)
+                vector = None
+                if slot is not None and slot < self.capacity:
+                    # Another process may reuse the slot meanwhile; its digest tells
+                    digest = self.digest(key)
+                    if self._digests[slot] == digest:
+                        vector = self._vectors[slot].tolist()
+                        if self._digests[slot] != digest:
+                            vector = None
+                if vector is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                    self._touched[key] = None
+                    self._touched.move_to_end(key)
+                results.append(vector)
+            if len(self._touched) >= self.TOUCH_BATCH:
+                self.save_index()
+        return results
+
+    def put_many(self, texts: List[str], vectors: List[List[float]]):
+        """Store embeddings, evicting least recently used entries when full"""
+        if not texts:
+            return
+        entries = dict(zip((self.key(text) for text in texts), vectors))
+        with self._lock, self.transaction() as conn:
+            # Other processes may have grown, filled or evicted from the cache since the last write
+            self._open_files(conn)
+            if self._vectors is None:
+                self.dim = len(vectors[0])
+                self._resize(conn, min(self.INITIAL_CAPACITY, self.max_entries))
+            present = self._lookup(conn, list(entries))
+            for key in present:
+                self._touched[key] = None
+                self._touched.move_to_end(key)
+            self._write_touched(conn)
+
+            meta = self._meta(conn)
+            clock = meta.get('clock', 0)
+            next_slot = meta.get('next_slot', 0)
+            new = [key for key in entries if key not in present]
+            victims = []
+            for key in new:
+                if next_slot >= self.capacity and self.capacity < self.max_entries:
+                    self._resize(conn, min(self.capacity * 2, self.max_entries))
+                if next_slot < self.capacity:
+                    slot = next_slot
+                    next_slot += 1
+                else:
+                    if not victims:
+                        victims = conn.execute(
+                            "SELECT key, slot FROM slots ORDER BY used LIMIT ?", (len(new),)
+                        ).fetchall()[::-1]
+                    victim, slot = victims.pop()
+                    # The index row goes before the slot is overwritten
+                    conn.execute("DELETE FROM slots WHERE key = ?", (victim,))
+                self._digests[slot] = 0
+                self._vectors[slot] = np.asarray(entries[key], dtype=np.float32)
+                self._digests[slot] = self.digest(key)
+                clock += 1
+                conn.execute("INSERT OR REPLACE INTO slots (key, slot, used) VALUES (?, ?, ?)",
+                             (key, slot, clock))
+
+            self._vectors.flush()
+            self._digests.flush()
+            conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                             [('dim', self.dim), ('capacity', self.capacity), ('clock', clock),
+                              ('next_slot', next_slot)])
+
+    def _resize(self, conn: sqlite3.Connection, capacity: int):
+        """Grow the memory-mapped vector and digest files to the given number of rows"""
+        for path, row_bytes in ((self.vectors_file, self.dim * 4), (self.keys_file, 8)):
+            with open(path, 'ab') as f:
+                f.truncate(capacity * row_bytes)
+        conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                         [('dim', self.dim), ('capacity', capacity)])
+        self._open_files(conn)
+
+    def get_stats(self) -> Dict[str, float]:
+        """Get cache hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': self.connection.execute("SELECT COUNT(*) FROM slots").fetchone()[0],
+            'size_mb': self.capacity * (self.dim or 0) * 4 / (1024**2)
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only runs the model on cache misses"""
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents, reusing cached vectors"""
+        results = self.cache.get_many(texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, results) if vector is None))
+        if missing:
+            computed = dict(zip(missing, self.embeddings.embed_documents(missing)))
+            self.cache.put_many(missing, [computed[text] for text in missing])
+            results = [computed[text] if vector is None else vector
+                       for text, vector in zip(texts, results)]
+        return results
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query (queries are not cached)"""
+        return self.embeddings.embed_query(text)
+
+
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+def get_embedding_cache(model_name: str) -> EmbeddingCache:
+    """Get the process-wide embedding cache for a model"""
+    with _caches_lock:
+        if model_name not in _caches:
+            _caches[model_name] = EmbeddingCache(model_name)
+        return _caches[model_name]
@@ -0,0 +1,224 @@
+import json
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Dict, Optional
+from config.settings import INDEX_DATABASE, REPOSITORY_INDEX, METADATA_FILE
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS collections (
+    name TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS documents (
+    id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    path TEXT NOT NULL,
+    collection TEXT NOT NULL REFERENCES collections(name),
+    added_at TEXT NOT NULL,
+    file_type TEXT,
+    file_size INTEGER,
+    content_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_documents_collection ON documents(collection, filename);
+CREATE INDEX IF NOT EXISTS idx_documents_hash ON documents(content_hash);
+CREATE INDEX IF NOT EXISTS idx_documents_path ON documents(path);
+CREATE TABLE IF NOT EXISTS document_embeddings (
+    doc_id TEXT NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    embedding_model TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    PRIMARY KEY (doc_id, embedding_model)
+);
+CREATE TABLE IF NOT EXISTS uploads (
+    file_hash TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    upload_time TEXT NOT NULL,
+    embedding_model TEXT,
+    file_size INTEGER,
+    file_type TEXT,
+    path TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_uploads_path ON uploads(path);
+CREATE TABLE IF NOT EXISTS ingest_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    doc_id TEXT NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    collection TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    embedding_model TEXT NOT NULL,
+    llm_model TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    chunks_done INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    UNIQUE (doc_id, content_hash, embedding_model)
+);
+CREATE INDEX IF NOT EXISTS idx_ingest_jobs_status ON ingest_jobs(status, id);
+"""
+
+DOCUMENT_COLUMNS = ('id', 'filename', 'path', 'collection', 'added_at',
+                    'file_type', 'file_size', 'content_hash')
+UPLOAD_COLUMNS = ('file_hash', 'filename', 'upload_time', 'embedding_model',
+                  'file_size', 'file_type', 'path')
+
+class IndexStore:
+    """SQLite (WAL mode) store for the repository index and upload metadata"""
+
+    def __init__(self, database: Path = INDEX_DATABASE):
+        self.database = Path(database)
+        self.database.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self.connection.executescript(SCHEMA)
+        self._migrate_json()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Connection for the current thread"""
+        conn = getattr(self._local, 'connection', None)
+        if conn is None:
+            conn = sqlite3.connect(self.database, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.connection = conn
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run statements in a single write transaction"""
+        conn = self.connection
+        if conn.in_transaction:
+            # Nested use joins the outer transaction
+            yield conn
+            return
+        self._local.released = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            self._local.released = None
+            raise
+        conn.execute("COMMIT")
+        released, self._local.released = self._local.released, None
+        if released:
+            self._delete_unreferenced(released)
+
+    def query(self, sql: str, params: tuple = ()) -> List[Dict]:
+        """Run a query and return rows as dicts"""
+        return [dict(row) for row in self.connection.execute(sql, params)]
+
+    def touch(self, conn: sqlite3.Connection):
+        """Record the time of the last index update"""
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_updated', ?)",
+            (datetime.now().isoformat(),)
+        )
+
+    def get_meta(self, key: str) -> Optional[str]:
+        """Get a metadata value"""
+        rows = self.query("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0]['value'] if rows else None
+
+    def release_file(self, conn: sqlite3.Connection, path: str):
+        """Delete a stored file once no document or upload references it, after the transaction commits"""
+        # A rolled-back transaction restores the rows, so the file must still be there
+        if conn.in_transaction and getattr(self._local, 'released', None) is not None:
+            self._local.released.append(path)
+        else:
+            self._delete_unreferenced([path])
+
+    def _delete_unreferenced(self, paths: List[str]):
+        """Delete the files no row references; the write lock keeps new references out meanwhile"""
+        with self.transaction() as conn:
+            for path in dict.fromkeys(paths):
+                references = conn.execute(
+                    "SELECT (SELECT COUNT(*) FROM documents WHERE path = ?)"
+                    " + (SELECT COUNT(*) FROM uploads WHERE path = ?)",
+                    (path, path)
+                ).fetchone()[0]
+                if references == 0:
+                    Path(path).unlink(missing_ok=True)
+
+    def _migrate_json(self):
+        """Import legacy repository_index.json and document_metadata.json once"""
+        with self.transaction() as conn:
+            if self.get_meta('json_migrated'):
+                return
+            if REPOSITORY_INDEX.exists():
+                self._migrate_repository_index(conn, REPOSITORY_INDEX)
+            if METADATA_FILE.exists():
+                self._migrate_upload_metadata(conn, METADATA_FILE)
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', '1')")
+            self.touch(conn)
+
+        for legacy_file in (REPOSITORY_INDEX, METADATA_FILE):
+            try:
+                legacy_file.rename(legacy_file.with_suffix('.json.migrated'))
+            except FileNotFoundError:
+                pass
+
+    def _migrate_repository_index(self, conn: sqlite3.Connection, index_file: Path):
+        """Copy collections, documents and indexing state from the JSON repository index"""
+        with open(index_file, 'r') as f:
+            index = json.load(f)
+
+        for name, collection in index.get('collections', {}).items():
+            conn.execute(
+                "INSERT OR IGNORE INTO collections (name, created_at, version) VALUES (?, ?, ?)",
+                (name, collection.get('created_at', datetime.now().isoformat()),
+                 collection.get('version', 0))
+            )
+
+        for doc_info in index.get('documents', {}).values():
+            if 'content_hash' not in doc_info:
+                doc_info['content_hash'] = self._hash_file(Path(doc_info['path']))
+            conn.execute(
+                "INSERT OR IGNORE INTO collections (name, created_at) VALUES (?, ?)",
+                (doc_info['collection'], doc_info['added_at'])
+            )
+            conn.execute(
+                f"INSERT OR IGNORE INTO documents ({', '.join(DOCUMENT_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(DOCUMENT_COLUMNS))})",
+                tuple(doc_info.get(column) for column in DOCUMENT_COLUMNS)
+            )
+            for embedding_model, content_hash in doc_info.get('indexed', {}).items():
+                conn.execute(
+                    "INSERT OR REPLACE INTO document_embeddings VALUES (?, ?, ?)",
+                    (doc_info['id'], embedding_model, content_hash)
+                )
+
+    def _migrate_upload_metadata(self, conn: sqlite3.Connection, metadata_file: Path):
+        """Copy upload records from the JSON document metadata file"""
+        with open(metadata_file, 'r') as f:
+            metadata = json.load(f)
+
+        for file_hash, info in metadata.items():
+            info = dict(info, file_hash=file_hash)
+            conn.execute(
+                f"INSERT OR IGNORE INTO uploads ({', '.join(UPLOAD_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(UPLOAD_COLUMNS))})",
+                tuple(info.get(column) for column in UPLOAD_COLUMNS)
+            )
+
+    @staticmethod
+    def _hash_file(path: Path) -> Optional[str]:
+        """SHA-256 of a file on disk, or None if it is missing"""
+        if not path.exists():
+            return None
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                sha256.update(block)
+        return sha256.hexdigest()
@@ -0,0 +1,244 @@
+import threading
+from datetime import datetime
+from typing import Iterable, List, Dict, Optional
+from utils.index_store import IndexStore
+from utils.rag_optimizer import RAGOptimizer
+from utils.repository_manager import RepositoryManager, get_repository_manager
+from utils.performance_monitor import PerformanceMonitor
+from config.settings import (
+    INGEST_QUEUE_WORKERS,
+    INGEST_POLL_INTERVAL,
+    INGEST_MAX_ATTEMPTS,
+    INGEST_CLAIM_SIZE,
+    INGEST_JOB_HISTORY
+)
+
+class IngestQueue:
+    """Persistent queue of documents to index, worked off by background threads"""
+
+    def __init__(self, repo_manager: Optional[RepositoryManager] = None,
+                 performance_monitor: Optional[PerformanceMonitor] = None):
+        self.repo_manager = repo_manager or get_repository_manager()
+        self.store: IndexStore = self.repo_manager.store
+        self.performance_monitor = performance_monitor
+        self._wakeup = threading.Event()
+        self._workers = []
+
+    def submit(self, files: List, collection_name: str, llm_model: str,
+               embedding_model: str) -> List[Dict]:
+        """Store uploaded files and queue every document not yet indexed with the embedding model"""
+        self.repo_manager.add_documents(files, collection_name)
+        pending = self.repo_manager.get_pending_documents(collection_name, embedding_model)
+        return self.enqueue(pending, llm_model, embedding_model)
+
+    def enqueue(self, doc_infos: List[Dict], llm_model: str, embedding_model: str,
+                retry: bool = False) -> List[Dict]:
+        """Queue documents for indexing; queueing the same content again is a no-op unless retry is set"""
+        now = datetime.now().isoformat()
+        with self.store.transaction() as conn:
+            for doc_info in doc_infos:
+                # Jobs for an older version of the document are no longer worth running
+                conn.execute(
+                    "UPDATE ingest_jobs SET status = 'superseded', updated_at = ? "
+                    "WHERE doc_id = ? AND embedding_model = ? AND content_hash != ? "
+                    "AND status = 'queued'",
+                    (now, doc_info['id'], embedding_model, doc_info['content_hash'])
+                )
+                # Streamlit resubmits attached files on every rerun, so finished or failed jobs
+                # for the same content are only requeued on request; superseded ones always are
+                conn.execute(
+                    """
+                    INSERT INTO ingest_jobs (doc_id, collection, content_hash, embedding_model,
+                                             llm_model, status, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, 'queued', ?, ?)
+                    ON CONFLICT (doc_id, content_hash, embedding_model) DO UPDATE SET
+                        status = 'queued', stage = NULL, chunks_done = 0, attempts = 0,
+                        error = NULL, llm_model = excluded.llm_model,
+                        updated_at = excluded.updated_at
+                    WHERE ingest_jobs.status = 'superseded'
+                       OR (? AND ingest_jobs.status IN ('done', 'failed'))
+                    """,
+                    (doc_info['id'], doc_info['collection'], doc_info['content_hash'],
+                     embedding_model, llm_model, now, now, retry)
+                )
+        if doc_infos:
+            self._wakeup.set()
+        return self.get_jobs(active_only=True)
+
+    def retry_failed(self, collection_name: str) -> int:
+        """Queue the failed jobs of a collection again with their attempts reset"""
+        with self.store.transaction() as conn:
+            retried = conn.execute(
+                "UPDATE ingest_jobs SET status = 'queued', stage = NULL, chunks_done = 0, "
+                "attempts = 0, error = NULL, updated_at = ? WHERE status = 'failed' AND collection = ?",
+                (datetime.now().isoformat(), collection_name)
+            ).rowcount
+        if retried:
+            self._wakeup.set()
+        return retried
+
+    def get_jobs(self, collection_name: Optional[str] = None, active_only: bool = False,
+                 limit: int = 50) -> List[Dict]:
+        """Most recent jobs with their status and progress, newest first"""
+        sql = ("SELECT j.*, d.filename FROM ingest_jobs j "
+               "LEFT JOIN documents d ON d.id = j.doc_id WHERE 1 = 1")
+        params = []
+        if collection_name is not None:
+            sql += " AND j.collection = ?"
+            params.append(collection_name)
+        if active_only:
+            sql += " AND j.status IN ('queued', 'running')"
+        sql += " ORDER BY j.id DESC LIMIT ?"
+        params.append(limit)
+        return self.store.query(sql, tuple(params))
+
+    def has_active_jobs(self, collection_name: Optional[str] = None) -> bool:
+        """Whether documents are still waiting to be indexed"""
+        return bool(self.get_jobs(collection_name, active_only=True, limit=1))
+
+    def start_workers(self, workers: int = INGEST_QUEUE_WORKERS):
+        """Work off the queue in background threads, resuming jobs interrupted by a restart"""
+        if self._workers:
+            return
+        # Only this process runs jobs, so anything still marked running was interrupted
+        with self.store.transaction() as conn:
+            conn.execute(
+                "UPDATE ingest_jobs SET status = 'queued', updated_at = ? WHERE status = 'running'",
+                (datetime.now().isoformat(),)
+            )
+        for number in range(workers):
+            worker = threading.Thread(target=self._work, name=f"ingest-{number}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def _work(self):
+        while True:
+            jobs = self._claim()
+            if not jobs:
+                self._wakeup.wait(INGEST_POLL_INTERVAL)
+                self._wakeup.clear()
+                continue
+            self._run_batch(jobs)
+
+    def _claim(self, limit: int = INGEST_CLAIM_SIZE) -> List[Dict]:
+        """Take the oldest queued jobs"""
+        with self.store.transaction() as conn:
+            rows = conn.execute(
+                "SELECT * FROM ingest_jobs WHERE status = 'queued' ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE ingest_jobs SET status = 'running', stage = 'parse', chunks_done = 0, "
+                "attempts = attempts + 1, error = NULL, updated_at = ? WHERE id = ?",
+                [(datetime.now().isoformat(), row['id']) for row in rows]
+            )
+            return [dict(row) for row in rows]
+
+    def _update(self, job: Dict, **fields):
+        """Record a job's progress"""
+        fields['updated_at'] = datetime.now().isoformat()
+        self.store.connection.execute(
+            f"UPDATE ingest_jobs SET {', '.join(f'{name} = ?' for name in fields)} WHERE id = ?",
+            (*fields.values(), job['id'])
+        )
+
+    def _is_current(self, job: Dict) -> bool:
+        """Whether the job's document still exists with the content the job was queued for"""
+        doc_info = self.repo_manager.get_document_info(job['doc_id'])
+        return doc_info is not None and doc_info['content_hash'] == job['content_hash']
+
+    def _run_batch(self, jobs: List[Dict]):
+        """Parse the documents of claimed jobs together in the process pool, then index each one"""
+        doc_infos, by_doc = {}, {}
+        for job in jobs:
+            doc_info = self.repo_manager.get_document_info(job['doc_id'])
+            if doc_info is None or doc_info['content_hash'] != job['content_hash']:
+                self._update(job, status='superseded', stage=None)
+                continue
+            doc_infos[doc_info['id']] = doc_info
+            by_doc.setdefault(doc_info['id'], []).append(job)
+
+        try:
+            for doc_info, documents, error in self.repo_manager.iter_documents(list(doc_infos.values())):
+                doc_jobs = by_doc.pop(doc_info['id'])
+                # Jobs for other embedding models of the same document share its pages
+                if len(doc_jobs) > 1 and error is None:
+                    documents = list(documents)
+                for job in doc_jobs:
+                    try:
+                        if error is not None:
+                            raise error
+                        self._run(job, doc_info, documents)
+                    except Exception as e:
+                        self._fail(job, e)
+        except Exception as e:
+            for doc_jobs in by_doc.values():
+                for job in doc_jobs:
+                    self._fail(job, e)
+            return
+
+        # Documents whose file is gone are not loaded at all
+        for doc_id, doc_jobs in by_doc.items():
+            for job in doc_jobs:
+                self._fail(job, FileNotFoundError(doc_infos[doc_id]['path']))
+
+    def _run(self, job: Dict, doc_info: Dict, documents: Iterable):
+        """Index a parsed document into the staging collection, then promote it in one step"""
+        staging_collection = RAGOptimizer.get_staging_collection_name(job['collection'])
+        staging = RAGOptimizer(job['llm_model'], job['embedding_model'], staging_collection,
+                               self.performance_monitor)
+        staging_vectorstore = staging.get_existing_vectorstore()
+
+        # Queries keep using the collection as last promoted while the document is indexed
+        self._update(job, stage='index')
+        staging.index_documents(
+            staging_vectorstore, documents, [doc_info['id']],
+            content_hash=doc_info['content_hash'],
+            document_metadata={'doc_id': doc_info['id'], 'filename': doc_info['filename']},
+            progress=lambda chunks_done: self._update(job, chunks_done=chunks_done)
+        )
+
+        # Removing the document takes the same lock, so it cannot slip in between the check
+        # and the promotion and have its vectors written back afterwards
+        with self.repo_manager.collection_lock(job['collection']):
+            if not self._is_current(job):
+                staging.remove_documents(staging_vectorstore, [doc_info['id']])
+                self._update(job, status='superseded', stage=None)
+                return
+            self._update(job, stage='promote')
+            rag = RAGOptimizer(job['llm_model'], job['embedding_model'], job['collection'],
+                               self.performance_monitor)
+            rag.promote_documents(rag.get_existing_vectorstore(), staging_vectorstore,
+                                  staging_collection, [doc_info['id']])
+            self.repo_manager.mark_indexed([doc_info['id']], job['embedding_model'])
+        self._finish(job)
+
+    def _fail(self, job: Dict, error: Exception):
+        """Retry a failed job later, or give up after INGEST_MAX_ATTEMPTS"""
+        status = 'failed' if job['attempts'] + 1 >= INGEST_MAX_ATTEMPTS else 'queued'
+        self._update(job, status=status, stage=None, error=str(error))
+
+    def _finish(self, job: Dict):
+        """Mark a job done and forget the oldest finished jobs"""
+        with self.store.transaction() as conn:
+            conn.execute(
+                "UPDATE ingest_jobs SET status = 'done', stage = NULL, updated_at = ? WHERE id = ?",
+                (datetime.now().isoformat(), job['id'])
+            )
+            conn.execute(
+                "DELETE FROM ingest_jobs WHERE status IN ('done', 'superseded') AND id NOT IN "
+                "(SELECT id FROM ingest_jobs ORDER BY id DESC LIMIT ?)",
+                (INGEST_JOB_HISTORY,)
+            )
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+def get_ingest_queue(performance_monitor: Optional[PerformanceMonitor] = None) -> IngestQueue:
+    """Get the process-wide ingest queue, with its workers running"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = IngestQueue(performance_monitor=performance_monitor)
+            _queue.start_workers()
+        return _queue
@@ -1,49 +1,383 @@
+import re
+import time
+import threading
+from collections import deque
+from datetime import datetime
 import requests
-from typing import List, Dict
+from requests.adapters import HTTPAdapter
+from typing import Any, Callable, List, Dict, Optional, Tuple
 import subprocess
+from config.settings import (
+    OLLAMA_BASE_URL,
+    OLLAMA_CONNECT_TIMEOUT,
+    OLLAMA_READ_TIMEOUT,
+    OLLAMA_POOL_SIZE,
+    OLLAMA_HEALTH_INTERVAL,
+    OLLAMA_MODELS_TTL,
+    OLLAMA_MODEL_INFO_TTL,
+    OLLAMA_PS_TTL,
+    OLLAMA_LOAD_TIMEOUT,
+    WARMUP_RETRY_INTERVAL,
+    KEEP_ALIVE_MIN,
+    KEEP_ALIVE_MAX,
+    KEEP_ALIVE_HISTORY
+)
+
+class TTLCache:
+    """Small thread-safe cache whose entries expire after a per-entry time to live"""
 
-class ModelManager:
     def __init__(self):
-        self.base_url = "http://localhost:11434"
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Tuple[bool, Any]:
+        """Return (found, value) for an unexpired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return False, None
+        return True, entry[1]
+
+    def put(self, key: Any, value: Any, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+
+    def invalidate(self, key: Optional[Any] = None):
+        """Drop one entry, or all of them"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+class ModelManager:
+    def __init__(self, base_url: str = OLLAMA_BASE_URL):
+        self.base_url = base_url
+        self.timeout = (OLLAMA_CONNECT_TIMEOUT, OLLAMA_READ_TIMEOUT)
+        self.cache = TTLCache()
+
+        # Keep-alive connections, reused across Streamlit reruns
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=OLLAMA_POOL_SIZE)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._status = None
+        self._status_checked_at = None
+        self._ps_available = True  # False while /api/ps is missing (older Ollama) or failing
+        self._prober = None
+
+        # Warm-up state per model and recent usage driving keep_alive
+        self._lock = threading.Lock()
+        self._warmups = {}
+        self._usage = {}
+
+    def _get_models(self) -> List[str]:
+        """Fetch installed model names from /api/tags; raises when Ollama is unreachable"""
+        response = self.session.get(f'{self.base_url}/api/tags', timeout=self.timeout)
+        response.raise_for_status()
+        models = [model['name'] for model in response.json()['models']]
+        self.cache.put('models', models, OLLAMA_MODELS_TTL)
+        return models
 
     def get_installed_models(self) -> List[str]:
         """Get list of installed Ollama models"""
+        found, models = self.cache.get('models')
+        if found:
+            return models
         try:
-            response = requests.get(f'{self.base_url}/api/tags')
-            if response.status_code == 200:
-                models = response.json()['models']
-                return [model['name'] for model in models]
-            return []
+            return self._get_models()
         except Exception:
             return []
 
-    def check_ollama_status(self) -> bool:
-        """Check if Ollama is running"""
+    def probe(self) -> bool:
+        """Check Ollama once, refreshing the model list with the same request"""
         try:
-            response = requests.get(f'{self.base_url}/api/tags')
-            return response.status_code == 200
+            self._get_models()
+            self._status = True
         except Exception:
-            return False
+            self._status = False
+        self._status_checked_at = time.time()
+        # Resident models only feed the model-state display, never the health status
+        if self._status:
+            try:
+                self._get_running_models()
+            except Exception:
+                self._ps_available = False
+        return self._status
+
+    def start_health_probe(self, interval: float = OLLAMA_HEALTH_INTERVAL):
+        """Probe Ollama in the background so status checks never wait on the network"""
+        if self._prober is not None:
+            return
+
+        def probe_periodically():
+            while True:
+                self.probe()
+                time.sleep(interval)
+
+        self._prober = threading.Thread(target=probe_periodically, name="ollama-health", daemon=True)
+        self._prober.start()
+
+    def check_ollama_status(self) -> bool:
+        """Check if Ollama is running"""
+        # Served from the background probe; only the very first call waits (bounded by timeouts)
+        if self._status is None:
+            return self.probe()
+        return self._status
+
+    def get_status_age(self) -> Optional[float]:
+        """Seconds since Ollama was last probed"""
+        if self._status_checked_at is None:
+            return None
+        return time.time() - self._status_checked_at
 
     def pull_model(self, model_name: str) -> bool:
         """Pull a new Ollama model"""
         try:
-            result = subprocess.run(['ollama', 'pull', model_name], 
-                                  capture_output=True, 
+            result = subprocess.run(['ollama', 'pull', model_name],
+                                  capture_output=True,
                                   text=True)
+            self.cache.invalidate('models')
             return result.returncode == 0
         except Exception:
             return False
 
     def get_model_info(self, model_name: str) -> Dict:
         """Get information about a specific model"""
+        return self._cached(('info', model_name), OLLAMA_MODEL_INFO_TTL, lambda: self._show(model_name))
+
+    def _show(self, model_name: str) -> Dict:
         try:
-            response = requests.post(
+            response = self.session.post(
                 f'{self.base_url}/api/show',
-                json={'name': model_name}
+                json={'name': model_name},
+                timeout=self.timeout
             )
             if response.status_code == 200:
                 return response.json()
             return {}
         except Exception:
-            return {}
\ No newline at end of file
+            return {}
+
+    def _get_running_models(self) -> Dict[str, Dict]:
+        """Fetch models resident in Ollama memory from /api/ps; raises when Ollama is unreachable"""
+        response = self.session.get(f'{self.base_url}/api/ps', timeout=self.timeout)
+        response.raise_for_status()
+        running = {model['name']: model for model in response.json().get('models', [])}
+        self.cache.put('running', running, OLLAMA_PS_TTL)
+        self._ps_available = True
+        return running
+
+    def get_running_models(self) -> Dict[str, Dict]:
+        """Get models currently loaded by Ollama, by name"""
+        found, running = self.cache.get('running')
+        if found:
+            return running
+        try:
+            return self._get_running_models()
+        except Exception:
+            self._ps_available = False
+            return {}
+
+    def warm_up(self, model_name: str, retry: bool = False):
+        """Load an LLM in the background so the first question does not pay the cold start"""
+        self._start_warmup(('llm', model_name), lambda: self._load_llm(model_name), retry)
+
+    def warm_up_embeddings(self, embedding_model: str, retry: bool = False):
+        """Load an embedding model into the resource pool in the background"""
+        def load():
+            from utils.resource_pool import get_resource_pool
+            get_resource_pool().get_embeddings(embedding_model).embed_query("warm up")
+
+        self._start_warmup(('embedding', embedding_model), load, retry)
+
+    def _start_warmup(self, key: Tuple[str, str], load: Callable[[], None], retry: bool = False):
+        """Run a warm-up once per model, again once the model went cold, and after a failure
+        only once WARMUP_RETRY_INTERVAL has passed or on request"""
+        with self._lock:
+            warmup = self._warmups.get(key)
+        if warmup is not None and warmup['state'] == 'failed' and not retry and \
+                time.time() - warmup['failed_at'] < WARMUP_RETRY_INTERVAL:
+            # Streamlit reruns every poll; retrying each time would hammer Ollama with loads
+            return
+        if warmup is not None and warmup['state'] == 'ready':
+            # Checked outside the lock: /api/ps may need a network round trip
+            if key[0] == 'embedding' or key[1] in self.get_running_models() or not self._ps_available:
+                return
+        with self._lock:
+            if self._warmups.get(key, {}).get('state') == 'loading':
+                return
+            self._warmups[key] = {'state': 'loading', 'started_at': time.time()}
+
+        def run():
+            start_time = time.time()
+            try:
+                load()
+                result = {'state': 'ready', 'load_time': time.time() - start_time}
+            except Exception as e:
+                result = {'state': 'failed', 'error': str(e), 'failed_at': time.time()}
+            with self._lock:
+                self._warmups[key] = result
+            self.cache.invalidate('running')
+
+        threading.Thread(target=run, name=f"warm-up-{key[1]}", daemon=True).start()
+
+    def _load_llm(self, model_name: str):
+        """Ask Ollama to load a model; a request without a prompt only loads it"""
+        keep_alive = self.get_keep_alive(model_name)
+        response = self.session.post(
+            f'{self.base_url}/api/generate',
+            json={'model': model_name, 'keep_alive': keep_alive},
+            timeout=(OLLAMA_CONNECT_TIMEOUT, OLLAMA_LOAD_TIMEOUT)
+        )
+        response.raise_for_status()
+
+    def record_usage(self, model_name: str):
+        """Note that a model answered a question and extend its keep_alive accordingly"""
+        with self._lock:
+            self._usage.setdefault(model_name, deque(maxlen=KEEP_ALIVE_HISTORY)).append(time.time())
+        # Generation requests reset the expiry to Ollama's default; re-send ours (a no-op load)
+        threading.Thread(target=self._refresh_keep_alive, args=(model_name,), daemon=True).start()
+
+    def _refresh_keep_alive(self, model_name: str):
+        """Re-send keep_alive for a model; failures only mean Ollama keeps its default"""
+        try:
+            self._load_llm(model_name)
+        except Exception:
+            pass
+
+    def get_keep_alive(self, model_name: str) -> int:
+        """Seconds Ollama should keep a model loaded, from the gaps between its recent uses"""
+        # Long enough to bridge the usual pause between questions, within bounds
+        with self._lock:
+            uses = list(self._usage.get(model_name, ()))
+        if len(uses) < 2:
+            return KEEP_ALIVE_MIN
+        gaps = sorted(later - earlier for earlier, later in zip(uses, uses[1:]))
+        typical_gap = gaps[(len(gaps) * 3) // 4]
+        return int(min(max(3 * typical_gap, KEEP_ALIVE_MIN), KEEP_ALIVE_MAX))
+
+    def get_model_state(self, model_name: str) -> Dict:
+        """Load state of an LLM: 'loading', 'resident' (with seconds until unload), 'failed' or 'cold'"""
+        with self._lock:
+            warmup = dict(self._warmups.get(('llm', model_name), {}))
+        if warmup.get('state') == 'loading':
+            return {'state': 'loading', 'elapsed': time.time() - warmup['started_at']}
+
+        running = self.get_running_models().get(model_name)
+        if running is not None:
+            return {
+                'state': 'resident',
+                'expires_in': self._seconds_until(running.get('expires_at')),
+                'size_vram': running.get('size_vram'),
+                'load_time': warmup.get('load_time')
+            }
+        if warmup.get('state') == 'failed':
+            return {'state': 'failed', 'error': warmup.get('error'),
+                    'retry_in': max(0.0, warmup['failed_at'] + WARMUP_RETRY_INTERVAL - time.time())}
+        if warmup.get('state') == 'ready' and not self._ps_available:
+            # Without /api/ps the last successful warm-up is the best guess
+            return {'state': 'resident', 'expires_in': None, 'load_time': warmup.get('load_time')}
+        return {'state': 'cold'}
+
+    def get_embedding_state(self, embedding_model: str) -> Dict:
+        """Load state of an embedding model: 'loading', 'ready', 'failed' or 'cold'"""
+        with self._lock:
+            warmup = dict(self._warmups.get(('embedding', embedding_model), {}))
+        if warmup.get('state') == 'loading':
+            return {'state': 'loading', 'elapsed': time.time() - warmup['started_at']}
+        return warmup or {'state': 'cold'}
+
+    @staticmethod
+    def _seconds_until(timestamp: Optional[str]) -> Optional[float]:
+        """Seconds until an Ollama RFC 3339 timestamp (nanosecond precision is truncated)"""
+        if not timestamp:
+            return None
+        try:
+            timestamp = re.sub(r'(\.\d{6})\d+', r'\1', timestamp).replace('Z', '+00:00')
+            expires_at = datetime.fromisoformat(timestamp)
+        except ValueError:
+            return None
+        return max(0.0, expires_at.timestamp() - time.time())
+
+    def _cached(self, key: Any, ttl: float, loader: Callable[[], Any]) -> Any:
+        """Get a value from the TTL cache, loading it on a miss; empty results are not cached"""
+        found, value = self.cache.get(key)
+        if found:
+            return value
+        value = loader()
+        if value:
+            self.cache.put(key, value, ttl)
+        return value
+
+
+class AsyncModelManager:
+    """Non-blocking variant of ModelManager for asyncio callers, sharing its TTL cache"""
+
+    def __init__(self, base_url: str = OLLAMA_BASE_URL, cache: Optional[TTLCache] = None):
+        import httpx
+
+        self.base_url = base_url
+        self.cache = cache or TTLCache()
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(OLLAMA_READ_TIMEOUT, connect=OLLAMA_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=OLLAMA_POOL_SIZE,
+                                max_keepalive_connections=OLLAMA_POOL_SIZE)
+        )
+
+    async def get_installed_models(self) -> List[str]:
+        """Get list of installed Ollama models"""
+        found, models = self.cache.get('models')
+        if found:
+            return models
+        try:
+            response = await self.client.get('/api/tags')
+            response.raise_for_status()
+        except Exception:
+            return []
+        models = [model['name'] for model in response.json()['models']]
+        self.cache.put('models', models, OLLAMA_MODELS_TTL)
+        return models
+
+    async def check_ollama_status(self) -> bool:
+        """Check if Ollama is running"""
+        try:
+            response = await self.client.get('/api/tags')
+            return response.status_code == 200
+        except Exception:
+            return False
+
+    async def get_model_info(self, model_name: str) -> Dict:
+        """Get information about a specific model"""
+        found, info = self.cache.get(('info', model_name))
+        if found:
+            return info
+        try:
+            response = await self.client.post('/api/show', json={'name': model_name})
+        except Exception:
+            return {}
+        if response.status_code != 200:
+            return {}
+        info = response.json()
+        self.cache.put(('info', model_name), info, OLLAMA_MODEL_INFO_TTL)
+        return info
+
+    async def aclose(self):
+        """Close pooled connections"""
+        await self.client.aclose()
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_model_manager() -> ModelManager:
+    """Get the process-wide model manager, with its health probe running"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = ModelManager()
+            _manager.start_health_probe()
+        return _manager
@@ -0,0 +1,136 @@
+import os
+import gzip
+import json
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from langchain.schema import Document
+from utils.blob_store import BlobStore
+from config.settings import PARSE_CACHE_DIR
+
+class ParseCache:
+    """Per-content-hash cache of parsed pages and chunks, stored as gzipped JSON lines"""
+
+    # Metadata that belongs to a repository document rather than to its content
+    DOCUMENT_KEYS = ('doc_id', 'filename')
+
+    def __init__(self, cache_dir: Path = PARSE_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                content_hash TEXT NOT NULL
+            )
+            """
+        )
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Connection for the current thread"""
+        conn = getattr(self._local, 'connection', None)
+        if conn is None:
+            conn = sqlite3.connect(self.cache_dir / "files.db", timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = conn
+        return conn
+
+    def file_hash(self, path: Path) -> Optional[str]:
+        """Content hash of a file, re-hashed only when its size or modification time changed"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        key = str(Path(path).resolve())
+        row = self.connection.execute(
+            "SELECT size, mtime_ns, content_hash FROM files WHERE path = ?", (key,)
+        ).fetchone()
+        if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+
+        with open(path, 'rb') as f:
+            content_hash = BlobStore.hash_file(f)
+        self.record_file(path, content_hash, stat)
+        return content_hash
+
+    def record_file(self, path: Path, content_hash: str, stat: Optional[os.stat_result] = None):
+        """Remember the content hash of a file as it is now, e.g. right after storing it"""
+        stat = stat or os.stat(path)
+        with self.connection as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, content_hash) VALUES (?, ?, ?, ?)",
+                (str(Path(path).resolve()), stat.st_size, stat.st_mtime_ns, content_hash)
+            )
+
+    def _path(self, content_hash: str, kind: str) -> Path:
+        """Cache file for a content hash"""
+        return self.cache_dir / content_hash[:2] / f"{content_hash}.{kind}.jsonl.gz"
+
+    @staticmethod
+    def chunk_kind(chunk_settings: Dict[str, Any]) -> str:
+        """Cache kind for chunks produced with the given settings"""
+        digest = hashlib.sha1(json.dumps(chunk_settings, sort_keys=True).encode('utf-8')).hexdigest()
+        return f"chunks-{digest[:12]}"
+
+    def has(self, content_hash: str, kind: str = "pages") -> bool:
+        """Whether an entry is cached"""
+        return self._path(content_hash, kind).exists()
+
+    def iter_documents(self, content_hash: str, kind: str = "pages") -> Optional[Iterator[Any]]:
+        """Lazily read cached documents, or None on a miss"""
+        path = self._path(content_hash, kind)
+        if not path.exists():
+            return None
+        return self._read(path)
+
+    @staticmethod
+    def _read(path: Path) -> Iterator[Any]:
+        """Read documents from a cache file"""
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                yield Document(page_content=record['page_content'], metadata=record['metadata'])
+
+    def get_documents(self, content_hash: str, kind: str = "pages") -> Optional[List[Any]]:
+        """Read cached documents into a list, or None on a miss"""
+        documents = self.iter_documents(content_hash, kind)
+        return list(documents) if documents is not None else None
+
+    def put_documents(self, content_hash: str, documents: Iterable[Any], kind: str = "pages"):
+        """Cache documents"""
+        for _ in self.write_through(content_hash, documents, kind):
+            pass
+
+    def write_through(self, content_hash: str, documents: Iterable[Any],
+                      kind: str = "pages") -> Iterator[Any]:
+        """Yield documents while caching them; the entry is only committed if fully consumed"""
+        path = self._path(content_hash, kind)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        os.close(fd)
+        completed = False
+        try:
+            with gzip.open(tmp_name, 'wt', encoding='utf-8', compresslevel=6) as f:
+                for document in documents:
+                    metadata = {
+                        key: value for key, value in document.metadata.items()
+                        if key not in self.DOCUMENT_KEYS
+                    }
+                    f.write(json.dumps({
+                        'page_content': document.page_content,
+                        'metadata': metadata
+                    }, default=str) + "\n")
+                    yield document
+            os.replace(tmp_name, path)
+            completed = True
+        finally:
+            if not completed:
+                Path(tmp_name).unlink(missing_ok=True)
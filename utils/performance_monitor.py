@@ -1,18 +1,243 @@
+import os
 import time
+import uuid
 import psutil
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
 from functools import wraps
-from typing import Dict, Any
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional
 import json
 from datetime import datetime
+import numpy as np
+from config.settings import (
+    METRICS_FILE,
+    METRICS_FLUSH_INTERVAL,
+    METRICS_MAX_ENTRIES,
+    METRICS_WINDOW,
+    METRICS_MAX_TRACES,
+    METRICS_MAX_CHILDREN
+)
+
+# Span of the code currently running, per thread (and per asyncio task)
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+class Span:
+    """One timed stage of a trace"""
+
+    __slots__ = ('name', 'attributes', 'trace_id', 'parent', 'children', 'start', 'duration')
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, **attributes):
+        self.name = name
+        self.attributes = attributes
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex[:16]
+        self.children = []
+        self.start = time.time()
+        self.duration = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Span tree as plain data"""
+        return {
+            'name': self.name,
+            'start': self.start,
+            'duration': self.duration,
+            'attributes': self.attributes,
+            'children': [child.to_dict() for child in self.children]
+        }
+
+
+class LatencyWindow:
+    """Ring buffer of the most recent latencies of one stage"""
+
+    def __init__(self, size: int = METRICS_WINDOW):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, duration: float):
+        self.samples.append(duration)
+        self.count += 1
+        self.total += duration
+
+    def summary(self) -> Dict[str, float]:
+        """Percentiles over the window, counts over the process lifetime"""
+        values = np.fromiter(self.samples, dtype=np.float64, count=len(self.samples))
+        p50, p95, p99 = np.percentile(values, [50, 95, 99]) if len(values) else (0.0, 0.0, 0.0)
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': float(p50),
+            'p95': float(p95),
+            'p99': float(p99),
+            'max': float(values.max()) if len(values) else 0.0
+        }
+
 
 class PerformanceMonitor:
-    def __init__(self):
-        self.metrics = []
+    def __init__(self, metrics_file: Optional[Path] = None,
+                 flush_interval: float = METRICS_FLUSH_INTERVAL):
+        self.metrics = deque(maxlen=METRICS_MAX_ENTRIES)
+        self.metrics_file = Path(metrics_file) if metrics_file else None
+        self.flush_interval = flush_interval
+        self.traces = deque(maxlen=METRICS_MAX_TRACES)
+        self._windows = {}
+        self._lock = threading.Lock()
+        self._flusher = None
+        if self.metrics_file is not None:
+            self._load()
 
     def log_metrics(self, metrics: Dict[str, Any]):
         """Log performance metrics"""
         metrics['timestamp'] = datetime.now().isoformat()
-        self.metrics.append(metrics)
+        with self._lock:
+            self.metrics.append(metrics)
+
+    def get_last_metrics(self, function_name: str) -> Dict[str, Any]:
+        """Get the most recent metrics logged for a function"""
+        # Other threads log while this one reads, so search a snapshot
+        with self._lock:
+            snapshot = list(self.metrics)
+        for metrics in reversed(snapshot):
+            if metrics.get('function_name') == function_name:
+                return metrics
+        return {}
+
+    @contextmanager
+    def span(self, name: str, parent: Optional[Span] = None, **attributes) -> Iterator[Span]:
+        """Time a stage, nested under the current span unless a parent is given"""
+        span = self.start_span(name, parent, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.attributes['error'] = type(e).__name__
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_span(span)
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attributes) -> Span:
+        """Open a span without making it current; for stages that outlive a block, like generators"""
+        return Span(name, parent if parent is not None else _current_span.get(), **attributes)
+
+    def end_span(self, span: Span, **attributes):
+        """Close a span and aggregate its latency per stage and model"""
+        span.duration = time.time() - span.start
+        span.attributes.update(attributes)
+        self._record(span)
+
+    def record_span(self, name: str, duration: float, parent: Optional[Span] = None, **attributes):
+        """Record a stage timed elsewhere, e.g. in a worker process"""
+        span = self.start_span(name, parent, **attributes)
+        span.start -= duration
+        self.end_span(span)
+
+    @staticmethod
+    def current_span() -> Optional[Span]:
+        """Span of the code currently running"""
+        return _current_span.get()
+
+    def _record(self, span: Span):
+        key = (span.name, span.attributes.get('model', ''))
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                window = self._windows[key] = LatencyWindow()
+            window.add(span.duration)
+            if span.parent is not None:
+                self._add_child(span.parent, span)
+            else:
+                self.traces.append(span)
+
+    @staticmethod
+    def _add_child(parent: Span, span: Span):
+        """Keep the first children of a span, then fold later ones into one summary span per stage"""
+        if len(parent.children) < METRICS_MAX_CHILDREN:
+            parent.children.append(span)
+            return
+        # Summaries hold the number of spans folded in and their total duration
+        for child in reversed(parent.children):
+            if child.name == span.name and 'aggregated' in child.attributes:
+                child.attributes['aggregated'] += 1
+                child.duration += span.duration
+                return
+        summary = Span(span.name, parent, aggregated=1)
+        summary.start = span.start
+        summary.duration = span.duration
+        parent.children.append(summary)
+
+    def get_stage_stats(self) -> List[Dict[str, Any]]:
+        """Latency percentiles per stage and model"""
+        with self._lock:
+            windows = list(self._windows.items())
+        return [
+            dict(window.summary(), stage=stage, model=model)
+            for (stage, model), window in sorted(windows)
+        ]
+
+    def get_traces(self, name: Optional[str] = None, limit: int = 10,
+                   slowest: bool = False) -> List[Dict[str, Any]]:
+        """Most recent (or slowest) finished traces, optionally only those of one root stage"""
+        with self._lock:
+            traces = [span for span in self.traces if name is None or span.name == name]
+        if slowest:
+            traces.sort(key=lambda span: span.duration, reverse=True)
+        else:
+            traces.reverse()
+        return [span.to_dict() for span in traces[:limit]]
+
+    def start_flushing(self):
+        """Flush stats and traces to the metrics file every flush_interval seconds"""
+        if self.metrics_file is None or self._flusher is not None:
+            return
+
+        def flush_periodically():
+            while True:
+                time.sleep(self.flush_interval)
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"Error flushing performance metrics: {e}")
+
+        self._flusher = threading.Thread(target=flush_periodically, name="metrics-flush", daemon=True)
+        self._flusher.start()
+
+    def flush(self):
+        """Atomically write latency windows and recent traces to the metrics file"""
+        if self.metrics_file is None:
+            return
+        with self._lock:
+            snapshot = {
+                'flushed_at': datetime.now().isoformat(),
+                'stages': [
+                    {'stage': stage, 'model': model, 'count': window.count, 'total': window.total,
+                     'samples': [round(sample, 6) for sample in window.samples]}
+                    for (stage, model), window in self._windows.items()
+                ],
+                'traces': [span.to_dict() for span in self.traces]
+            }
+        self.metrics_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.metrics_file.with_suffix('.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump(snapshot, f, default=str)
+        os.replace(tmp_file, self.metrics_file)
+
+    def _load(self):
+        """Restore latency windows from the last flush, so percentiles survive restarts"""
+        try:
+            with open(self.metrics_file) as f:
+                snapshot = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        for stage in snapshot.get('stages', []):
+            window = LatencyWindow()
+            window.samples.extend(stage['samples'])
+            window.count = stage['count']
+            window.total = stage['total']
+            self._windows[(stage['stage'], stage['model'])] = window
 
     def get_system_metrics(self) -> Dict[str, float]:
         """Get current system metrics"""
@@ -30,7 +255,8 @@ class PerformanceMonitor:
             start_time = time.time()
             memory_before = psutil.Process().memory_info().rss
 
-            result = func(*args, **kwargs)
+            with self.span(func.__name__):
+                result = func(*args, **kwargs)
 
             end_time = time.time()
             memory_after = psutil.Process().memory_info().rss
@@ -42,4 +268,17 @@ class PerformanceMonitor:
             }
             self.log_metrics(metrics)
             return result
-        return wrapper
\ No newline at end of file
+        return wrapper
+
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+def get_performance_monitor() -> PerformanceMonitor:
+    """Get the process-wide performance monitor, flushing to METRICS_FILE"""
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None:
+            _monitor = PerformanceMonitor(METRICS_FILE)
+            _monitor.start_flushing()
+        return _monitor
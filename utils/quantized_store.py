@@ -0,0 +1,672 @@
+import json
+import uuid
+import shutil
+import sqlite3
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from langchain.embeddings.base import Embeddings
+from langchain.schema import Document
+from langchain.vectorstores.base import VectorStore
+from config.settings import (
+    VECTOR_STORE_DIR,
+    VECTOR_QUANTIZATION,
+    VECTOR_PQ_SUBSPACES,
+    VECTOR_PQ_TRAIN_SIZE,
+    VECTOR_RESCORE_FACTOR,
+    VECTOR_SEARCH_BLOCK
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS rows (
+    row INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    doc_id TEXT,
+    document TEXT,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_rows_doc_id ON rows(doc_id);
+"""
+
+class QuantizedCollection:
+    """Vector collection with int8 or product-quantized codes and float vectors in memory-mapped files
+
+    Search scores the compact codes of every row in NumPy blocks and rescores a shortlist
+    with the exact float vectors, which are only paged in for the shortlisted rows. Rows
+    are append-only; replaced and deleted rows are skipped until the files are compacted.
+    The API mirrors the parts of a Chroma collection the app uses.
+    """
+
+    def __init__(self, directory: Path, quantization: str = VECTOR_QUANTIZATION,
+                 pq_subspaces: int = VECTOR_PQ_SUBSPACES, pq_train_size: int = VECTOR_PQ_TRAIN_SIZE,
+                 rescore_factor: int = VECTOR_RESCORE_FACTOR, block_size: int = VECTOR_SEARCH_BLOCK):
+        if quantization not in ('int8', 'pq'):
+            raise ValueError(f"Unsupported quantization: {quantization}")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.pq_subspaces = pq_subspaces
+        self.pq_train_size = pq_train_size
+        self.rescore_factor = rescore_factor
+        self.block_size = block_size
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self.connection.executescript(SCHEMA)
+
+        # Settings of an existing collection win over the arguments
+        self.quantization = self._get_meta('quantization') or quantization
+        self.dim = None
+        self.row_count = 0
+        self.generation = None
+        self.codebooks = None
+        self._deleted = np.zeros(0, dtype=bool)
+        self._arrays = None
+        # Loads the committed state and drops whatever a crashed writer appended after it
+        with self._write():
+            pass
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Connection for the current thread"""
+        conn = getattr(self._local, 'connection', None)
+        if conn is None:
+            conn = sqlite3.connect(self.directory / "rows.db", timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = conn
+        return conn
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _set_meta(conn: sqlite3.Connection, **values):
+        conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [(key, str(value)) for key, value in values.items()]
+        )
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction on the current files; BEGIN IMMEDIATE serializes writers across processes"""
+        with self._lock:
+            conn = self.connection
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._sync(conn)
+                self._recover()
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    @contextmanager
+    def _read(self) -> Iterator[sqlite3.Connection]:
+        """Read transaction: one snapshot of the rows, with the state reloaded if it is stale"""
+        with self._lock:
+            conn = self.connection
+            conn.execute("BEGIN")
+            try:
+                self._sync(conn)
+                yield conn
+            finally:
+                conn.execute("COMMIT")
+
+    def _sync(self, conn: sqlite3.Connection):
+        """Reload the row count, generation and codebooks if another writer changed them"""
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        generation = int(meta.get('generation') or 0)
+        count = int(meta.get('count') or 0)
+        trained = self.codebooks is not None or self._path('codebooks', generation).exists()
+        if (generation, count, trained) == (self.generation, self.row_count, self.codebooks is not None):
+            return
+        codebooks = np.load(self._path('codebooks', generation)) if trained else None
+        self.dim = int(meta.get('dim') or 0) or None
+        self.generation = generation
+        self.row_count = count
+        self.codebooks = codebooks
+        live = [row for row, in conn.execute("SELECT row FROM rows")]
+        self._deleted = np.ones(self.row_count, dtype=bool)
+        self._deleted[live] = False
+        self._arrays = None
+
+    def _superseded(self) -> bool:
+        """Whether another writer compacted since the state was loaded; the old files may be gone"""
+        return int(self._get_meta('generation') or 0) != self.generation
+
+    def _path(self, name: str, generation: Optional[int] = None) -> Path:
+        """File of the current (or given) generation; compaction starts a new one"""
+        generation = self.generation if generation is None else generation
+        suffix = {'vectors': 'f32', 'codes': 'bin', 'scales': 'f32', 'codebooks': 'npy'}[name]
+        return self.directory / f"{name}.{generation}.{suffix}"
+
+    @property
+    def code_size(self) -> int:
+        """Bytes of quantized code per vector"""
+        return self.dim if self.quantization == 'int8' else self.codebooks.shape[0]
+
+    @property
+    def has_codes(self) -> bool:
+        """Whether rows have codes; PQ collections score exact vectors until codebooks are trained"""
+        return self.quantization == 'int8' or self.codebooks is not None
+
+    def _recover(self):
+        """Drop rows written after the last commit and files of older generations; needs the write lock"""
+        for path in self.directory.iterdir():
+            parts = path.name.split('.')
+            if len(parts) == 3 and parts[1].isdigit() and int(parts[1]) != self.generation:
+                path.unlink(missing_ok=True)
+        if self.dim is None:
+            return
+        row_bytes = {'vectors': self.dim * 4, 'scales': 4}
+        if self.has_codes:
+            row_bytes['codes'] = self.code_size
+        for name, size in row_bytes.items():
+            path = self._path(name)
+            if path.exists() and path.stat().st_size > self.row_count * size:
+                with open(path, 'r+b') as f:
+                    f.truncate(self.row_count * size)
+
+    def _open_arrays(self) -> Dict[str, np.ndarray]:
+        """Memory-map the row files; remapped after every write"""
+        with self._lock:
+            if self._arrays is None:
+                arrays = {}
+                if self.row_count:
+                    arrays['vectors'] = np.memmap(self._path('vectors'), dtype=np.float32,
+                                                  mode='r', shape=(self.row_count, self.dim))
+                    if self.has_codes:
+                        dtype = np.int8 if self.quantization == 'int8' else np.uint8
+                        arrays['codes'] = np.memmap(self._path('codes'), dtype=dtype, mode='r',
+                                                    shape=(self.row_count, self.code_size))
+                    if self.quantization == 'int8':
+                        arrays['scales'] = np.memmap(self._path('scales'), dtype=np.float32,
+                                                     mode='r', shape=(self.row_count,))
+                arrays['deleted'] = self._deleted.copy() if self.row_count else np.zeros(0, bool)
+                self._arrays = arrays
+            return self._arrays
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """Unit-length float32 vectors; inner product is then cosine similarity"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[None, :]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def _encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Quantized codes (and int8 scales) of normalized vectors"""
+        if self.quantization == 'int8':
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales = np.maximum(scales, 1e-12).astype(np.float32)
+            codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+            return codes, scales
+        m = self.codebooks.shape[0]
+        subvectors = vectors.reshape(len(vectors), m, -1)
+        codes = np.empty((len(vectors), m), dtype=np.uint8)
+        for j in range(m):
+            codes[:, j] = self._nearest(subvectors[:, j], self.codebooks[j])
+        return codes, None
+
+    @staticmethod
+    def _nearest(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        """Index of the nearest centroid of every point"""
+        distances = (centroids ** 2).sum(axis=1)[None, :] - 2.0 * points @ centroids.T
+        return distances.argmin(axis=1)
+
+    def upsert(self, ids: List[str], embeddings: Iterable[Iterable[float]],
+               metadatas: Optional[List[Dict]] = None, documents: Optional[List[str]] = None):
+        """Add rows, replacing rows with the same ids"""
+        if not ids:
+            return
+        vectors = self._normalize(embeddings)
+        metadatas = metadatas or [{} for _ in ids]
+        documents = documents or [None for _ in ids]
+        with self._write() as conn:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            start = self.row_count
+            with open(self._path('vectors'), 'ab') as f:
+                f.write(vectors.tobytes())
+            if self.has_codes:
+                codes, scales = self._encode(vectors)
+                with open(self._path('codes'), 'ab') as f:
+                    f.write(codes.tobytes())
+                if scales is not None:
+                    with open(self._path('scales'), 'ab') as f:
+                        f.write(scales.tobytes())
+
+            # Rows become visible only once the transaction commits
+            replaced = self._rows(conn, "id IN ({})".format(', '.join('?' * len(ids))), ids)
+            conn.execute(
+                "DELETE FROM rows WHERE id IN ({})".format(', '.join('?' * len(ids))), ids
+            )
+            conn.executemany(
+                "INSERT INTO rows (row, id, doc_id, document, metadata) VALUES (?, ?, ?, ?, ?)",
+                [(start + i, id, (metadata or {}).get('doc_id'), document,
+                  json.dumps(metadata or {}, default=str))
+                 for i, (id, metadata, document) in enumerate(zip(ids, metadatas, documents))]
+            )
+            self._set_meta(conn, dim=self.dim, count=start + len(ids),
+                           quantization=self.quantization, generation=self.generation)
+            self.row_count = start + len(ids)
+            self._deleted = np.concatenate([self._deleted, np.zeros(len(ids), dtype=bool)])
+            self._deleted[replaced] = True
+            self._arrays = None
+
+        if self.quantization == 'pq' and self.codebooks is None and \
+                self.row_count - int(self._deleted.sum()) >= self.pq_train_size:
+            self._train_pq()
+        self._maybe_compact()
+
+    add = upsert
+
+    def _rows(self, conn: sqlite3.Connection, condition: str, params: Iterable[Any]) -> List[int]:
+        return [row for row, in conn.execute(f"SELECT row FROM rows WHERE {condition}", tuple(params))]
+
+    def _train_pq(self):
+        """Train per-subspace k-means codebooks on a sample of rows and encode every row"""
+        with self._write():
+            if self.codebooks is None:
+                self._train_codebooks()
+
+    def _train_codebooks(self):
+        vectors = self._open_arrays()['vectors']
+        live = np.flatnonzero(~self._deleted)
+        rng = np.random.default_rng(0)
+        sample = np.sort(rng.choice(live, min(len(live), self.pq_train_size), replace=False))
+        training = np.asarray(vectors[sample])
+
+        # The largest divisor of the dimension not above the configured subspace count
+        m = max(d for d in range(1, min(self.pq_subspaces, self.dim) + 1) if self.dim % d == 0)
+        subvectors = training.reshape(len(training), m, -1)
+        centroids = min(256, len(training))
+        codebooks = np.empty((m, centroids, self.dim // m), dtype=np.float32)
+        for j in range(m):
+            points = subvectors[:, j]
+            codebook = points[rng.choice(len(points), centroids, replace=False)].copy()
+            for _ in range(15):
+                assignment = self._nearest(points, codebook)
+                # Centroid sums over points sorted by cluster; empty clusters keep their centroid
+                order = np.argsort(assignment, kind='stable')
+                clusters, starts = np.unique(assignment[order], return_index=True)
+                codebook[clusters] = np.add.reduceat(points[order], starts, axis=0) / \
+                    np.diff(np.append(starts, len(order)))[:, None]
+            codebooks[j] = codebook
+
+        self.codebooks = codebooks
+        with open(self._path('codes'), 'wb') as f:
+            for start in range(0, self.row_count, self.block_size):
+                codes, _ = self._encode(np.asarray(vectors[start:start + self.block_size]))
+                f.write(codes.tobytes())
+        np.save(self._path('codebooks'), codebooks)
+        self._arrays = None
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None):
+        """Delete rows by id and/or metadata filter"""
+        condition, params = self._where(where)
+        if ids is not None:
+            if not ids:
+                return
+            condition += " AND id IN ({})".format(', '.join('?' * len(ids)))
+            params += list(ids)
+        with self._write() as conn:
+            rows = self._rows(conn, condition, params)
+            conn.executemany("DELETE FROM rows WHERE row = ?", [(row,) for row in rows])
+            if rows:
+                self._deleted[rows] = True
+                self._arrays = None
+        if rows:
+            self._maybe_compact()
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None,
+            limit: Optional[int] = None, include: Iterable[str] = ('metadatas', 'documents')) -> Dict:
+        """Rows by id and/or metadata filter, as Chroma returns them"""
+        condition, params = self._where(where)
+        if ids is not None:
+            condition += " AND id IN ({})".format(', '.join('?' * len(ids)) or 'NULL')
+            params += list(ids)
+        sql = f"SELECT row, id, document, metadata FROM rows WHERE {condition} ORDER BY row"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        while True:
+            try:
+                with self._read() as conn:
+                    rows = conn.execute(sql, tuple(params)).fetchall()
+                    vectors = self._open_arrays().get('vectors')
+                break
+            except FileNotFoundError:
+                # Another process compacted and removed the files of this snapshot; read the new ones
+                if not self._superseded():
+                    raise
+        result = {'ids': [row[1] for row in rows], 'embeddings': None, 'metadatas': None,
+                  'documents': None}
+        if 'embeddings' in include:
+            result['embeddings'] = vectors[[row[0] for row in rows]].tolist() if rows else []
+        if 'metadatas' in include:
+            result['metadatas'] = [json.loads(row[3]) for row in rows]
+        if 'documents' in include:
+            result['documents'] = [row[2] for row in rows]
+        return result
+
+    def count(self) -> int:
+        """Number of live rows"""
+        return self.connection.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+
+    def query(self, query_embeddings: Iterable[Iterable[float]], n_results: int = 4,
+              where: Optional[Dict] = None,
+              include: Iterable[str] = ('metadatas', 'documents', 'distances')) -> Dict:
+        """Nearest rows of every query, as Chroma returns them; distances are squared L2 of unit vectors"""
+        queries = self._normalize(query_embeddings)
+        while True:
+            with self._read() as conn:
+                generation = self.generation
+                allowed = None
+                if where:
+                    condition, params = self._where(where)
+                    allowed = self._rows(conn, condition, params)
+            try:
+                rows, scores, searched = self._search(queries, n_results, allowed)
+            except FileNotFoundError:
+                if not self._superseded():
+                    raise
+                continue
+
+            flat = sorted({row for query_rows in rows for row in query_rows})
+            records = {}
+            with self._read() as conn:
+                # Compaction renumbers rows, so rows found before it must not be looked up after it
+                if self.generation != generation or searched != generation:
+                    continue
+                for start in range(0, len(flat), 900):
+                    batch = flat[start:start + 900]
+                    for row, id, document, metadata in conn.execute(
+                        "SELECT row, id, document, metadata FROM rows WHERE row IN ({})".format(
+                            ', '.join('?' * len(batch))), batch
+                    ):
+                        records[row] = (id, document, json.loads(metadata))
+            break
+        result = {'ids': [], 'distances': [], 'metadatas': [], 'documents': []}
+        for query_rows, query_scores in zip(rows, scores):
+            # A row deleted since the search started is skipped
+            hits = [(records[row], score) for row, score in zip(query_rows, query_scores)
+                    if row in records]
+            result['ids'].append([record[0] for record, _ in hits])
+            result['documents'].append([record[1] for record, _ in hits])
+            result['metadatas'].append([record[2] for record, _ in hits])
+            result['distances'].append([float(2.0 - 2.0 * score) for _, score in hits])
+        for name in ('distances', 'metadatas', 'documents'):
+            if name not in include:
+                result[name] = None
+        return result
+
+    def search(self, queries: np.ndarray, k: int,
+               allowed: Optional[Iterable[int]] = None) -> Tuple[List[List[int]], List[List[float]]]:
+        """Top-k rows and cosine scores of normalized queries: quantized shortlist, exact rescoring"""
+        rows, scores, _ = self._search(queries, k, allowed)
+        return rows, scores
+
+    def _search(self, queries: np.ndarray, k: int, allowed: Optional[Iterable[int]] = None
+                ) -> Tuple[List[List[int]], List[List[float]], int]:
+        """search() over one snapshot of the files, with the generation its row numbers belong to"""
+        with self._lock:
+            arrays = self._open_arrays()
+            has_codes = self.has_codes
+            codebooks = self.codebooks
+            generation = self.generation
+        # Rows written after the snapshot are not searched
+        row_count = len(arrays['deleted'])
+        if not row_count or k <= 0:
+            return [[] for _ in queries], [[] for _ in queries], generation
+
+        live = ~arrays['deleted']
+        if allowed is not None:
+            mask = np.zeros(len(live), dtype=bool)
+            # Rows found under another generation are out of range here; query() retries those
+            allowed = np.asarray(list(allowed), dtype=np.int64)
+            mask[allowed[allowed < row_count]] = True
+            live &= mask
+        candidates = int(live.sum())
+        if not candidates:
+            return [[] for _ in queries], [[] for _ in queries], generation
+
+        shortlist = min(candidates, k * self.rescore_factor if has_codes else k)
+        if has_codes and self.quantization == 'pq':
+            m = codebooks.shape[0]
+            subqueries = queries.reshape(len(queries), m, -1)
+            # Lookup tables of subquery-centroid inner products, one per query and subspace
+            tables = np.einsum('qmd,mcd->qmc', subqueries, codebooks)
+
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, row_count, self.block_size):
+            end = min(start + self.block_size, row_count)
+            block_live = live[start:end]
+            if not block_live.any():
+                continue
+            if not has_codes:
+                scores = queries @ np.asarray(arrays['vectors'][start:end]).T
+            elif self.quantization == 'int8':
+                codes = np.asarray(arrays['codes'][start:end], dtype=np.float32)
+                scores = (queries @ codes.T) * arrays['scales'][start:end][None, :]
+            else:
+                codes = np.asarray(arrays['codes'][start:end])
+                scores = np.zeros((len(queries), end - start), dtype=np.float32)
+                for j in range(m):
+                    scores += tables[:, j, codes[:, j]]
+            scores[:, ~block_live] = -np.inf
+
+            # Keep the running shortlist of every query
+            rows = np.broadcast_to(np.arange(start, end), scores.shape)
+            best_rows = np.concatenate([best_rows, rows], axis=1)
+            best_scores = np.concatenate([best_scores, scores.astype(np.float32)], axis=1)
+            if best_scores.shape[1] > shortlist:
+                top = np.argpartition(-best_scores, shortlist - 1, axis=1)[:, :shortlist]
+                best_rows = np.take_along_axis(best_rows, top, axis=1)
+                best_scores = np.take_along_axis(best_scores, top, axis=1)
+
+        # Exact rescoring reads only the shortlisted float vectors from disk
+        unique_rows = np.unique(best_rows)
+        exact = np.asarray(arrays['vectors'][unique_rows]) @ queries.T
+        positions = np.searchsorted(unique_rows, best_rows)
+        result_rows, result_scores = [], []
+        for i in range(len(queries)):
+            scores = np.where(np.isfinite(best_scores[i]), exact[positions[i], i], -np.inf)
+            order = np.argsort(-scores, kind='stable')[:k]
+            order = order[np.isfinite(scores[order])]
+            result_rows.append(best_rows[i, order].tolist())
+            result_scores.append(scores[order].tolist())
+        return result_rows, result_scores, generation
+
+    def _where(self, where: Optional[Dict]) -> Tuple[str, List[Any]]:
+        """SQL condition for a Chroma-style metadata filter"""
+        if not where:
+            return "1 = 1", []
+        clauses, params = [], []
+        for key, condition in where.items():
+            if key in ('$and', '$or'):
+                parts = [self._where(part) for part in condition]
+                joiner = " AND " if key == '$and' else " OR "
+                clauses.append("(" + joiner.join(sql for sql, _ in parts) + ")")
+                params += [param for _, part_params in parts for param in part_params]
+                continue
+            column = "doc_id" if key == 'doc_id' else "json_extract(metadata, ?)"
+            column_params = [] if key == 'doc_id' else [f'$."{key}"']
+            operator, value = next(iter(condition.items())) if isinstance(condition, dict) \
+                else ('$eq', condition)
+            if operator in ('$in', '$nin'):
+                placeholders = ', '.join('?' * len(value)) or 'NULL'
+                negation = "NOT " if operator == '$nin' else ""
+                clauses.append(f"{column} {negation}IN ({placeholders})")
+                params += column_params + list(value)
+            else:
+                sql_operator = {'$eq': '=', '$ne': '!=', '$gt': '>', '$gte': '>=',
+                                '$lt': '<', '$lte': '<='}[operator]
+                clauses.append(f"{column} {sql_operator} ?")
+                params += column_params + [value]
+        return " AND ".join(clauses), params
+
+    def _needs_compaction(self) -> bool:
+        deleted = int(self._deleted.sum())
+        return deleted >= self.block_size // 16 and deleted * 2 >= self.row_count
+
+    def _maybe_compact(self):
+        """Rewrite the files without deleted rows once they make up most of the collection"""
+        if not self._needs_compaction():
+            return
+        with self._write() as conn:
+            # Another writer may have compacted or added rows since the check
+            if self._needs_compaction():
+                self._compact(conn)
+
+    def _compact(self, conn: sqlite3.Connection):
+        live = np.flatnonzero(~self._deleted)
+        arrays = self._open_arrays()
+        generation = self.generation + 1
+        names = [name for name in ('vectors', 'codes', 'scales') if name in arrays]
+        for name in names:
+            with open(self._path(name, generation), 'wb') as f:
+                for start in range(0, len(live), self.block_size):
+                    f.write(np.asarray(arrays[name][live[start:start + self.block_size]]).tobytes())
+        if self.codebooks is not None:
+            np.save(self._path('codebooks', generation), self.codebooks)
+
+        # Renumbering in ascending order never collides: every row moves down or stays
+        conn.executemany("UPDATE rows SET row = ? WHERE row = ?",
+                         [(new, int(old)) for new, old in enumerate(live) if new != old])
+        self._set_meta(conn, count=len(live), generation=generation)
+        self.generation = generation
+        self.row_count = len(live)
+        self._deleted = np.zeros(self.row_count, dtype=bool)
+        # The old generation's files stay until the next write, for readers that have not reloaded yet
+        self._arrays = None
+
+    def flush(self):
+        """Nothing is buffered: rows are appended to the files and committed as they are written"""
+        self._arrays = None
+
+    def memory_bytes(self) -> int:
+        """Bytes scanned per search: codes, scales and codebooks (all vectors before PQ training)"""
+        if not self.row_count:
+            return 0
+        if not self.has_codes:
+            return self.row_count * self.dim * 4
+        size = self.row_count * self.code_size
+        if self.quantization == 'int8':
+            size += self.row_count * 4
+        else:
+            size += self.codebooks.nbytes
+        return size
+
+    def disk_bytes(self) -> int:
+        """Bytes on disk, including the exact vectors and row metadata"""
+        return sum(path.stat().st_size for path in self.directory.iterdir() if path.is_file())
+
+    def drop(self):
+        """Delete the collection and its files"""
+        with _collections_lock:
+            if _collections.get(self.directory.resolve()) is self:
+                del _collections[self.directory.resolve()]
+        with self._lock:
+            conn = getattr(self._local, 'connection', None)
+            if conn is not None:
+                conn.close()
+                self._local.connection = None
+            self._arrays = None
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+
+_collections: Dict[Path, QuantizedCollection] = {}
+_collections_lock = threading.Lock()
+
+def get_collection(directory: Path, quantization: str = VECTOR_QUANTIZATION) -> QuantizedCollection:
+    """The process-wide collection of a directory; separate instances would compact each other's files away"""
+    path = Path(directory).resolve()
+    with _collections_lock:
+        collection = _collections.get(path)
+        if collection is None:
+            collection = _collections[path] = QuantizedCollection(path, quantization)
+        return collection
+
+
+class QuantizedVectorStore(VectorStore):
+    """LangChain vector store over a QuantizedCollection, usable where the app uses Chroma"""
+
+    def __init__(self, collection_name: str, embedding_function: Embeddings,
+                 directory: Path = VECTOR_STORE_DIR, quantization: str = VECTOR_QUANTIZATION):
+        self.collection_name = collection_name
+        self._embedding_function = embedding_function
+        self._collection = get_collection(Path(directory) / collection_name, quantization)
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding_function
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[Dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        """Embed and add texts"""
+        texts = list(texts)
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        self._collection.upsert(ids=ids, embeddings=self._embedding_function.embed_documents(texts),
+                                metadatas=metadatas, documents=texts)
+        return ids
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4,
+                                               filter: Optional[Dict] = None) -> List[Tuple[Document, float]]:
+        """Nearest chunks of an embedding with their distances"""
+        result = self._collection.query([embedding], k, where=filter)
+        return [
+            (Document(page_content=document or "", metadata=metadata), distance)
+            for document, metadata, distance in zip(
+                result['documents'][0], result['metadatas'][0], result['distances'][0]
+            )
+        ]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[Dict] = None,
+                                     **kwargs: Any) -> List[Tuple[Document, float]]:
+        """Nearest chunks of a query with their distances"""
+        return self.similarity_search_by_vector_with_score(
+            self._embedding_function.embed_query(query), k, filter
+        )
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict] = None,
+                          **kwargs: Any) -> List[Document]:
+        """Nearest chunks of a query"""
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4,
+                                    filter: Optional[Dict] = None, **kwargs: Any) -> List[Document]:
+        """Nearest chunks of an embedding"""
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, filter)]
+
+    def _select_relevance_score_fn(self):
+        # Squared L2 distance of unit vectors back to cosine similarity
+        return lambda distance: 1.0 - distance / 2.0
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any):
+        """Delete chunks by id"""
+        self._collection.delete(ids=ids)
+
+    def persist(self):
+        """Writes are durable as they happen; kept for parity with Chroma"""
+        self._collection.flush()
+
+    def delete_collection(self):
+        """Delete the collection and its files"""
+        self._collection.drop()
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[Dict]] = None,
+                   collection_name: str = "langchain", **kwargs: Any) -> "QuantizedVectorStore":
+        """Create a store from texts"""
+        store = cls(collection_name, embedding, **kwargs)
+        store.add_texts(texts, metadatas)
+        return store
@@ -1,15 +1,63 @@
+from __future__ import annotations
 import re
-from typing import List, Dict, Any
-from langchain.text_splitter import CharacterTextSplitter
-from langchain.embeddings import HuggingFaceEmbeddings
-from langchain.vectorstores import Chroma
-from config.settings import CHUNK_SETTINGS, CHROMA_SETTINGS, PERSIST_DIRECTORY
+import time
+import uuid
+import hashlib
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, List, Dict, Any, Callable, Iterable, Iterator, Optional, Set, Tuple
+from langchain.schema import Document
+from utils.embedding_cache import CachedEmbeddings, get_embedding_cache
+from utils.resource_pool import get_resource_pool
+from utils.document_loader import DocumentLoader
+from utils.performance_monitor import PerformanceMonitor, Span
+from utils.answer_cache import get_answer_cache
+from utils.parse_cache import ParseCache
+from utils.bm25_index import HybridRetriever, get_bm25_index
+from utils.context_packer import ContextPacker, PackedRetriever
+from utils.chunker import TokenChunker
+from utils.text_normalizer import TextNormalizer
+from config.settings import (
+    CHUNK_SETTINGS,
+    CHUNK_OVERLAP_TOKENS,
+    TOKEN_CHUNKING,
+    TEXT_NORMALIZATION,
+    PERSIST_DIRECTORY,
+    VECTOR_BACKEND,
+    VECTOR_STORE_DIR,
+    EMBEDDING_MODELS,
+    OLLAMA_BASE_URL,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_THREADS,
+    STREAM_BATCH_SIZE,
+    HYBRID_RETRIEVAL,
+    RETRIEVAL_QUERY_BATCH,
+    CONTEXT_PACKING,
+    CONTEXT_FETCH_K,
+    CONTEXT_TOKEN_BUDGET,
+    RERANKER_MODEL
+)
+
+# Vector stores, chains and the LLM client are imported where they are first used
+if TYPE_CHECKING:
+    from langchain.vectorstores import Chroma
+    from langchain.chains import RetrievalQA
+    from langchain.llms import Ollama
 
 class RAGOptimizer:
-    def __init__(self, model_name: str, embedding_model: str):
+    def __init__(self, model_name: str, embedding_model: str, collection_name: str = "default",
+                 performance_monitor: Optional[PerformanceMonitor] = None):
         self.model_name = model_name
         self.embedding_model = embedding_model
+        self.collection_name = collection_name
+        self.performance_monitor = performance_monitor
+        self.pool = get_resource_pool()
         self.chunk_settings = self._get_chunk_settings()
+        self.embedding_cache = get_embedding_cache(embedding_model)
+        self.parse_cache = ParseCache()
+        self.bm25_index = get_bm25_index()
+        # BM25 chunks are kept per vector collection, like the vectors they are fused with
+        self.bm25_collection = self.get_vector_collection_name(collection_name, embedding_model)
+        self._chunker = None
 
     def _get_chunk_settings(self) -> Dict[str, int]:
         """Get optimal chunk settings based on model"""
@@ -17,61 +65,473 @@ class RAGOptimizer:
 
     def process_text(self, text: str) -> str:
         """Preprocess text for better RAG performance"""
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Normalize quotes
-        text = re.sub(r'["""]', '"', text)
-        
-        # Normalize apostrophes
-        text = re.sub(r'[''`]', "'", text)
-        
-        # Remove special characters but keep essential punctuation
-        text = re.sub(r'[^\w\s.,!?;:()"\'-]', '', text)
-        
-        return text.strip()
+        # Same pipeline as document chunks, so questions and chunks embed alike
+        return TextNormalizer.normalize(text)
 
     def create_chunks(self, documents: List[Any]) -> List[Any]:
         """Create optimized chunks from documents"""
-        text_splitter = CharacterTextSplitter(
-            chunk_size=self.chunk_settings['size'],
-            chunk_overlap=self.chunk_settings['overlap'],
-            separator="\n"
-        )
-        return text_splitter.split_documents(documents)
+        with self._span('chunk', model=self.embedding_model, documents=len(documents)):
+            if TOKEN_CHUNKING:
+                return self.get_chunker().split_documents(documents)
+
+            from langchain.text_splitter import CharacterTextSplitter
+
+            text_splitter = CharacterTextSplitter(
+                chunk_size=self.chunk_settings['size'],
+                chunk_overlap=self.chunk_settings['overlap'],
+                separator="\n"
+            )
+            chunks = text_splitter.split_documents(documents)
+            if TEXT_NORMALIZATION:
+                TextNormalizer.normalize_documents(chunks)
+            return chunks
+
+    def _span(self, name: str, parent: Optional[Span] = None, **attributes):
+        """Trace a stage when a performance monitor is attached"""
+        if self.performance_monitor is None:
+            return nullcontext()
+        return self.performance_monitor.span(name, parent, **attributes)
+
+    def _start_span(self, name: str, parent: Optional[Span] = None, **attributes) -> Optional[Span]:
+        """Open a span that outlives the current block, when a performance monitor is attached"""
+        if self.performance_monitor is None:
+            return None
+        return self.performance_monitor.start_span(name, parent, **attributes)
+
+    def _end_span(self, span: Optional[Span], **attributes):
+        """Close a span opened with _start_span"""
+        if span is not None:
+            self.performance_monitor.end_span(span, **attributes)
+
+    def get_chunker(self) -> TokenChunker:
+        """Get a chunker sized to the embedding model's maximum sequence length"""
+        if self._chunker is None:
+            client = self.pool.get_embeddings(self.embedding_model).client
+            # Leave room for the [CLS]/[SEP] tokens the model adds
+            self._chunker = TokenChunker(
+                client.tokenizer,
+                max_tokens=client.max_seq_length - 2,
+                overlap_tokens=CHUNK_OVERLAP_TOKENS,
+                normalize=TextNormalizer.normalize_batch if TEXT_NORMALIZATION else None
+            )
+        return self._chunker
+
+    def get_chunk_cache_kind(self) -> str:
+        """Parse cache kind for chunks produced by the current chunking configuration"""
+        if TOKEN_CHUNKING:
+            settings = {'embedding_model': self.embedding_model, 'overlap_tokens': CHUNK_OVERLAP_TOKENS}
+        else:
+            settings = dict(self.chunk_settings)
+        settings['normalized'] = TEXT_NORMALIZATION
+        return ParseCache.chunk_kind(settings)
+
+    def get_embeddings(self) -> CachedEmbeddings:
+        """Get embedding function backed by the persistent embedding cache"""
+        embeddings = self.pool.get_embeddings(self.embedding_model)
+        return CachedEmbeddings(embeddings, self.embedding_cache)
 
     def setup_vectorstore(self, documents: List[Any]) -> Chroma:
         """Setup vector store with optimized settings"""
-        embeddings = HuggingFaceEmbeddings(
-            model_name=self.embedding_model,
-            model_kwargs={'device': 'cpu'}
-        )
-
-        # Create new vector store
-        vectorstore = Chroma.from_documents(
-            documents=documents,
-            embedding=embeddings,
-            persist_directory=str(PERSIST_DIRECTORY)
-        )
-        
-        # Persist the vector store
-        vectorstore.persist()
-        return vectorstore
+        return self.update_vectorstore(self.get_existing_vectorstore(), documents)
 
     def get_existing_vectorstore(self) -> Chroma:
         """Get existing vector store if it exists"""
-        embeddings = HuggingFaceEmbeddings(
-            model_name=self.embedding_model,
-            model_kwargs={'device': 'cpu'}
+        return self.pool.get_vectorstore(
+            self.collection_name,
+            self.embedding_model,
+            lambda: self.open_vectorstore(
+                self.get_vector_collection_name(self.collection_name, self.embedding_model),
+                self.get_embeddings(),
+                collection_metadata={
+                    'collection': self.collection_name,
+                    'embedding_model': self.embedding_model
+                }
+            )
         )
-        
+
+    @staticmethod
+    def open_vectorstore(name: str, embedding_function: Optional[Any] = None,
+                         collection_metadata: Optional[Dict[str, str]] = None) -> Chroma:
+        """Open a vector collection with the configured backend: Chroma or quantized memory-mapped files"""
+        if VECTOR_BACKEND == 'quantized':
+            from utils.quantized_store import QuantizedVectorStore
+            return QuantizedVectorStore(name, embedding_function)
+        from langchain.vectorstores import Chroma
         return Chroma(
+            collection_name=name,
             persist_directory=str(PERSIST_DIRECTORY),
-            embedding_function=embeddings
+            embedding_function=embedding_function,
+            collection_metadata=collection_metadata
+        )
+
+    @staticmethod
+    def list_vector_collections() -> Set[str]:
+        """Names of the vector collections that exist, without creating or opening any"""
+        if VECTOR_BACKEND == 'quantized':
+            if not VECTOR_STORE_DIR.exists():
+                return set()
+            return {path.name for path in VECTOR_STORE_DIR.iterdir() if path.is_dir()}
+        import chromadb
+        client = chromadb.PersistentClient(path=str(PERSIST_DIRECTORY))
+        # Collection objects before chromadb 0.6, names since
+        return {getattr(collection, 'name', collection) for collection in client.list_collections()}
+
+    @staticmethod
+    def get_vector_collection_name(collection_name: str, embedding_model: str) -> str:
+        """Get the Chroma collection name for a repository collection and embedding model"""
+        # Chroma names are limited to 63 characters of [a-zA-Z0-9._-]
+        readable = re.sub(r'[^a-zA-Z0-9_-]', '_', collection_name)[:24]
+        model = re.sub(r'[^a-zA-Z0-9_-]', '_', embedding_model.split('/')[-1])[:20]
+        digest = hashlib.sha1(f"{collection_name}\0{embedding_model}".encode('utf-8')).hexdigest()[:12]
+        return f"rag_{readable}_{model}_{digest}"
+
+    @staticmethod
+    def get_staging_collection_name(collection_name: str) -> str:
+        """Get the collection background ingest indexes into before promoting documents"""
+        return f"{collection_name}::staging"
+
+    @staticmethod
+    def delete_collection_vectors(collection_name: str):
+        """Drop the vectors of a repository collection for every embedding model"""
+        existing = RAGOptimizer.list_vector_collections()
+        pool = get_resource_pool()
+        for name in (collection_name, RAGOptimizer.get_staging_collection_name(collection_name)):
+            handles = {model: pool.peek_vectorstore(name, model) for model in EMBEDDING_MODELS.values()}
+            pool.invalidate_collection(name)
+            # Chunks indexed before BM25 was kept per embedding model
+            get_bm25_index().remove_collection(name)
+            for embedding_model, vectorstore in handles.items():
+                vector_collection = RAGOptimizer.get_vector_collection_name(name, embedding_model)
+                get_bm25_index().remove_collection(vector_collection)
+                if vector_collection in existing:
+                    # Opening a collection that is not there would create it only to drop it
+                    vectorstore = vectorstore or RAGOptimizer.open_vectorstore(vector_collection)
+                    vectorstore.delete_collection()
+
+    @staticmethod
+    def delete_document_vectors(collection_name: str, doc_ids: List[str]):
+        """Drop the vectors of repository documents from a collection for every embedding model"""
+        if not doc_ids:
+            return
+        existing = RAGOptimizer.list_vector_collections()
+        for name in (collection_name, RAGOptimizer.get_staging_collection_name(collection_name)):
+            get_bm25_index().remove_documents(name, doc_ids)
+            for embedding_model in EMBEDDING_MODELS.values():
+                vector_collection = RAGOptimizer.get_vector_collection_name(name, embedding_model)
+                get_bm25_index().remove_documents(vector_collection, doc_ids)
+                if vector_collection not in existing:
+                    continue
+                # Opening a collection that is not there would create it
+                vectorstore = get_resource_pool().peek_vectorstore(name, embedding_model) or \
+                    RAGOptimizer.open_vectorstore(vector_collection)
+                vectorstore._collection.delete(where={'doc_id': {'$in': doc_ids}})
+
+    def setup_qa_chain(self, vectorstore: Chroma, k: int = 4) -> RetrievalQA:
+        """Set up the question-answering chain"""
+        def build_chain():
+            from langchain.chains import RetrievalQA
+            return RetrievalQA.from_chain_type(
+                llm=self.get_llm(),
+                chain_type="stuff",
+                retriever=self.get_retriever(vectorstore, k),
+                return_source_documents=True
+            )
+
+        return self.pool.get_qa_chain(
+            self.collection_name, self.embedding_model, self.model_name, k, build_chain
+        )
+
+    def get_llm(self) -> Ollama:
+        """Get the Ollama LLM used for answering"""
+        from langchain.llms import Ollama
+        return Ollama(model=self.model_name, base_url=OLLAMA_BASE_URL)
+
+    def get_retriever(self, vectorstore: Chroma, k: int = 4):
+        """Get the retriever used for answering: hybrid or vector search, optionally context-packed"""
+        fetch_k = max(k, CONTEXT_FETCH_K) if CONTEXT_PACKING else k
+        if HYBRID_RETRIEVAL:
+            self.bm25_index.adopt_chunks(self.collection_name, self.bm25_collection)
+            retriever = HybridRetriever(
+                vectorstore=vectorstore,
+                bm25_index=self.bm25_index,
+                collection_name=self.bm25_collection,
+                k=fetch_k,
+                performance_monitor=self.performance_monitor
+            )
+        else:
+            retriever = vectorstore.as_retriever(search_kwargs={"k": fetch_k})
+
+        if not CONTEXT_PACKING:
+            return retriever
+        packer = ContextPacker(
+            self.get_embeddings(),
+            self._get_token_budget(),
+            reranker=self.pool.get_reranker(RERANKER_MODEL) if RERANKER_MODEL else None,
+            performance_monitor=self.performance_monitor
+        )
+        return PackedRetriever(base_retriever=retriever, packer=packer, k=k)
+
+    def retrieve_batch(self, vectorstore: Chroma, queries: List[str], k: int = 4,
+                       where: Optional[Dict[str, Any]] = None,
+                       batch_size: int = RETRIEVAL_QUERY_BATCH) -> List[List[Tuple[Any, float]]]:
+        """Top k chunks of many queries as (document, distance) pairs, nearest first"""
+        if not queries or vectorstore._collection.count() == 0:
+            return [[] for _ in queries]
+
+        # Each batch is embedded in one forward pass and searched with one bulk query
+        embeddings = self.pool.get_embeddings(self.embedding_model)
+        results = []
+        with self._span('retrieve_batch', model=self.embedding_model, queries=len(queries)):
+            for batch in DocumentLoader.iter_batches(queries, batch_size):
+                # Queries bypass the embedding cache, which holds chunk vectors
+                with self._span('embed', model=self.embedding_model, queries=len(batch)):
+                    vectors = embeddings.embed_documents([self.process_text(query) for query in batch])
+                with self._span('vector_search', queries=len(batch)):
+                    found = vectorstore._collection.query(
+                        query_embeddings=vectors, n_results=k, where=where,
+                        include=['documents', 'metadatas', 'distances']
+                    )
+                for documents, metadatas, distances in zip(
+                    found['documents'], found['metadatas'], found['distances']
+                ):
+                    results.append([
+                        (Document(page_content=document, metadata=metadata or {}), distance)
+                        for document, metadata, distance in zip(documents, metadatas, distances)
+                    ])
+        return results
+
+    def _get_token_budget(self) -> int:
+        """Get the prompt context token budget for the model"""
+        return CONTEXT_TOKEN_BUDGET.get(self.model_name, CONTEXT_TOKEN_BUDGET['default'])
+
+    def stream_answer(self, vectorstore: Chroma, question: str, collection_version: int,
+                      k: int = 4) -> Tuple[List[Any], Iterator[str], Dict[str, Any]]:
+        """Retrieve source chunks and return them with an iterator over the answer tokens and the
+        answer's metrics, completed once the last token has been generated"""
+        start_time = time.time()
+        # Per-request metrics: the monitor's log is shared by every session
+        metrics = {'cached': False, 'context': None}
+        # The question span stays open until the last token has been generated
+        question_span = self._start_span('question', model=self.model_name)
+        answer_cache = get_answer_cache()
+        processed_question = self.process_text(question)
+        embedding = self._get_question_embedding(processed_question)
+
+        cached = answer_cache.get(self.collection_name, collection_version, self.model_name,
+                                  processed_question, embedding)
+        if cached is not None:
+            self._end_span(question_span, cached=True)
+            metrics.update(self._log_answer_metrics(start_time, time.time() - start_time, None, 0,
+                                                    cached=True))
+            return cached['sources'], iter([cached['answer']]), metrics
+
+        with self._span('retrieve', question_span, model=self.embedding_model):
+            retriever = self.get_retriever(vectorstore, k)
+            sources = retriever.get_relevant_documents(processed_question)
+        packer = getattr(retriever, 'packer', None)
+        metrics['context'] = packer.last_stats if packer is not None else None
+        retrieval_time = time.time() - start_time
+        prompt = self.build_prompt(processed_question, sources)
+
+        def generate() -> Iterator[str]:
+            tokens = []
+            first_token_time = None
+            generate_span = self._start_span('generate', question_span, model=self.model_name)
+            try:
+                for token in self.get_llm().stream(prompt):
+                    if first_token_time is None:
+                        first_token_time = time.time() - start_time
+                        if generate_span is not None:
+                            self.performance_monitor.record_span(
+                                'first_token', time.time() - generate_span.start,
+                                generate_span, model=self.model_name
+                            )
+                    tokens.append(token)
+                    yield token
+            finally:
+                self._end_span(generate_span, tokens=len(tokens))
+                self._end_span(question_span, cached=False)
+
+            answer_cache.put(self.collection_name, collection_version, self.model_name,
+                             processed_question, "".join(tokens), sources, embedding)
+            metrics.update(self._log_answer_metrics(start_time, retrieval_time, first_token_time,
+                                                    len(tokens)))
+
+        return sources, generate(), metrics
+
+    def build_prompt(self, question: str, sources: List[Any]) -> str:
+        """Build the stuff-chain prompt for a question and its source chunks"""
+        from langchain.chains.retrieval_qa.prompt import PROMPT
+        return PROMPT.format(
+            context="\n\n".join(doc.page_content for doc in sources),
+            question=question
         )
 
+    def _log_answer_metrics(self, start_time: float, retrieval_time: float,
+                            first_token_time: Optional[float], tokens: int,
+                            cached: bool = False) -> Dict[str, Any]:
+        """Log retrieval, time-to-first-token and total generation time of an answer"""
+        execution_time = time.time() - start_time
+        metrics = {
+            'function_name': 'stream_answer',
+            'llm_model': self.model_name,
+            'retrieval_time': retrieval_time,
+            'time_to_first_token': first_token_time if first_token_time is not None else execution_time,
+            'execution_time': execution_time,
+            'tokens': tokens,
+            'cached': cached
+        }
+        if self.performance_monitor is not None:
+            self.performance_monitor.log_metrics(dict(metrics))
+        return metrics
+
+    def _get_question_embedding(self, question: str) -> Optional[List[float]]:
+        """Embed a question when the answer cache matches near-duplicates"""
+        if get_answer_cache().semantic:
+            return self.get_embeddings().embed_query(question)
+        return None
+
     def update_vectorstore(self, vectorstore: Chroma, new_documents: List[Any]) -> Chroma:
         """Update existing vector store with new documents"""
-        vectorstore.add_documents(new_documents)
+        # Replace any vectors previously indexed for the same repository documents
+        doc_ids = list({doc.metadata['doc_id'] for doc in new_documents if 'doc_id' in doc.metadata})
+        if doc_ids:
+            self.remove_documents(vectorstore, doc_ids)
+
+        if new_documents:
+            self.add_chunks(vectorstore, new_documents)
+            vectorstore.persist()
+        return vectorstore
+
+    def index_documents(self, vectorstore: Chroma, documents: Iterable[Any], doc_ids: List[str],
+                        batch_size: int = STREAM_BATCH_SIZE,
+                        content_hash: Optional[str] = None,
+                        document_metadata: Optional[Dict[str, Any]] = None,
+                        progress: Optional[Callable[[int], None]] = None) -> Chroma:
+        """Replace the vectors of repository documents, chunking and embedding pages in batches"""
+        with self._span('index', model=self.embedding_model, documents=len(doc_ids)):
+            return self._index_documents(vectorstore, documents, doc_ids, batch_size,
+                                         content_hash, document_metadata, progress)
+
+    def _index_documents(self, vectorstore: Chroma, documents: Iterable[Any], doc_ids: List[str],
+                         batch_size: int, content_hash: Optional[str],
+                         document_metadata: Optional[Dict[str, Any]],
+                         progress: Optional[Callable[[int], None]]) -> Chroma:
+        self.remove_documents(vectorstore, doc_ids)
+
+        # Chunks of a single document are cached by its content hash and chunk settings
+        chunk_kind = self.get_chunk_cache_kind()
+        chunks = None
+        if content_hash is not None:
+            chunks = self.parse_cache.iter_documents(content_hash, chunk_kind)
+        if chunks is None:
+            chunks = self._iter_chunks(documents, batch_size)
+            if content_hash is not None:
+                chunks = self.parse_cache.write_through(content_hash, chunks, chunk_kind)
+
+        chunks_done = 0
+        for batch in DocumentLoader.iter_batches(chunks, batch_size):
+            if document_metadata:
+                for chunk in batch:
+                    chunk.metadata.update(document_metadata)
+            self.add_chunks(vectorstore, batch)
+            chunks_done += len(batch)
+            if progress is not None:
+                progress(chunks_done)
         vectorstore.persist()
-        return vectorstore
\ No newline at end of file
+        return vectorstore
+
+    def promote_documents(self, vectorstore: Chroma, staging_vectorstore: Chroma,
+                          staging_collection: str, doc_ids: List[str],
+                          batch_size: int = EMBEDDING_BATCH_SIZE) -> Chroma:
+        """Replace the vectors of documents with those indexed into a staging collection"""
+        where = {'doc_id': {'$in': doc_ids}}
+        with self._span('promote', model=self.embedding_model, documents=len(doc_ids)):
+            # Only ids are listed up front; vectors and texts are copied a batch at a time
+            staged_ids = staging_vectorstore._collection.get(where=where, include=[])['ids']
+            # Staged vectors are copied before the old ones go, so readers never see a gap;
+            # ids promoted by an interrupted earlier attempt are overwritten, not deleted
+            staged_set = set(staged_ids)
+            old_ids = [id for id in vectorstore._collection.get(where=where, include=[])['ids']
+                       if id not in staged_set]
+            for start in range(0, len(staged_ids), batch_size):
+                staged = staging_vectorstore._collection.get(
+                    ids=staged_ids[start:start + batch_size],
+                    include=['embeddings', 'metadatas', 'documents']
+                )
+                vectorstore._collection.upsert(
+                    ids=staged['ids'],
+                    embeddings=staged['embeddings'],
+                    metadatas=staged['metadatas'],
+                    documents=staged['documents']
+                )
+            if old_ids:
+                vectorstore._collection.delete(ids=old_ids)
+            vectorstore.persist()
+
+            self.bm25_index.promote_documents(
+                self.get_vector_collection_name(staging_collection, self.embedding_model),
+                self.bm25_collection, doc_ids
+            )
+            staging_vectorstore._collection.delete(where=where)
+            staging_vectorstore.persist()
+        return vectorstore
+
+    def _iter_chunks(self, documents: Iterable[Any], batch_size: int) -> Iterator[Any]:
+        """Chunk a stream of pages batch by batch"""
+        for batch in DocumentLoader.iter_batches(documents, batch_size):
+            yield from self.create_chunks(batch)
+
+    def add_chunks(self, vectorstore: Chroma, chunks: List[Any],
+                   batch_size: int = EMBEDDING_BATCH_SIZE) -> Chroma:
+        """Embed chunks in length-sorted batches and bulk-write them to the vector store"""
+        start_time = time.time()
+        cache_hits = self.embedding_cache.hits
+
+        # Similar lengths in a batch keep padding waste low
+        chunks = sorted(chunks, key=lambda chunk: len(chunk.page_content))
+        embeddings = vectorstore.embeddings
+        for batch in DocumentLoader.iter_batches(chunks, batch_size):
+            texts = [chunk.page_content for chunk in batch]
+            with self._span('embed', model=self.embedding_model, chunks=len(batch)):
+                vectors = embeddings.embed_documents(texts)
+            with self._span('chroma_write', chunks=len(batch)):
+                vectorstore._collection.upsert(
+                    ids=[str(uuid.uuid4()) for _ in batch],
+                    embeddings=vectors,
+                    metadatas=[chunk.metadata for chunk in batch],
+                    documents=texts
+                )
+            with self._span('bm25_write', chunks=len(batch)):
+                self.bm25_index.add_chunks(self.bm25_collection, batch)
+
+        if self.performance_monitor is not None and chunks:
+            elapsed = max(time.time() - start_time, 1e-9)
+            # Token chunks carry their counts; only older chunks need the tokenizer
+            uncounted = [chunk.page_content for chunk in chunks if 'token_count' not in chunk.metadata]
+            tokens = sum(chunk.metadata.get('token_count', 0) for chunk in chunks)
+            if uncounted:
+                tokens += self.count_tokens(uncounted)
+            self.performance_monitor.log_metrics({
+                'function_name': 'add_chunks',
+                'embedding_model': self.embedding_model,
+                'execution_time': elapsed,
+                'chunks': len(chunks),
+                'tokens': tokens,
+                'chunks_per_sec': len(chunks) / elapsed,
+                'tokens_per_sec': tokens / elapsed,
+                'cache_hits': self.embedding_cache.hits - cache_hits,
+                'batch_size': batch_size,
+                'threads': EMBEDDING_THREADS
+            })
+        return vectorstore
+
+    def count_tokens(self, texts: List[str]) -> int:
+        """Count tokens of texts with the embedding model's tokenizer"""
+        tokenizer = self.pool.get_embeddings(self.embedding_model).client.tokenizer
+        return sum(len(ids) for ids in tokenizer(texts, add_special_tokens=False)['input_ids'])
+
+    def remove_documents(self, vectorstore: Chroma, doc_ids: List[str]):
+        """Remove all vectors belonging to the given repository documents"""
+        vectorstore._collection.delete(where={'doc_id': {'$in': doc_ids}})
+        self.bm25_index.remove_documents(self.bm25_collection, doc_ids)
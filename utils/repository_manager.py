@@ -1,163 +1,378 @@
 import os
-import json
 import shutil
+import sqlite3
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional
-import pandas as pd
+from typing import TYPE_CHECKING, List, Dict, Optional, Iterator, Tuple
 from utils.document_loader import DocumentLoader
-from config.settings import REPOSITORY_DIR, REPOSITORY_INDEX
+from utils.rag_optimizer import RAGOptimizer
+from utils.answer_cache import get_answer_cache
+from utils.index_store import IndexStore, DOCUMENT_COLUMNS
+from utils.blob_store import BlobStore
+from utils.parse_cache import ParseCache
+from utils.bm25_index import get_bm25_index
+from config.settings import REPOSITORY_DIR, INGEST_WORKERS, EMBEDDING_MODELS
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 class RepositoryManager:
     def __init__(self):
         self.repository_dir = REPOSITORY_DIR
-        self.index_file = REPOSITORY_INDEX
         self.repository_dir.mkdir(parents=True, exist_ok=True)
-        self.load_index()
-
-    def load_index(self):
-        """Load repository index"""
-        if self.index_file.exists():
-            with open(self.index_file, 'r') as f:
-                self.index = json.load(f)
-        else:
-            self.index = {
-                'documents': {},
-                'collections': {},
-                'last_updated': datetime.now().isoformat()
-            }
-            self.save_index()
-
-    def save_index(self):
-        """Save repository index"""
-        self.index['last_updated'] = datetime.now().isoformat()
-        with open(self.index_file, 'w') as f:
-            json.dump(self.index, f, indent=4)
+        self.store = IndexStore()
+        self.blob_store = BlobStore()
+        self.parse_cache = ParseCache()
+        self._collection_locks = {}
+        self._collection_locks_lock = threading.Lock()
+
+    def collection_lock(self, collection_name: str) -> threading.Lock:
+        """Lock held while documents are promoted into or removed from a collection's indexes"""
+        with self._collection_locks_lock:
+            return self._collection_locks.setdefault(collection_name, threading.Lock())
 
     def add_document(self, file, collection_name: str = "default") -> Dict:
         """Add document to repository"""
-        # Generate unique document ID
-        doc_id = f"doc_{len(self.index['documents']) + 1}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        
-        # Create collection if it doesn't exist
-        if collection_name not in self.index['collections']:
-            self.index['collections'][collection_name] = {
-                'created_at': datetime.now().isoformat(),
-                'documents': []
-            }
-
-        # Save document to repository
-        doc_path = self.repository_dir / collection_name / file.name
-        doc_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(doc_path, 'wb') as f:
-            f.write(file.getvalue())
-
-        # Add to index
-        doc_info = {
-            'id': doc_id,
-            'filename': file.name,
-            'path': str(doc_path),
-            'collection': collection_name,
-            'added_at': datetime.now().isoformat(),
-            'file_type': Path(file.name).suffix.lower(),
-            'file_size': os.path.getsize(doc_path)
-        }
-        
-        self.index['documents'][doc_id] = doc_info
-        self.index['collections'][collection_name]['documents'].append(doc_id)
-        
-        self.save_index()
-        return doc_info
+        return self.add_documents([file], collection_name)[0]
+
+    def add_documents(self, files: List, collection_name: str = "default") -> List[Dict]:
+        """Add documents to repository in a single transaction"""
+        # Files are hashed and copied before the write lock is taken, so ingest workers
+        # can keep recording their progress meanwhile
+        hashed = []
+        for file in files:
+            content_hash = BlobStore.hash_file(file)
+            existing = self._find_document(collection_name, file.name)
+            if existing is None or existing['content_hash'] != content_hash:
+                # Save document to repository; identical content is stored only once
+                doc_path = self.blob_store.put(file, Path(file.name).suffix, content_hash)
+                self.parse_cache.record_file(doc_path, content_hash)
+            hashed.append((file, content_hash))
+
+        results = []
+        with self.store.transaction() as conn:
+            # Create collection if it doesn't exist
+            conn.execute(
+                "INSERT OR IGNORE INTO collections (name, created_at) VALUES (?, ?)",
+                (collection_name, datetime.now().isoformat())
+            )
+
+            changed = False
+            for file, content_hash in hashed:
+                # Re-uploading an unchanged file is a no-op
+                existing = self._find_document(collection_name, file.name)
+                if existing and existing['content_hash'] == content_hash:
+                    results.append(existing)
+                    continue
+
+                # Only a stat, unless the blob was released and deleted since it was stored;
+                # deletes take the write lock, so now it stays until the row references it
+                doc_path = self.blob_store.put(file, Path(file.name).suffix, content_hash)
+                changed = True
+
+                if existing:
+                    # Changed file: keep its ID so stale vectors can be replaced
+                    old_path = existing['path']
+                    existing.update({
+                        'path': str(doc_path),
+                        'added_at': datetime.now().isoformat(),
+                        'file_size': os.path.getsize(doc_path),
+                        'content_hash': content_hash
+                    })
+                    conn.execute(
+                        "UPDATE documents SET path = ?, added_at = ?, file_size = ?, content_hash = ? "
+                        "WHERE id = ?",
+                        (existing['path'], existing['added_at'], existing['file_size'],
+                         content_hash, existing['id'])
+                    )
+                    conn.execute("DELETE FROM document_embeddings WHERE doc_id = ?", (existing['id'],))
+                    self.store.release_file(conn, old_path)
+                    results.append(existing)
+                    continue
+
+                # Generate unique document ID
+                next_number = conn.execute(
+                    "SELECT COALESCE(MAX(rowid), 0) + 1 FROM documents"
+                ).fetchone()[0]
+                doc_id = f"doc_{next_number}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+                # Add to index
+                doc_info = {
+                    'id': doc_id,
+                    'filename': file.name,
+                    'path': str(doc_path),
+                    'collection': collection_name,
+                    'added_at': datetime.now().isoformat(),
+                    'file_type': Path(file.name).suffix.lower(),
+                    'file_size': os.path.getsize(doc_path),
+                    'content_hash': content_hash
+                }
+                conn.execute(
+                    f"INSERT INTO documents ({', '.join(DOCUMENT_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(DOCUMENT_COLUMNS))})",
+                    tuple(doc_info[column] for column in DOCUMENT_COLUMNS)
+                )
+                results.append(doc_info)
+
+            if changed:
+                self._bump_version(conn, collection_name)
+                self.store.touch(conn)
+        return results
+
+    def get_collection_version(self, collection_name: str) -> int:
+        """Get a counter that changes whenever a collection's documents or index change"""
+        rows = self.store.query("SELECT version FROM collections WHERE name = ?", (collection_name,))
+        return rows[0]['version'] if rows else 0
+
+    def _bump_version(self, conn: sqlite3.Connection, collection_name: str):
+        """Mark a collection as changed, invalidating its cached answers"""
+        conn.execute("UPDATE collections SET version = version + 1 WHERE name = ?", (collection_name,))
+        get_answer_cache().invalidate(collection_name)
+
+    def _find_document(self, collection_name: str, filename: str) -> Optional[Dict]:
+        """Find a document in a collection by filename"""
+        rows = self.store.query(
+            "SELECT * FROM documents WHERE collection = ? AND filename = ?",
+            (collection_name, filename)
+        )
+        return rows[0] if rows else None
 
     def get_document(self, doc_id: str) -> Optional[Path]:
         """Get document path by ID"""
-        if doc_id in self.index['documents']:
-            path = Path(self.index['documents'][doc_id]['path'])
+        rows = self.store.query("SELECT path FROM documents WHERE id = ?", (doc_id,))
+        if rows:
+            path = Path(rows[0]['path'])
             if path.exists():
                 return path
         return None
 
+    def get_document_info(self, doc_id: str) -> Optional[Dict]:
+        """Get a document's index entry by ID"""
+        rows = self.store.query("SELECT * FROM documents WHERE id = ?", (doc_id,))
+        return rows[0] if rows else None
+
     def get_collection_documents(self, collection_name: str) -> List[Dict]:
         """Get all documents in a collection"""
-        if collection_name in self.index['collections']:
-            docs = []
-            for doc_id in self.index['collections'][collection_name]['documents']:
-                if doc_id in self.index['documents']:
-                    docs.append(self.index['documents'][doc_id])
-            return docs
-        return []
+        return self.store.query(
+            "SELECT * FROM documents WHERE collection = ? ORDER BY rowid", (collection_name,)
+        )
 
     def load_collection_documents(self, collection_name: str) -> List:
         """Load all documents in a collection"""
+        return self.load_documents(self.get_collection_documents(collection_name))
+
+    def load_documents(self, doc_infos: List[Dict]) -> List:
+        """Load the given repository documents, tagging each page with its document ID"""
         documents = []
-        for doc_info in self.get_collection_documents(collection_name):
-            doc_path = Path(doc_info['path'])
-            if doc_path.exists():
-                try:
-                    with open(doc_path, 'rb') as f:
-                        doc = DocumentLoader.load_document_from_file(doc_path)
-                        documents.extend(doc)
-                except Exception as e:
-                    print(f"Error loading document {doc_path}: {e}")
+        for doc_info, doc, error in self.iter_documents(doc_infos):
+            try:
+                if error is not None:
+                    raise error
+                documents.extend(doc)
+            except Exception as e:
+                print(f"Error loading document {doc_info['path']}: {e}")
         return documents
 
+    def iter_documents(self, doc_infos: List[Dict], max_workers: int = INGEST_WORKERS
+                       ) -> Iterator[Tuple[Dict, List, Optional[Exception]]]:
+        """Load documents, yielding (doc_info, documents, error) as each finishes"""
+        # Previously parsed content comes from the parse cache; each remaining
+        # distinct file is parsed once, in parallel, and its pages are cached.
+        # Cache entries are keyed by the hash of the file as it is on disk now,
+        # which is only recomputed when the file's size or mtime changed.
+        by_path = {}
+        for doc_info in doc_infos:
+            content_hash = self.parse_cache.file_hash(Path(doc_info['path']))
+            if content_hash is not None:
+                by_path.setdefault(Path(doc_info['path']), []).append(
+                    dict(doc_info, content_hash=content_hash)
+                )
+
+        to_parse = []
+        for path, infos in by_path.items():
+            if self.parse_cache.has(infos[0]['content_hash']):
+                for doc_info in infos:
+                    yield doc_info, self._cached_pages(doc_info), None
+            else:
+                to_parse.append(path)
+
+        for path, doc, error in DocumentLoader.load_documents_parallel(to_parse, max_workers):
+            first, *rest = by_path[path]
+            if error is None:
+                if isinstance(doc, list):
+                    self.parse_cache.put_documents(first['content_hash'], doc)
+                    for page in doc:
+                        self._tag_page(page, first)
+                else:
+                    doc = self._tag_pages(
+                        self.parse_cache.write_through(first['content_hash'], doc), first
+                    )
+            yield first, doc, error
+
+            # Other documents with the same content reuse the pages just parsed
+            for doc_info in rest:
+                if self.parse_cache.has(doc_info['content_hash']):
+                    yield doc_info, self._cached_pages(doc_info), None
+                else:
+                    pages = DocumentLoader.lazy_load_document_from_file(path)
+                    yield doc_info, self._tag_pages(pages, doc_info), None
+
+    def _cached_pages(self, doc_info: Dict) -> Iterator:
+        """Lazily read a document's parsed pages from the parse cache"""
+        return self._tag_pages(self.parse_cache.iter_documents(doc_info['content_hash']), doc_info)
+
+    @staticmethod
+    def _tag_page(page, doc_info: Dict):
+        """Tag a page with the repository document it belongs to"""
+        page.metadata['doc_id'] = doc_info['id']
+        page.metadata['filename'] = doc_info['filename']
+
+    @staticmethod
+    def _tag_pages(pages: Iterator, doc_info: Dict) -> Iterator:
+        """Tag lazily loaded pages with the repository document they belong to"""
+        for page in pages:
+            RepositoryManager._tag_page(page, doc_info)
+            yield page
+
+    def get_pending_documents(self, collection_name: str, embedding_model: str) -> List[Dict]:
+        """Get documents in a collection that are not yet indexed with the embedding model"""
+        return self.store.query(
+            """
+            SELECT d.* FROM documents d
+            LEFT JOIN document_embeddings e
+                ON e.doc_id = d.id AND e.embedding_model = ?
+            WHERE d.collection = ? AND d.content_hash IS NOT NULL
+                AND (e.content_hash IS NULL OR e.content_hash != d.content_hash)
+            ORDER BY d.rowid
+            """,
+            (embedding_model, collection_name)
+        )
+
+    def mark_indexed(self, doc_ids: List[str], embedding_model: str):
+        """Record that documents are indexed with the embedding model at their current content"""
+        with self.store.transaction() as conn:
+            collections = set()
+            for doc_id in doc_ids:
+                row = conn.execute(
+                    "SELECT collection, content_hash FROM documents WHERE id = ?", (doc_id,)
+                ).fetchone()
+                if row is None:
+                    continue
+                conn.execute(
+                    "INSERT OR REPLACE INTO document_embeddings VALUES (?, ?, ?)",
+                    (doc_id, embedding_model, row['content_hash'])
+                )
+                collections.add(row['collection'])
+            for collection_name in collections:
+                self._bump_version(conn, collection_name)
+            self.store.touch(conn)
+
     def get_collections(self) -> List[str]:
         """Get list of all collections"""
-        return list(self.index['collections'].keys())
+        return [row['name'] for row in self.store.query("SELECT name FROM collections ORDER BY rowid")]
 
     def get_repository_stats(self) -> Dict:
         """Get repository statistics"""
-        return {
-            'total_documents': len(self.index['documents']),
-            'total_collections': len(self.index['collections']),
-            'total_size': sum(doc['file_size'] for doc in self.index['documents'].values()),
-            'last_updated': self.index['last_updated']
-        }
-
-    def search_documents(self, query: str) -> List[Dict]:
+        stats = self.store.query(
+            """
+            SELECT
+                (SELECT COUNT(*) FROM documents) AS total_documents,
+                (SELECT COUNT(*) FROM collections) AS total_collections,
+                (SELECT COALESCE(SUM(file_size), 0) FROM documents) AS total_size
+            """
+        )[0]
+        stats['last_updated'] = self.store.get_meta('last_updated')
+        return stats
+
+    def search_documents(self, query: str, collection_name: Optional[str] = None,
+                         limit: int = 50) -> List[Dict]:
         """Search documents by filename or content"""
-        query = query.lower()
-        results = []
-        for doc_id, doc_info in self.index['documents'].items():
-            if query in doc_info['filename'].lower():
-                results.append(doc_info)
+        results = self.store.query(
+            "SELECT * FROM documents WHERE instr(lower(filename), ?) > 0 ORDER BY rowid",
+            (query.lower(),)
+        )
+        if collection_name is not None:
+            results = [doc for doc in results if doc['collection'] == collection_name]
+
+        # Content matches from the BM25 index, best first
+        seen = {doc['id'] for doc in results}
+        # Chunks are indexed per embedding model; legacy chunks under the collection name itself
+        bm25_collections = None
+        if collection_name is not None:
+            bm25_collections = [collection_name] + [
+                RAGOptimizer.get_vector_collection_name(collection_name, embedding_model)
+                for embedding_model in EMBEDDING_MODELS.values()
+            ]
+        for chunk, _ in get_bm25_index().search(query, limit, bm25_collections):
+            doc_id = chunk.metadata.get('doc_id')
+            if doc_id in seen:
+                continue
+            rows = self.store.query("SELECT * FROM documents WHERE id = ?", (doc_id,))
+            if rows:
+                results.append(rows[0])
+                seen.add(doc_id)
         return results
 
-    def get_document_info_df(self) -> pd.DataFrame:
+    def get_document_info_df(self) -> 'pd.DataFrame':
         """Get document information as DataFrame"""
-        if not self.index['documents']:
+        import pandas as pd
+        rows = self.store.query("SELECT * FROM documents ORDER BY rowid")
+        if not rows:
             return pd.DataFrame()
         
-        df = pd.DataFrame.from_dict(self.index['documents'], orient='index')
+        df = pd.DataFrame(rows).set_index('id', drop=False)
         df['added_at'] = pd.to_datetime(df['added_at'])
         df['file_size_kb'] = df['file_size'].apply(lambda x: f"{x/1024:.1f}")
         return df
 
     def remove_document(self, doc_id: str) -> bool:
         """Remove document from repository"""
-        if doc_id in self.index['documents']:
-            doc_info = self.index['documents'][doc_id]
-            # Remove file
-            doc_path = Path(doc_info['path'])
-            if doc_path.exists():
-                doc_path.unlink()
-            
-            # Remove from collection
-            collection = doc_info['collection']
-            if collection in self.index['collections']:
-                self.index['collections'][collection]['documents'].remove(doc_id)
-            
-            # Remove from index
-            del self.index['documents'][doc_id]
-            self.save_index()
-            return True
-        return False
+        return self.remove_documents([doc_id]) > 0
+
+    def remove_documents(self, doc_ids: List[str]) -> int:
+        """Remove documents from repository in a single transaction"""
+        removed = {}
+        with self.store.transaction() as conn:
+            for doc_id in doc_ids:
+                row = conn.execute(
+                    "SELECT path, collection FROM documents WHERE id = ?", (doc_id,)
+                ).fetchone()
+                if row is None:
+                    continue
+                # Remove from index, and the file once nothing references it
+                conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+                self.store.release_file(conn, row['path'])
+                removed.setdefault(row['collection'], []).append(doc_id)
+
+            for collection_name in removed:
+                self._bump_version(conn, collection_name)
+            if removed:
+                self.store.touch(conn)
+
+        # Keep content and vector search in step with the repository
+        for collection_name, removed_ids in removed.items():
+            with self.collection_lock(collection_name):
+                RAGOptimizer.delete_document_vectors(collection_name, removed_ids)
+        return sum(len(removed_ids) for removed_ids in removed.values())
 
     def clear_collection(self, collection_name: str) -> bool:
         """Clear all documents in a collection"""
-        if collection_name in self.index['collections']:
-            for doc_id in self.index['collections'][collection_name]['documents']:
-                self.remove_document(doc_id)
+        if collection_name in self.get_collections():
+            self.remove_documents([doc['id'] for doc in self.get_collection_documents(collection_name)])
+            with self.collection_lock(collection_name):
+                RAGOptimizer.delete_collection_vectors(collection_name)
             return True
-        return False
\ No newline at end of file
+        return False
+
+
+_repo_manager = None
+_repo_manager_lock = threading.Lock()
+
+def get_repository_manager() -> RepositoryManager:
+    """Get the process-wide repository manager"""
+    global _repo_manager
+    with _repo_manager_lock:
+        if _repo_manager is None:
+            _repo_manager = RepositoryManager()
+        return _repo_manager
@@ -0,0 +1,197 @@
+import gc
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, Optional, Tuple
+from config.settings import (
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_THREADS,
+    POOL_MAX_EMBEDDING_MODELS,
+    POOL_MAX_VECTORSTORES,
+    POOL_MAX_QA_CHAINS,
+    POOL_MAX_MEMORY_MB,
+    POOL_ENTRY_ESTIMATE_MB
+)
+
+if TYPE_CHECKING:
+    from langchain.embeddings import HuggingFaceEmbeddings
+
+class ResourcePool:
+    """Thread-safe, process-wide pool of embedding models, rerankers, vector stores and QA chains"""
+
+    def __init__(self, max_embedding_models: int = POOL_MAX_EMBEDDING_MODELS,
+                 max_vectorstores: int = POOL_MAX_VECTORSTORES,
+                 max_qa_chains: int = POOL_MAX_QA_CHAINS,
+                 max_memory_mb: int = POOL_MAX_MEMORY_MB):
+        self.limits = {
+            'embeddings': max_embedding_models,
+            'rerankers': max_embedding_models,
+            'vectorstores': max_vectorstores,
+            'qa_chains': max_qa_chains
+        }
+        self.max_memory_mb = max_memory_mb
+        self._entries = {name: OrderedDict() for name in self.limits}
+        self._sizes: Dict[Tuple[str, Hashable], float] = {}
+        self._lock = threading.RLock()
+        self._loading: Dict[Tuple[str, Hashable], threading.Lock] = {}
+        self._invalidations: Dict[str, int] = {}
+
+    def get_embeddings(self, model_name: str) -> 'HuggingFaceEmbeddings':
+        """Get a loaded embedding model, loading it on first use"""
+        return self._get('embeddings', model_name, lambda: self._load_embeddings(model_name))
+
+    def _load_embeddings(self, model_name: str) -> 'HuggingFaceEmbeddings':
+        """Load an embedding model for CPU inference"""
+        import torch
+        from langchain.embeddings import HuggingFaceEmbeddings
+        torch.set_num_threads(EMBEDDING_THREADS)
+        return HuggingFaceEmbeddings(
+            model_name=model_name,
+            model_kwargs={'device': 'cpu'},
+            encode_kwargs={'batch_size': EMBEDDING_BATCH_SIZE}
+        )
+
+    def get_reranker(self, model_name: str) -> Any:
+        """Get a loaded cross-encoder reranker, loading it on first use"""
+        def load_reranker():
+            from sentence_transformers import CrossEncoder
+            return CrossEncoder(model_name, device='cpu')
+
+        return self._get('rerankers', model_name, load_reranker)
+
+    def get_vectorstore(self, collection_name: str, embedding_model: str,
+                        factory: Callable[[], Any]) -> Any:
+        """Get an open vector store handle for a collection and embedding model"""
+        return self._get('vectorstores', (collection_name, embedding_model), factory)
+
+    def peek_vectorstore(self, collection_name: str, embedding_model: str) -> Optional[Any]:
+        """The pooled vector store handle of a collection and embedding model, without opening one"""
+        with self._lock:
+            return self._entries['vectorstores'].get((collection_name, embedding_model))
+
+    def get_qa_chain(self, collection_name: str, embedding_model: str, llm_model: str,
+                     k: int, factory: Callable[[], Any]) -> Any:
+        """Get a QA chain for a collection, embedding model, LLM and retrieval depth"""
+        return self._get('qa_chains', (collection_name, embedding_model, llm_model, k), factory)
+
+    def invalidate_collection(self, collection_name: str):
+        """Drop vector store handles and QA chains of a collection"""
+        with self._lock:
+            self._invalidations[collection_name] = self._invalidations.get(collection_name, 0) + 1
+            for name in ('vectorstores', 'qa_chains'):
+                for key in [key for key in self._entries[name] if key[0] == collection_name]:
+                    self._remove(name, key)
+
+    def _get(self, name: str, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Get a pooled entry, creating it and enforcing limits on a miss"""
+        entries = self._entries[name]
+        with self._lock:
+            if key in entries:
+                entries.move_to_end(key)
+                return entries[key]
+            loading = self._loading.setdefault((name, key), threading.Lock())
+
+        # Loads take seconds, so the pool stays usable and only requests for the same entry wait
+        with loading:
+            try:
+                with self._lock:
+                    if key in entries:
+                        entries.move_to_end(key)
+                        return entries[key]
+                    invalidations = self._collection_invalidations(name, key)
+
+                value = factory()
+                size = self._estimate_mb(name, value)
+                with self._lock:
+                    # A handle opened before its collection was invalidated is used once, not pooled
+                    if self._collection_invalidations(name, key) != invalidations:
+                        return value
+                    entries[key] = value
+                    self._sizes[(name, key)] = size
+                    while len(entries) > self.limits[name]:
+                        self._remove(name, next(iter(entries)))
+                    self._enforce_memory_limit(keep=(name, key))
+                    return value
+            finally:
+                with self._lock:
+                    if self._loading.get((name, key)) is loading:
+                        del self._loading[(name, key)]
+
+    def _collection_invalidations(self, name: str, key: Hashable) -> int:
+        """How often the collection of a vector store or QA chain key has been invalidated"""
+        if name not in ('vectorstores', 'qa_chains'):
+            return 0
+        return self._invalidations.get(key[0], 0)
+
+    def _remove(self, name: str, key: Hashable):
+        """Remove an entry along with the entries that depend on it"""
+        self._entries[name].pop(key, None)
+        self._sizes.pop((name, key), None)
+        if name == 'embeddings':
+            for dependent in [k for k in self._entries['vectorstores'] if k[1] == key]:
+                self._remove('vectorstores', dependent)
+        elif name == 'vectorstores':
+            for dependent in [k for k in self._entries['qa_chains'] if k[:2] == key]:
+                self._remove('qa_chains', dependent)
+
+    def _enforce_memory_limit(self, keep: Tuple[str, Hashable]):
+        """Evict least recently used entries while the pooled entries exceed the memory limit"""
+        evicted = False
+        while self._memory_used_mb() > self.max_memory_mb:
+            victim = None
+            # Cheapest entries go first; embedding models are evicted last
+            for name in ('qa_chains', 'vectorstores', 'rerankers', 'embeddings'):
+                candidates = [key for key in self._entries[name]
+                              if not self._is_required(keep, name, key)]
+                if candidates:
+                    victim = (name, candidates[0])
+                    break
+            if victim is None:
+                break
+            self._remove(*victim)
+            evicted = True
+        if evicted:
+            gc.collect()
+
+    def _is_required(self, keep: Tuple[str, Hashable], name: str, key: Hashable) -> bool:
+        """Whether evicting an entry would also evict the entry being kept"""
+        keep_name, keep_key = keep
+        if (keep_name, keep_key) == (name, key):
+            return True
+        if name == 'embeddings':
+            return keep_name in ('vectorstores', 'qa_chains') and keep_key[1] == key
+        if name == 'vectorstores':
+            return keep_name == 'qa_chains' and keep_key[:2] == key
+        return False
+
+    @staticmethod
+    def _estimate_mb(name: str, value: Any) -> float:
+        """Approximate memory of an entry: model weights, quantized index size, or the per-kind estimate"""
+        # HuggingFaceEmbeddings keeps its SentenceTransformer in client, CrossEncoder its model in model
+        model = getattr(value, 'client', None) or getattr(value, 'model', None)
+        if callable(getattr(model, 'parameters', None)):
+            return sum(p.numel() * p.element_size() for p in model.parameters()) / (1024**2)
+        collection = getattr(value, '_collection', None)
+        if callable(getattr(collection, 'memory_bytes', None)):
+            return collection.memory_bytes() / (1024**2)
+        return POOL_ENTRY_ESTIMATE_MB[name]
+
+    def _memory_used_mb(self) -> float:
+        """Estimated memory of the pooled entries in MB"""
+        return sum(self._sizes.values())
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get number of pooled entries by type"""
+        with self._lock:
+            return {name: len(entries) for name, entries in self._entries.items()}
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_resource_pool() -> ResourcePool:
+    """Get the process-wide resource pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ResourcePool()
+        return _pool
@@ -0,0 +1,70 @@
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List
+from config.settings import NORMALIZE_WORKERS
+
+class _FoldTable(dict):
+    """Translate table for runs of unexpected characters; anything unmapped becomes a space"""
+
+    def __missing__(self, key: int) -> str:
+        return ' '
+
+
+def _build_fold_table() -> _FoldTable:
+    """Map typographic quotes, apostrophes and dashes to ASCII and drop invisible characters"""
+    table = _FoldTable()
+    table.update({ord(char): '"' for char in '\u201c\u201d\u201e\u201f\u00ab\u00bb\u2033'})
+    table.update({ord(char): "'" for char in '\u2018\u2019\u201a\u201b`\u00b4\u2032'})
+    table.update({ord(char): '-' for char in '\u2010\u2011\u2012\u2013\u2014\u2015\u2212'})
+    # Soft hyphen, zero-width characters and BOM join the text around them
+    table.update({ord(char): '' for char in '\u00ad\u200b\u200c\u200d\u2060\ufeff'})
+    return table
+
+
+class TextNormalizer:
+    """Single normalization pipeline applied to both document chunks and questions"""
+
+    # Characters kept as they are: word characters, whitespace and common punctuation/symbols.
+    # Only runs of other characters reach the (rare) fold callback.
+    UNEXPECTED = re.compile(r'[^\w\s.,!?;:()"\'%$\u20ac\u00a3&/+=@#*<>\[\]{}-]+')
+    FOLD_TABLE = _build_fold_table()
+
+    # Parallelism only pays off once pickling is amortized over enough text
+    MIN_PARALLEL_CHARS = 4 * 1024 * 1024
+
+    @staticmethod
+    def _fold(match: Any) -> str:
+        """Replacement for a run of unexpected characters"""
+        return match.group().translate(TextNormalizer.FOLD_TABLE)
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Fold quotes and dashes, drop unexpected characters and collapse whitespace"""
+        return " ".join(TextNormalizer.UNEXPECTED.sub(TextNormalizer._fold, text).split())
+
+    @staticmethod
+    def _normalize_list(texts: List[str]) -> List[str]:
+        """Normalize a list of texts in the current process"""
+        unexpected = TextNormalizer.UNEXPECTED.sub
+        fold = TextNormalizer._fold
+        return [" ".join(unexpected(fold, text).split()) for text in texts]
+
+    @staticmethod
+    def normalize_batch(texts: List[str], max_workers: int = NORMALIZE_WORKERS) -> List[str]:
+        """Normalize a list of texts, across a process pool when there is enough work"""
+        if max_workers <= 1 or sum(map(len, texts)) < TextNormalizer.MIN_PARALLEL_CHARS:
+            return TextNormalizer._normalize_list(texts)
+
+        slice_size = -(-len(texts) // max_workers)
+        slices = [texts[i:i + slice_size] for i in range(0, len(texts), slice_size)]
+        with ProcessPoolExecutor(max_workers=len(slices)) as executor:
+            return [text for result in executor.map(TextNormalizer._normalize_list, slices)
+                    for text in result]
+
+    @staticmethod
+    def normalize_documents(documents: List[Any], max_workers: int = NORMALIZE_WORKERS) -> List[Any]:
+        """Normalize the page content of documents in place"""
+        texts = TextNormalizer.normalize_batch([doc.page_content for doc in documents], max_workers)
+        for document, text in zip(documents, texts):
+            document.page_content = text
+        return documents